@@ -0,0 +1,68 @@
+"""
+Registry and timing helpers shared by benchmark modules.
+
+Benchmarks are registered with `register`, the decorated function receives the payload size, does the setup
+and returns a callable without arguments which is the code being timed.
+"""
+import statistics
+import time
+import tracemalloc
+
+SIZES = (1, 100, 10000)
+
+BENCHMARKS = {}
+
+
+def register(name: str, sizes: (list, tuple) = SIZES):
+    """Registers benchmark `name` for every size, results are reported as `name[size]`."""
+
+    def decorator(function):
+        for size in sizes:
+            BENCHMARKS[f"{name}[{size}]"] = (function, size)
+        return function
+
+    return decorator
+
+
+def measure(function, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """Times `function`, calls are looped until one measurement takes at least `min_time` seconds.
+
+    :return: `{"median": seconds, "min": seconds, "loops": number_of_calls_per_measurement}`, times are per call.
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 10 ** 6:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - started) / loops)
+
+    return {"median": statistics.median(timings), "min": min(timings), "loops": loops}
+
+
+def measure_allocations(function) -> dict:
+    """Traces memory allocated by single call of `function`, its return value is counted in `retained`.
+
+    :return: `{"allocated": bytes_allocated_at_peak, "retained": bytes_still_allocated_after_call}`
+    """
+    function()  # Warm up caches, so that only per call allocations are counted !!
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return {"allocated": peak - before, "retained": current - before}
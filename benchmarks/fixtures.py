@@ -0,0 +1,63 @@
+"""Local SQLite fixture database used by the benchmarks."""
+from django.core.management import call_command
+from django.db import connection
+
+from benchmarks.models import Article, Author
+
+ARTICLE_FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "title": "title",
+    "body": "body",
+    "views": "views",
+    "rating": "rating",
+    "isPublished": "is_published",
+    "author": "author.name",
+    "created": "humanized_creation_date",
+    "updated": "update_date",
+}
+
+# Column only subset of `ARTICLE_FIELDS`, which can be serialized by database (`dbjson`) !!
+ARTICLE_COLUMN_FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "title": "title",
+    "body": "body",
+    "views": "views",
+    "author": "author.name",
+    "updated": "update_date",
+}
+
+
+def setup_database(rows: int = 10000, authors: int = 100):
+    """Creates tables and `rows` articles, existing data is removed."""
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    call_command("flush", interactive=False, verbosity=0)
+
+    Author.objects.bulk_create(
+        Author(name=f"Author {index}", email=f"author{index}@example.com") for index in range(authors)
+    )
+    author_ids = list(Author.objects.values_list("id", flat=True))
+
+    Article.objects.bulk_create(
+        (
+            Article(
+                author_id=author_ids[index % len(author_ids)],
+                title=f"Article number {index}",
+                slug=f"article-number-{index}",
+                body="Lorem ipsum dolor sit amet. " * 20,
+                views=index * 7,
+                rating=(index % 50) / 10,
+            )
+            for index in range(rows)
+        ),
+        batch_size=1000,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def articles(size: int):
+    """Queryset of first `size` articles with author fetched in the same query."""
+    return Article.objects.select_related("author").order_by("id")[:size]
@@ -0,0 +1,148 @@
+"""Benchmarks for serialization and response hot paths."""
+import json
+from types import SimpleNamespace
+
+from django.test import RequestFactory
+
+from benchmarks import fixtures
+from benchmarks.base import register
+from common_api import decorators, utils
+from common_api.http import ResponseManager
+from common_api.middlewares import JsonToPOSTMiddleware
+
+request_factory = RequestFactory()
+
+
+@register("utils.get_attr")
+def get_attr(size):
+    objects = list(fixtures.articles(size))
+
+    def run():
+        for obj in objects:
+            utils.get_attr(obj, "title")
+            utils.get_attr(obj, "author.name")
+            utils.get_attr(obj, "humanized_creation_date")
+
+    return run
+
+
+@register("AbstractBaseModel.serialize")
+def serialize(size):
+    objects = list(fixtures.articles(size))
+    return lambda: [obj.serialize(fields=fixtures.ARTICLE_FIELDS) for obj in objects]
+
+
+@register("ResponseManager.add_list_view_data")
+def add_list_view_data(size):
+    objects = list(fixtures.articles(size))
+
+    def run():
+        res = ResponseManager()
+        res.add_list_view_data("articles", objects, fixtures.ARTICLE_FIELDS)
+
+    return run
+
+
+@register("ResponseManager.add_list_view_data+queryset")
+def add_list_view_data_queryset(size):
+    def run():
+        res = ResponseManager()
+        res.add_list_view_data("articles", fixtures.articles(size), fixtures.ARTICLE_FIELDS)
+
+    return run
+
+
+@register("ResponseManager.add_list_view_data+columns")
+def add_list_view_data_columns(size):
+    def run():
+        res = ResponseManager()
+        res.add_list_view_data("articles", fixtures.articles(size), fixtures.ARTICLE_COLUMN_FIELDS)
+        return res.compile(raw=False)
+
+    return run
+
+
+@register("ResponseManager.add_list_view_data+db_json")
+def add_list_view_data_db_json(size):
+    def run():
+        res = ResponseManager()
+        res.add_list_view_data("articles", fixtures.articles(size), fixtures.ARTICLE_COLUMN_FIELDS, db_json=True)
+        return res.compile(raw=False)
+
+    return run
+
+
+@register("ResponseManager.compile")
+def compile_(size):
+    res = ResponseManager()
+    res.add_list_view_data("articles", list(fixtures.articles(size)), fixtures.ARTICLE_FIELDS)
+    return lambda: res.compile(raw=False)
+
+
+@register("ResponseManager.compile+compact")
+def compile_compact(size):
+    res = ResponseManager(compact=True)
+    res.add_list_view_data("articles", list(fixtures.articles(size)), fixtures.ARTICLE_FIELDS)
+    return lambda: res.compile(raw=False)
+
+
+@register("ResponseManager.envelope", sizes=(1,))
+def envelope(size):
+    # Response without messages or pagination, allocation and encoding of the envelope itself !!
+    def run():
+        res = ResponseManager()
+        res.add_data(ok=True)
+        return res.compile(raw=False)
+
+    return run
+
+
+@register("JsonToPOSTMiddleware")
+def json_to_post_middleware(size):
+    body = json.dumps({
+        "csrfmiddlewaretoken": "token",
+        "items": [{"id": index, "title": f"Item {index}", "tags": ["a", "b"]} for index in range(size)],
+    })
+    middleware = JsonToPOSTMiddleware(lambda request: None)
+
+    # Request body can be read once, so creating request is part of the measurement !!
+    return lambda: middleware(request_factory.post("/", data=body, content_type="application/json"))
+
+
+@register("decorators")
+def decorated_view(size):
+    objects = list(fixtures.articles(size))
+
+    @decorators.allowed_methods(["GET"])
+    @decorators.login_required()
+    def view(request):
+        res = ResponseManager(request)
+        res.add_list_view_data("articles", objects, fixtures.ARTICLE_FIELDS)
+        return res()
+
+    request = request_factory.get("/")
+    request.user = SimpleNamespace(is_authenticated=True, is_superuser=False)
+    return lambda: view(request)
+
+
+@register("decorators.rate_limit", sizes=(1,))
+def rate_limited_view(size):
+    @decorators.rate_limit("1000000/s")
+    def view(request):
+        return ResponseManager(request)()
+
+    request = request_factory.get("/")
+    request.user = SimpleNamespace(is_authenticated=True, is_superuser=False, pk=1)
+    return lambda: view(request)
+
+
+@register("decorators.rate_limit+shared", sizes=(1,))
+def shared_rate_limited_view(size):
+    # Default local memory cache, measures the cache API calls but not network round trips !!
+    @decorators.rate_limit("1000000/s", shared=True)
+    def view(request):
+        return ResponseManager(request)()
+
+    request = request_factory.get("/")
+    request.user = SimpleNamespace(is_authenticated=True, is_superuser=False, pk=1)
+    return lambda: view(request)
@@ -0,0 +1,29 @@
+from django.db import models
+
+from common_api.models import AbstractBaseModel, AbstractBaseSlugModel, AbstractBaseUUIDModel, AbstractBaseUUID7Model
+
+
+class Author(AbstractBaseModel):
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+
+
+class Article(AbstractBaseSlugModel):
+    SLUG_FROM_FIELD = "title"
+
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="articles")
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    views = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(default=0)
+    is_published = models.BooleanField(default=True)
+
+
+class UUID4Event(AbstractBaseUUIDModel):
+    name = models.CharField(max_length=100)
+    payload = models.TextField()
+
+
+class UUID7Event(AbstractBaseUUID7Model):
+    name = models.CharField(max_length=100)
+    payload = models.TextField()
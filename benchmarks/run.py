@@ -0,0 +1,104 @@
+"""
+Runs registered benchmarks on a local SQLite fixture database and compares results against a baseline.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline baseline.json --threshold 0.2
+
+Exit status is 1 if any benchmark's median is slower than the baseline by more than `threshold`.
+"""
+import argparse
+import fnmatch
+import importlib
+import json
+import os
+import platform
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules registering benchmarks, add new modules here !!
+BENCHMARK_MODULES = [
+    "benchmarks.hot_paths",
+    "benchmarks.uuids",
+]
+
+
+def setup_django():
+    sys.path.insert(0, ROOT_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+    django.setup()
+
+
+def run(pattern: str = "*", repeat: int = 5, min_time: float = 0.05) -> dict:
+    import django
+    from benchmarks import fixtures
+    from benchmarks.base import BENCHMARKS, measure, measure_allocations, SIZES
+
+    fixtures.setup_database(rows=max(SIZES))
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+
+    results = {}
+    for name, (function, size) in BENCHMARKS.items():
+        if fnmatch.fnmatch(name, pattern):
+            benchmark = function(size)
+            results[name] = measure(benchmark, repeat=repeat, min_time=min_time)
+            results[name].update(measure_allocations(benchmark))
+            print(f"{name:<60} {results[name]['median'] * 1e3:12.4f} ms", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "benchmarks": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Provides benchmarks slower than baseline by more than `threshold`, as `[(name, baseline, current, ratio)]`."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None or not previous["median"]:
+            continue
+
+        ratio = result["median"] / previous["median"]
+        if ratio > 1 + threshold:
+            regressions.append((name, previous["median"], result["median"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="*", help="glob pattern for benchmark names, e.g. 'ResponseManager*'")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per measurement")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results stored by a previous run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 => 15%%")
+    args = parser.parse_args()
+
+    setup_django()
+    results = run(args.filter, args.repeat, args.min_time)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+
+        for name, previous, current, ratio in regressions:
+            print(f"REGRESSION {name}: {previous * 1e3:.4f} ms => {current * 1e3:.4f} ms ({ratio:.2f}x)", file=sys.stderr)
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
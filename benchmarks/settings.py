@@ -0,0 +1,44 @@
+"""
+Django settings used by the benchmarks, a minimal project with `common_api` installed.
+
+Database is a local SQLite file, set `BENCHMARK_DATABASE` to use another path.
+"""
+import os
+import tempfile
+
+SECRET_KEY = 'benchmarks-only-not-secret'
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+
+    'common_api.apps.CommonApiConfig',
+    'benchmarks',
+]
+
+MIDDLEWARE = [
+    'common_api.middlewares.JsonToPOSTMiddleware',
+    'common_api.middlewares.JsonSessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+ROOT_URLCONF = 'benchmarks.urls'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DATABASE', os.path.join(tempfile.gettempdir(), 'common_api_benchmarks.sqlite3')),
+    }
+}
+
+USE_TZ = True
+
+TIME_ZONE = 'UTC'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
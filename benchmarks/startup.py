@@ -0,0 +1,104 @@
+"""
+Measures cold start of a project with `common_api` installed: `django.setup()`, first request and import time per module.
+
+Every run is a fresh interpreter started with `-X importtime`, results are printed as JSON::
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# `-X importtime` doesn't report modules loaded through `importlib.import_module`, which is how django loads
+# apps and models, so those are timed separately !!
+CHILD_SCRIPT = """
+import importlib, json, time
+dynamic_imports = {}
+_import_module = importlib.import_module
+
+def import_module(name, package=None):
+    started = time.perf_counter()
+    try:
+        return _import_module(name, package)
+    finally:
+        dynamic_imports.setdefault(name, time.perf_counter() - started)
+
+importlib.import_module = import_module
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.test import Client
+Client().get("/ping/")
+request_done = time.perf_counter()
+print(json.dumps({
+    "setup": setup_done - start, "first_request": request_done - setup_done, "dynamic_imports": dynamic_imports
+}))
+"""
+
+
+def parse_import_times(stderr: str) -> dict:
+    """Parses `-X importtime` output into `{module: cumulative_seconds}`."""
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        import_times[module.strip()] = int(cumulative) / 1e6
+    return import_times
+
+
+def run_once() -> dict:
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "benchmarks.settings", "PYTHONPATH": ROOT_DIR}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["imports"] = {**result.pop("dynamic_imports"), **parse_import_times(process.stderr)}
+    return result
+
+
+def run(runs: int = 5, top: int = 15) -> dict:
+    results = [run_once() for _ in range(runs)]
+
+    modules = set().union(*(result["imports"] for result in results))
+    import_times = {
+        module: statistics.median(result["imports"].get(module, 0) for result in results)
+        for module in modules
+    }
+
+    return {
+        "benchmark": "startup",
+        "runs": runs,
+        "setup_seconds": statistics.median(result["setup"] for result in results),
+        "first_request_seconds": statistics.median(result["first_request"] for result in results),
+        "common_api_imports": {
+            module: seconds for module, seconds in sorted(import_times.items()) if module.startswith("common_api")
+        },
+        "slowest_imports": dict(sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:top]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to report")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    output = json.dumps(run(args.runs, args.top), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
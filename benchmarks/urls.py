@@ -0,0 +1,14 @@
+from django.urls import path
+
+from common_api.http import ResponseManager
+
+
+def ping(request):
+    res = ResponseManager(request, append_user_data=True)
+    res.add_data(pong=True)
+    return res()
+
+
+urlpatterns = [
+    path('ping/', ping),
+]
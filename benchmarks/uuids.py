@@ -0,0 +1,28 @@
+"""Insert throughput of random `uuid4` primary keys against time ordered `uuid7` primary keys."""
+from django.db import transaction
+
+from benchmarks.base import register
+from benchmarks.models import UUID4Event, UUID7Event
+
+SIZES = (100, 10000)
+PAYLOAD = "x" * 200
+
+
+def insert(model, size):
+    # Table keeps growing between measurements, which is where random keys hurt the most !!
+    def run():
+        with transaction.atomic():
+            for index in range(size):
+                model.objects.create(name=f"event {index}", payload=PAYLOAD)
+
+    return run
+
+
+@register("insert.uuid4", sizes=SIZES)
+def insert_uuid4(size):
+    return insert(UUID4Event, size)
+
+
+@register("insert.uuid7", sizes=SIZES)
+def insert_uuid7(size):
+    return insert(UUID7Event, size)
@@ -1,3 +1,248 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, PAGE_VAR
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-# Register your models here.
+import hashlib
+
+KEYSET_VAR = "before"  # Query parameter of keyset navigation, `<iso datetime>|<pk>` of last row of previous page.
+
+
+def estimate_table_rows(model, using: str) -> (int, None):
+    """Row count of the model table from database statistics, None if the backend has no estimate."""
+    connection = connections[using]
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+
+    # PostgreSQL returns `-1` for tables which are never analyzed !!
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator which doesn't run `COUNT(*)` on every changelist page.
+
+    Unfiltered querysets use table statistics when the estimate is above `COMMON_API_ADMIN_ESTIMATE_THRESHOLD`
+    (default `100000`), other counts are cached for `COMMON_API_ADMIN_COUNT_CACHE_SECONDS` (default `60`) in
+    `COMMON_API_ADMIN_COUNT_CACHE_ALIAS` (default `"default"`).
+
+    Estimated or cached counts can be off, pages past the real last page are served as the last real page.
+    """
+    inexact = False  # Count is estimated or cached !!
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        self.inexact = True
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, "COMMON_API_ADMIN_ESTIMATE_THRESHOLD", 100000):
+                return estimate
+
+        cache = caches[getattr(settings, "COMMON_API_ADMIN_COUNT_CACHE_ALIAS", "default")]
+        sql, params = queryset.query.sql_with_params()
+        key = "common_api:admin_count:" + hashlib.md5(repr((queryset.db, sql, params)).encode()).hexdigest()
+
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, getattr(settings, "COMMON_API_ADMIN_COUNT_CACHE_SECONDS", 60))
+            self.inexact = False
+        return count
+
+    def use_exact_count(self):
+        self.__dict__["count"] = self.object_list.count()
+        self.__dict__.pop("num_pages", None)
+        self.inexact = False
+
+    def page(self, number):
+        try:
+            page = super().page(number)
+        except EmptyPage:
+            if not self.inexact or int(number) < 1:
+                raise
+            page = None  # Count was too low, page may exist !!
+
+        if self.inexact and (page is None or (not page.object_list and page.number > 1)):
+            self.use_exact_count()
+            try:
+                return super().page(number)
+            except EmptyPage:
+                return super().page(self.num_pages)  # Count was too high, page is after the last row !!
+        return page
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist with "older entries" navigation by `(keyset_field, pk)` instead of `OFFSET`, used by default ordering.
+
+    Deep pages cost as much as the first page, if the model has an index on `(keyset_field, id)`.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_cursor = self.parse_cursor(request.GET.get(KEYSET_VAR))
+        self.effective_ordering = None
+        self.keyset_next_query = None
+        self.keyset_first_query = None
+        super().__init__(request, *args, **kwargs)
+
+    @staticmethod
+    def parse_cursor(value: str) -> (tuple, None):
+        if not value or "|" not in value:
+            return None
+        date, pk = value.rsplit("|", 1)
+        date = parse_datetime(date)
+        return (date, pk) if date is not None else None
+
+    @property
+    def keyset_field(self) -> str:
+        return self.model_admin.keyset_field
+
+    @property
+    def uses_keyset(self) -> bool:
+        """Keyset navigation follows only `-keyset_field, -pk` ordering, the ordering actually applied is checked."""
+        # Ordering of `ModelAdmin.get_queryset` is repeated by the changelist, repeated parts don't change the order !!
+        ordering = list(dict.fromkeys(self.effective_ordering or ()))
+        if not all(isinstance(part, str) for part in ordering):
+            return False  # Expressions e.g. ordering by annotations !!
+        if self.show_all or not ordering or ordering[0] != f"-{self.keyset_field}" or len(ordering) > 2:
+            return False
+        pk = self.lookup_opts.pk
+        return all(part in ("-pk", f"-{pk.name}", f"-{pk.attname}") for part in ordering[1:])
+
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        self.effective_ordering = ordering
+        return ordering
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter, ordering and page links start from the newest entries !!
+        if not new_params or KEYSET_VAR not in new_params:
+            remove = [*(remove or ()), KEYSET_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        if self.keyset_cursor is not None and self.uses_keyset:
+            date, pk = self.keyset_cursor
+            queryset = queryset.filter(
+                Q(**{f"{self.keyset_field}__lt": date}) | Q(**{self.keyset_field: date, "pk__lt": pk})
+            )
+        return queryset
+
+    def get_results(self, request):
+        if self.keyset_cursor is None or not self.uses_keyset:
+            super().get_results(request)
+        else:
+            # Rows after the cursor are not counted, the page is read with `LIMIT` only !!
+            self.result_list = self.queryset[:self.list_per_page]
+            self.result_count = len(self.result_list)
+            self.full_result_count = None
+            self.show_full_result_count = False
+            self.show_admin_actions = True
+            self.can_show_all = False
+            self.multi_page = False
+            self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+        if self.uses_keyset:
+            rows = list(self.result_list)
+            if len(rows) == self.list_per_page:
+                last = rows[-1]
+                cursor = f"{getattr(last, self.keyset_field).isoformat()}|{last.pk}"
+                self.keyset_next_query = self.get_query_string({KEYSET_VAR: cursor}, [PAGE_VAR])
+            if self.keyset_cursor is not None:
+                self.keyset_first_query = self.get_query_string(remove=[PAGE_VAR])
+
+
+class ScalableModelAdminMixin:
+    """ModelAdmin mixin for large tables of `AbstractBaseModel` subclasses.
+
+    * counts are estimated or cached, see `EstimatedCountPaginator`, and full result count is not shown.
+    * changelist is ordered by `-keyset_field, -pk` and navigated with keyset links, see `KeysetChangeList`.
+    * `list_select_related` is taken from relations in `list_display`, when not set.
+    * `date_hierarchy` is replaced by range filters on `creation_date` and `update_date`.
+    """
+    keyset_field = "creation_date"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/common_api/keyset_change_list.html"
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+
+        # `date_hierarchy` reads distinct dates of the whole table, filters only add range conditions !!
+        date_fields = [self.date_hierarchy] if self.date_hierarchy else []
+        date_fields += [field for field in ("creation_date", "update_date") if self.has_field(field)]
+        list_filter = list(self.list_filter)
+        for field in date_fields:
+            if field not in list_filter:
+                list_filter.append(field)
+        self.list_filter = list_filter
+        self.date_hierarchy = None
+
+        if hasattr(admin, "ShowFacets"):
+            self.show_facets = admin.ShowFacets.NEVER  # Facets count every filter choice !!
+
+    def has_field(self, name: str) -> bool:
+        try:
+            self.model._meta.get_field(name)
+            return True
+        except FieldDoesNotExist:
+            return False
+
+    def get_ordering(self, request):
+        return super().get_ordering(request) or (f"-{self.keyset_field}", "-pk")
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+
+        related = []
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+
+            model, path = self.model, []
+            for part in name.split("__"):
+                try:
+                    field = model._meta.get_field(part)
+                except FieldDoesNotExist:
+                    break
+                if not (field.is_relation and (field.many_to_one or field.one_to_one)):
+                    break
+                path.append(part)
+                model = field.related_model
+
+            if path and "__".join(path) not in related:
+                related.append("__".join(path))
+        return related
+
+
+class ScalableModelAdmin(ScalableModelAdminMixin, admin.ModelAdmin):
+    pass
@@ -1,5 +1,49 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
+
+import sys
 
 
 class CommonApiConfig(AppConfig):
     name = 'common_api'
+    default_auto_field = 'django.db.models.AutoField'  # Only models of tests are concrete !!
+
+    def ready(self):
+        # Receivers are connected per model, a receiver for every sender would disable fast deletes everywhere !!
+        for model in apps.get_models():
+            connect_receivers(model)
+
+
+def connect_receivers(model):
+    """Connects receivers of `common_api` features `model` uses, called for every installed model on startup."""
+    from common_api import signals
+    from common_api.models import AbstractBaseSyncModel, AbstractBaseSlugModel
+    from common_api.slugs import uses_slug_cache
+
+    # Users module is imported only by projects using `AbstractCommonUser`, so it's not imported here !!
+    users = sys.modules.get("common_api.users")
+
+    if issubclass(model, AbstractBaseSyncModel) and model.TOMBSTONE_MODEL is not None:
+        post_delete.connect(
+            signals.create_sync_tombstone, sender=model,
+            dispatch_uid=f"common_api_create_sync_tombstone_{model._meta.label_lower}"
+        )
+    if issubclass(model, AbstractBaseSlugModel) and uses_slug_cache(model):
+        post_delete.connect(
+            signals.invalidate_cached_slug, sender=model,
+            dispatch_uid=f"common_api_invalidate_cached_slug_{model._meta.label_lower}"
+        )
+    if issubclass(model, AbstractBaseSlugModel) and model.SEARCH_FIELDS:
+        post_save.connect(
+            signals.update_search_index, sender=model,
+            dispatch_uid=f"common_api_update_search_index_{model._meta.label_lower}"
+        )
+        post_delete.connect(
+            signals.remove_from_search_index, sender=model,
+            dispatch_uid=f"common_api_remove_from_search_index_{model._meta.label_lower}"
+        )
+    if users is not None and issubclass(model, users.AbstractCommonUser):
+        post_save.connect(
+            signals.add_available_values, sender=model,
+            dispatch_uid=f"common_api_add_available_values_{model._meta.label_lower}"
+        )
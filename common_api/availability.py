@@ -0,0 +1,313 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Bloom filter for strings, sized for `capacity` values with `error_rate` false positive probability.
+
+    Values can't be removed, stale values only cause false positives until the filter is rebuilt.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, bits: int = None, hashes: int = None, data: bytes = None,
+                 count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = bits or max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = hashes or max(1, int(round(self.bits / capacity * math.log(2))))
+        self.data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.bits for index in range(self.hashes))
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        data = self.data
+        return all(data[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def memory(self) -> int:
+        """Size of the bit array in bytes."""
+        return len(self.data)
+
+    def estimated_error_rate(self) -> float:
+        """False positive probability for the number of values added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def get_state(self) -> dict:
+        return {"capacity": self.capacity, "error_rate": self.error_rate, "bits": self.bits, "hashes": self.hashes,
+                "count": self.count}
+
+
+class AvailabilityService:
+    """Answers "is this value taken?" for unique fields, a definite miss of the Bloom filter doesn't query database.
+
+    Filters are built by streaming the column, kept current on save (`post_save` is connected for subclasses of
+    `AbstractCommonUser`) and rebuilt in background every `COMMON_API_AVAILABILITY_REBUILD_SECONDS`, which also drops
+    deleted and renamed values. Values saved by other processes are shared through django cache, so the cache
+    (`COMMON_API_AVAILABILITY_CACHE_ALIAS`) must be shared between workers.
+
+    Writes that don't send `post_save` (`bulk_create()`, `QuerySet.update()`, raw SQL, other applications) are
+    missed, their values are reported available until the next rebuild. Call `add()` for such values or `build()`
+    after bulk imports, and keep the unique constraint as the final check when saving.
+
+    Fields `model` doesn't have as columns are not checked, a warning is logged when the service is created.
+
+    Settings:
+        * `COMMON_API_AVAILABILITY_CAPACITY`: minimum expected values per field, default `100000`.
+        * `COMMON_API_AVAILABILITY_ERROR_RATE`: false positive rate, default `0.01`.
+        * `COMMON_API_AVAILABILITY_REBUILD_SECONDS`: filters older than this are rebuilt, default `3600`.
+        * `COMMON_API_AVAILABILITY_DIR`: directory filters are persisted in for fast worker startup, default `None`.
+        * `COMMON_API_AVAILABILITY_CACHE_ALIAS`: cache for values saved since build, default `"default"`.
+    """
+    FILE_VERSION = 2
+    KEY_PREFIX = "common_api:availability"
+
+    def __init__(self, model, fields: (list, tuple) = ("username", "phone_number")):
+        self.model = model
+        self.fields = tuple(field for field in fields if self.is_supported(model, field))
+        if unsupported := [field for field in fields if field not in self.fields]:
+            logger.warning(
+                "Availability of ``%s`` can't be checked, ``%s`` has no such columns.",
+                ", ".join(unsupported), model._meta.label,
+            )
+        self.capacity = getattr(settings, "COMMON_API_AVAILABILITY_CAPACITY", 100000)
+        self.error_rate = getattr(settings, "COMMON_API_AVAILABILITY_ERROR_RATE", 0.01)
+        self.rebuild_seconds = getattr(settings, "COMMON_API_AVAILABILITY_REBUILD_SECONDS", 3600)
+        self.directory = getattr(settings, "COMMON_API_AVAILABILITY_DIR", None)
+        self.cache_alias = getattr(settings, "COMMON_API_AVAILABILITY_CACHE_ALIAS", "default")
+
+        self.filters = None  # `{field: BloomFilter}`
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()  # Only one build at a time, first checks wait for it !!
+        self._rebuilding = None  # Values saved while rebuilding, `{field: [value]}` !!
+        self._rebuild_scheduled = False
+        self.counters = dict.fromkeys(("checks", "definite_misses", "possible_hits", "false_positives"), 0)
+
+    @staticmethod
+    def is_supported(model, field: str) -> bool:
+        try:
+            model_field = model._meta.get_field(field)
+        except FieldDoesNotExist:
+            return False
+        return model_field.concrete and not model_field.is_relation
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    @property
+    def path(self) -> (str, None):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f"availability_{self.model._meta.label_lower}.bin")
+
+    def get_key(self, field: str, value: str) -> str:
+        return f"{self.KEY_PREFIX}:{self.model._meta.label_lower}:{field}:{hashlib.md5(value.encode()).hexdigest()}"
+
+    # Building !!
+    def build(self) -> dict:
+        """Builds filters in one streaming pass per column, values saved meanwhile are added before swapping."""
+        with self._lock:
+            self._rebuilding = {field: [] for field in self.fields}
+
+        try:
+            capacity = max(self.capacity, int(self.model._base_manager.count() * 1.5))
+            filters = {}
+            for field in self.fields:
+                bloom_filter = BloomFilter(capacity, self.error_rate)
+                values = self.model._base_manager.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True)
+                for value in values.iterator(chunk_size=2000):
+                    bloom_filter.add(str(value))
+                filters[field] = bloom_filter
+
+            with self._lock:
+                for field, values in self._rebuilding.items():
+                    for value in values:
+                        filters[field].add(value)
+                self.filters, self.built_at = filters, time.time()
+        finally:
+            with self._lock:
+                self._rebuilding = None
+
+        self.save()
+        return self.filters
+
+    def save(self):
+        """Writes filters to `COMMON_API_AVAILABILITY_DIR`, file is replaced atomically."""
+        if self.path is None or self.filters is None:
+            return
+
+        data = b"".join(bytes(self.filters[field].data) for field in self.fields)
+        header = {
+            "version": self.FILE_VERSION,
+            "built_at": self.built_at,
+            "fields": {field: self.filters[field].get_state() for field in self.fields},
+            "length": len(data),
+            "checksum": hashlib.blake2b(data, digest_size=16).hexdigest(),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            file.write(data)
+        os.replace(temporary_path, self.path)
+
+    def load(self) -> bool:
+        """Loads filters persisted by another worker, returns `False` if there is no usable file.
+
+        Truncated or corrupted files (length or checksum differ from the header) are not used.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "rb") as file:
+                header = json.loads(file.readline())
+                if header["version"] != self.FILE_VERSION or list(header["fields"]) != list(self.fields):
+                    return False
+                if time.time() - header["built_at"] > self.rebuild_seconds:
+                    return False  # Values saved before the build may not be in the cache anymore !!
+
+                data = file.read()
+                if len(data) != header["length"] or (
+                        hashlib.blake2b(data, digest_size=16).hexdigest() != header["checksum"]
+                ):
+                    raise ValueError("Length or checksum of filters doesn't match.")
+
+                filters, offset = {}, 0
+                for field in self.fields:
+                    state = header["fields"][field]
+                    size = (state["bits"] + 7) // 8
+                    filters[field] = BloomFilter(data=data[offset:offset + size], **state)
+                    offset += size
+                if offset != len(data):
+                    raise ValueError("Size of filters doesn't match.")
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("Availability filter file ``%s`` is not readable, filters are rebuilt.", self.path)
+            return False
+
+        self.filters, self.built_at = filters, header["built_at"]
+        return True
+
+    def _rebuild_in_background(self):
+        def rebuild():
+            from django.db import close_old_connections
+
+            try:
+                with self._build_lock:
+                    self.build()
+            except Exception:  # NOQA
+                logger.exception("Rebuilding availability filters of ``%s`` failed.", self.model._meta.label)
+                self.built_at = time.time()  # Retried after next interval, not on every check !!
+            finally:
+                self._rebuild_scheduled = False
+                close_old_connections()
+
+        threading.Thread(target=rebuild, name="common_api_availability", daemon=True).start()
+
+    def get_filters(self) -> dict:
+        """Provides current filters, loaded or built on first use and rebuilt in background when stale."""
+        if self.filters is None:
+            # Concurrent first checks wait for one load or build instead of streaming the table each !!
+            with self._build_lock:
+                if self.filters is None and not self.load():
+                    self.build()
+
+        if time.time() - self.built_at > self.rebuild_seconds and not self._rebuild_scheduled:
+            with self._lock:
+                if not self._rebuild_scheduled:
+                    self._rebuild_scheduled = True
+                    self._rebuild_in_background()
+        return self.filters
+
+    # Updates and checks !!
+    def add(self, field: str, value):
+        """Records saved value, in this process's filter and in the shared cache for other processes."""
+        if value is None or field not in self.fields:
+            return
+
+        value = str(value)
+        with self._lock:
+            if self.filters is not None:
+                self.filters[field].add(value)
+            if self._rebuilding is not None:
+                self._rebuilding[field].append(value)
+
+        if self.cache is not None:
+            self.cache.set(self.get_key(field, value), True, self.rebuild_seconds * 2)
+
+    def add_instance(self, instance):
+        for field in self.fields:
+            self.add(field, getattr(instance, field))
+
+    def is_available(self, field: str, value) -> bool:
+        """Checks if no row has `value` in `field`, database is queried only if the filter can't rule it out."""
+        value = str(value)
+        filters = self.get_filters()
+
+        if value not in filters[field] and (self.cache is None or not self.cache.get(self.get_key(field, value))):
+            self._count("checks", "definite_misses")
+            return True
+
+        exists = self.model._base_manager.filter(**{field: value}).exists()
+        self._count("checks", "possible_hits", *(() if exists else ("false_positives",)))
+        return not exists
+
+    def _count(self, *counters):
+        with self._lock:  # Checks run in threads of every request !!
+            for counter in counters:
+                self.counters[counter] += 1
+
+    def stats(self) -> dict:
+        """Size, configured and estimated false positive rate of each filter and check counters."""
+        filters = self.filters or {}
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "built_at": self.built_at,
+            "fields": {
+                field: {
+                    **bloom_filter.get_state(),
+                    "memory": bloom_filter.memory,
+                    "estimated_error_rate": bloom_filter.estimated_error_rate(),
+                }
+                for field, bloom_filter in filters.items()
+            },
+            **counters,
+        }
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_availability_service(model=None) -> AvailabilityService:
+    """Provides the service of `model`, user model if not provided, one instance per model and process."""
+    if model is None:
+        from django.contrib.auth import get_user_model
+        model = get_user_model()
+
+    with _services_lock:
+        if model not in _services:
+            _services[model] = AvailabilityService(model)
+        return _services[model]
@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import F
+
+import os
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Increments of counter fields, kept in memory of this process and written as batched `F()` updates.
+
+    Buffer is flushed by a background thread every `COMMON_API_COUNTER_FLUSH_SECONDS` (default `5`), as soon as
+    `COMMON_API_COUNTER_FLUSH_SIZE` (default `1000`) increments are pending and at interpreter exit. Rows are written
+    with `QuerySet.update()`, so `update_date` isn't changed and `save()`/signals aren't run. Increments made inside a
+    transaction are buffered when it commits and dropped if it's rolled back. Increments pending in a process which
+    is killed without normal exit are lost, so use it for counts where that is acceptable.
+    """
+
+    def __init__(self):
+        self.pending = {}  # `{(model, pk): {field: delta}}`
+        self.size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._validated = set()
+
+    @property
+    def flush_seconds(self) -> float:
+        return getattr(settings, "COMMON_API_COUNTER_FLUSH_SECONDS", 5)
+
+    @property
+    def flush_size(self) -> int:
+        return getattr(settings, "COMMON_API_COUNTER_FLUSH_SIZE", 1000)
+
+    def validate(self, model, field: str):
+        if (model, field) in self._validated:
+            return
+        if not isinstance(model._meta.get_field(field), models.IntegerField):
+            raise ValueError(f"``{model._meta.label}.{field}`` isn't an integer field, it can't be used as counter.")
+        self._validated.add((model, field))
+
+    def increment(self, model, pk, field: str, amount: int = 1, using: str = None):
+        """Adds `amount` to `field` of row `pk`, written to database with the next flush.
+
+        :param using: database of the transaction the increment belongs to, `"default"` if not provided.
+        """
+        self.validate(model, field)
+        if pk is None:
+            raise ValueError(f"``{model._meta.label}`` row must be saved before its counters are incremented.")
+
+        model = model._meta.concrete_model  # Proxy models share the rows !!
+        transaction.on_commit(
+            lambda: self.add(model, pk, field, amount), using=using or DEFAULT_DB_ALIAS
+        )
+
+    def add(self, model, pk, field: str, amount: int):
+        with self._lock:
+            deltas = self.pending.setdefault((model, pk), {})
+            deltas[field] = deltas.get(field, 0) + amount
+            self.size += 1
+            size = self.size
+
+        if self._thread is None:
+            self.start()
+        if size >= self.flush_size:
+            self._wake.set()  # Flushed by the thread, outside of the request's transaction !!
+
+    def get_pending(self, model, pk, field: str) -> int:
+        """Increments of `field` of row `pk` not written to database yet."""
+        with self._lock:
+            return self.pending.get((model._meta.concrete_model, pk), {}).get(field, 0)
+
+    def flush(self) -> int:
+        """Writes pending increments, rows with same increments are updated by one query, provides number of rows."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending, self.size = self.pending, {}, 0
+
+            groups = {}  # `{(model, ((field, delta), ...)): [pk]}`
+            for (model, pk), deltas in pending.items():
+                deltas = tuple(sorted((field, delta) for field, delta in deltas.items() if delta))
+                if deltas:
+                    groups.setdefault((model, deltas), []).append(pk)
+
+            written = 0
+            for (model, deltas), pks in groups.items():
+                try:
+                    model._base_manager.filter(pk__in=pks).update(
+                        **{field: F(field) + delta for field, delta in deltas}
+                    )
+                    written += len(pks)
+                except Exception:  # NOQA
+                    logger.exception("Writing counters of ``%s`` failed, retried with next flush.", model._meta.label)
+                    with self._lock:
+                        for pk in pks:
+                            retried = self.pending.setdefault((model, pk), {})
+                            for field, delta in deltas:
+                                retried[field] = retried.get(field, 0) + delta
+            return written
+
+    # Background flushing !!
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="common_api_counters", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                if self.pending:
+                    self.flush()
+            finally:
+                connections.close_all()  # Connections of this thread are not closed by request_finished !!
+
+    def reset(self):
+        """Drops pending increments and the thread reference, increments of parent process are flushed by parent."""
+        self.pending, self.size = {}, 0
+        self._lock, self._flush_lock = threading.Lock(), threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+
+buffer = CounterBuffer()
+os.register_at_fork(after_in_child=buffer.reset)
+atexit.register(buffer.flush)
+
+
+def increment(model, pk, field: str, amount: int = 1, using: str = None):
+    buffer.increment(model, pk, field, amount, using)
+
+
+def get_value(instance, field: str) -> int:
+    """Value of counter `field` of `instance` with increments not written to database yet."""
+    return getattr(instance, field) + buffer.get_pending(type(instance), instance.pk, field)
+
+
+def flush() -> int:
+    return buffer.flush()
@@ -0,0 +1,117 @@
+from django.core.serializers.json import DjangoJSONEncoder
+
+import json
+import bisect
+import threading
+import unicodedata
+from functools import lru_cache
+
+
+def normalize(text: str) -> str:
+    """Makes text case and accent insensitive, `Åland` => `aland`."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Same as `normalize`, with surrounding and repeated whitespace removed, `" Ne  w"` => `"ne w"`."""
+    return " ".join(normalize(prefix).split())
+
+
+class CountryRegistry:
+    """Indexed lookups over `constants.COUNTRY_CODE`, indexes are built on first use."""
+
+    def __init__(self, choices: (list, tuple) = None):
+        """
+        :param choices: `[(code, name)]`, `constants.COUNTRY_CODE` if not provided.
+        """
+        self._choices = choices
+        self._lock = threading.Lock()
+        self._by_code = None
+        self._by_name = None
+        self._prefix_keys = None
+        self._prefix_codes = None
+        self._cached_search_json = lru_cache(maxsize=1024)(self._search_json)
+
+    def _build(self):
+        with self._lock:
+            if self._by_code is not None:
+                return
+
+            choices = self._choices
+            if choices is None:
+                from common_api.constants import COUNTRY_CODE
+                choices = COUNTRY_CODE
+
+            by_name = {}
+            prefix_index = []
+            for code, name in choices:
+                normalized_name = normalize(name)
+                by_name[normalized_name] = code
+                # Every word start is indexed, so that `korea` and `republic` both find `Korea (the Republic of)` !!
+                words = normalized_name.replace("(", " ").replace(")", " ").replace(",", " ").split()
+                for index in range(len(words)):
+                    prefix_index.append((" ".join(words[index:]), index, code))
+                prefix_index.append((code.casefold(), -1, code))
+
+            prefix_index.sort()
+            self._by_name = by_name
+            self._prefix_keys = [key for key, _, _ in prefix_index]
+            self._prefix_codes = [code for _, _, code in prefix_index]
+            self._by_code = dict(choices)
+
+    @property
+    def by_code(self) -> dict:
+        """`{code: name}`"""
+        if self._by_code is None:
+            self._build()
+        return self._by_code
+
+    def get_name(self, code: str, default=None) -> str:
+        """Provides country name for the code, or `default` if the code is unknown."""
+        return self.by_code.get(code, default)
+
+    def get_code(self, name: str, default=None) -> str:
+        """Provides country code for the name, name is matched without case and accents."""
+        if self._by_code is None:
+            self._build()
+        return self._by_name.get(normalize(name), default)
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        """Finds countries whose code, name or any word in name starts with `prefix`.
+
+        :param prefix: text typed by the user, case and accents are ignored.
+        :param limit: maximum number of results.
+        :return: `[(code, name)]` ordered by matched text.
+        """
+        if self._by_code is None:
+            self._build()
+
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+
+        results = {}
+        index = bisect.bisect_left(self._prefix_keys, prefix)
+        while index < len(self._prefix_keys) and len(results) < limit:
+            if not self._prefix_keys[index].startswith(prefix):
+                break
+            code = self._prefix_codes[index]
+            results.setdefault(code, self._by_code[code])
+            index += 1
+
+        return list(results.items())
+
+    def search_json(self, prefix: str, limit: int = 10) -> bytes:
+        """Same as `search`, but returns encoded `ResponseManager` response, cached by the normalized prefix."""
+        return self._cached_search_json(normalize_prefix(prefix), limit)
+
+    def _search_json(self, prefix: str, limit: int = 10) -> bytes:
+        from common_api.http import ResponseManager
+
+        res = ResponseManager()
+        res.add_data(countries=[{"code": code, "name": name} for code, name in self.search(prefix, limit)])
+        return json.dumps(res(raw=True), cls=DjangoJSONEncoder).encode()
+
+
+registry = CountryRegistry()
@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import connections, models
+from django.db.models import F, Func, Value
+from django.db.models.functions import Cast
+
+import json
+
+# Field types whose database value is encoded the same as the value serialized in Python, on every backend.
+JSON_SAFE_FIELDS = (models.IntegerField, models.CharField, models.TextField, models.DateField)
+# Field types which are safe only on backends with native boolean JSON values, SQLite returns `0`/`1`.
+# `DateTimeField` is supported on SQLite only, where it's formatted by `SQLiteISODateTime`.
+JSON_BOOLEAN_SAFE_VENDORS = ("postgresql",)
+
+# Aggregation of ``_common_api_json`` column of the rows query, `{vendor: sql}`, both aggregate rows in the order of
+# the ordered subquery, which isn't guaranteed by SQL, `test_dbjson` asserts it !!
+_ARRAY_SQL = {
+    "sqlite": 'SELECT json_group_array(json(rows."_common_api_json")), COUNT(*) FROM ({}) rows',
+    "postgresql": 'SELECT COALESCE(json_agg(rows."_common_api_json"), \'[]\'::json)::text, COUNT(*) FROM ({}) rows',
+}
+
+
+class RawJSON:
+    """Already encoded JSON, `ResponseManager` embeds it into the response without encoding it again."""
+    __slots__ = ("fragment", "rows")
+
+    def __init__(self, fragment: str, rows: int = None):
+        self.fragment = fragment
+        self.rows = rows  # Number of array items, if known !!
+
+    def decode(self):
+        return json.loads(self.fragment)
+
+    def __repr__(self):
+        return f"RawJSON({self.fragment[:50]!r})"
+
+
+class JSONBuildObject(Func):
+    """`json_object()` on SQLite and `json_build_object()` on PostgreSQL, keys are kept in the order provided."""
+    function = "JSON_OBJECT"
+    output_field = models.TextField()
+
+    def __init__(self, **fields):
+        expressions = []
+        for key, value in fields.items():
+            expressions.extend((Value(key), value))
+        super().__init__(*expressions)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        copy = self.copy()
+        copy.set_source_expressions([
+            Cast(expression, models.TextField()) if index % 2 == 0 else expression
+            for index, expression in enumerate(copy.get_source_expressions())
+        ])
+        return super(JSONBuildObject, copy).as_sql(compiler, connection, function="JSON_BUILD_OBJECT", **extra_context)
+
+
+class SQLiteISODateTime(Func):
+    """Formats SQLite datetime text (`YYYY-MM-DD HH:MM:SS[.ffffff]`) same as `DjangoJSONEncoder`.
+
+    Microseconds are truncated to milliseconds and included only if stored, like `datetime.isoformat()`.
+    """
+    template = (
+        "(substr(%(expressions)s, 1, 10) || 'T' || substr(%(expressions)s, 12, 8) || "
+        "(CASE WHEN length(%(expressions)s) > 19 THEN substr(%(expressions)s, 20, 4) ELSE '' END) || '%(suffix)s')"
+    )
+    output_field = models.TextField()
+
+
+def _get_expression(model, path: str, vendor: str):
+    """Provides expression for `path` if it's a JSON safe column, reached only through non null forward relations."""
+    if not isinstance(path, str):
+        return None
+
+    parts = path.split(".")
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+
+        if index < len(parts) - 1:
+            # `get_attr` fails on null relations, where SQL would give `null` !!
+            if not (field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete) or field.null:
+                return None
+            model = field.related_model
+
+    lookup = F("__".join(parts))
+    if field.is_relation:
+        if not (field.concrete and part == field.attname):
+            return None  # Relation itself is a model object, only `<relation>_id` is a column !!
+        field = field.target_field
+
+    if not field.concrete:
+        return None
+    if isinstance(field, models.DateTimeField):
+        if vendor != "sqlite":
+            return None
+        return SQLiteISODateTime(lookup, suffix="Z" if settings.USE_TZ else "")
+    if isinstance(field, models.BooleanField):
+        return lookup if vendor in JSON_BOOLEAN_SAFE_VENDORS else None
+    if isinstance(field, JSON_SAFE_FIELDS):
+        return lookup
+    return None
+
+
+def compile_fields(queryset, fields: dict) -> (dict, None):
+    """Compiles serialization `fields` mapping to `{frontend_field: expression}`, None if it can't be built in database.
+
+    Only plain columns of JSON safe types are supported, models with custom `serialize`/`serialize_json` and fields
+    removed by `get_excluded_fields` are served by Python path.
+    """
+    from common_api.models import AbstractBaseModel
+
+    model = queryset.model
+    vendor = connections[queryset.db].vendor
+    if vendor not in _ARRAY_SQL or not isinstance(fields, dict) or not fields:
+        return None
+    if not issubclass(model, AbstractBaseModel) or (
+            model.serialize is not AbstractBaseModel.serialize or model.serialize_json is not AbstractBaseModel.serialize_json
+    ):
+        return None
+    if model.get_excluded_fields is not AbstractBaseModel.get_excluded_fields:
+        if set(model().get_excluded_fields() or ()) & set(fields):
+            return None
+
+    columns = {}
+    for frontend_field, path in fields.items():
+        if (expression := _get_expression(model, path, vendor)) is None:
+            return None
+        columns[frontend_field] = expression
+    return columns
+
+
+def get_json_array(queryset, fields: dict) -> (RawJSON, None):
+    """Serializes queryset rows with `fields` mapping in database, as one JSON array.
+
+    Decoded result is the same as of serializing every object with `AbstractBaseModel.serialize`, encoding may differ
+    only in whitespace and escaping.
+
+    :param queryset: queryset of `AbstractBaseModel` subclass, ordering and slicing are preserved.
+    :param fields: serialization mapping.
+    :return: `RawJSON` array or None if the mapping or the database backend isn't supported, see `compile_fields`.
+    """
+    columns = compile_fields(queryset, fields)
+    if columns is None:
+        return None
+
+    rows = queryset.values(_common_api_json=JSONBuildObject(**columns))
+    try:
+        sql, params = rows.query.sql_with_params()
+    except EmptyResultSet:  # `none()` or filters that can't match !!
+        return RawJSON("[]", 0)
+    connection = connections[queryset.db]
+
+    with connection.cursor() as cursor:
+        cursor.execute(_ARRAY_SQL[connection.vendor].format(sql), params)
+        return RawJSON(*cursor.fetchone())
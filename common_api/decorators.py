@@ -1,7 +1,10 @@
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
 
+import asyncio
 from functools import wraps
 
+from common_api import metrics, ratelimit, routers
 from common_api.http import ResponseManager
 
 
@@ -24,6 +27,7 @@ def user_passes_test(test, failed_return_value: dict):
             if test_passed:
                 return function(request, *args, **kwargs)
             else:
+                metrics.record_rejection("user_passes_test")
                 return JsonResponse(failed_return_value)
 
         return __wrapper
@@ -46,6 +50,7 @@ def login_required(message="Please Make sure you are logged in.", title="Not Log
             if request.user.is_authenticated:
                 return function(request, *args, **kwargs)
             else:
+                metrics.record_rejection("login_required")
                 res = ResponseManager()
                 res.add_warning_message(title=title, message=message)
                 return res()
@@ -67,6 +72,7 @@ def logout_required(message="Please logout before accessing this page.", title="
         @wraps(function)
         def __wrapper(request, *args, **kwargs):
             if request.user.is_authenticated:
+                metrics.record_rejection("logout_required")
                 res = ResponseManager()
                 res.add_warning_message(title=title, message=message)
                 return res()
@@ -92,6 +98,7 @@ def allow_ajax_only(message="Request to this page is forbidden, please make sure
         @wraps(function)
         def __wrapper(request, *args, **kwargs):
             if not request.is_ajax():
+                metrics.record_rejection("allow_ajax_only")
                 res = ResponseManager()
                 res.add_warning_message(
                     title=title,
@@ -123,6 +130,7 @@ def allowed_methods(methods=None, message=None, title="Method Not Allowed"):
             if request.method in methods:
                 return function(request, *args, **kwargs)
             else:
+                metrics.record_rejection("allowed_methods")
                 res = ResponseManager()
                 res.add_warning_message(
                     title=title,
@@ -133,3 +141,105 @@ def allowed_methods(methods=None, message=None, title="Method Not Allowed"):
         return __wrapper
 
     return decorator_function
+
+
+def rate_limit(rate: str, key="user", scope: str = None, methods=None, shared: bool = None,
+               message="Too many requests, please try again later.", title="Too Many Requests"):
+    """Limits requests per client to `rate`, throttled requests get warning response with status `429`.
+
+    Responses have ``RateLimit-Limit``, ``RateLimit-Remaining`` and ``RateLimit-Reset`` headers, throttled responses
+    also ``Retry-After``. See `ratelimit.RateLimiter` for the token bucket and the shared sliding window. Sync and async
+    views are supported.
+
+    :param rate: requests per period, like `"5/m"`, `"100/h"` or `"10/30s"`.
+    :param key: `"user"` (user, or address for anonymous users), `"ip"` or callable returning key for the request.
+    :param scope: views with same scope share the limit, default is the view's own limit.
+    :param methods: list of methods to limit, if not provided every method is limited.
+    :param shared: keep counts in django cache so limit holds across workers, default `COMMON_API_RATE_LIMIT_SHARED`.
+    :param title:
+    :param message: Message to be sent if request is throttled.
+    :return: Decorator or JsonResponse
+    """
+    get_key = key if callable(key) else ratelimit.KEY_FUNCTIONS[key]
+
+    def decorator_function(function):
+        limiter = ratelimit.RateLimiter(rate, scope or f"{function.__module__}.{function.__qualname__}", shared)
+
+        def check(request) -> ratelimit.RateLimitResult:
+            return limiter.check(get_key(request))
+
+        def get_throttled_response():
+            metrics.record_rejection("rate_limit")
+            res = ResponseManager()
+            res.add_warning_message(title=title, message=message)
+            return res(status=429)
+
+        def add_headers(response, result: ratelimit.RateLimitResult):
+            for header, value in result.get_headers().items():
+                response[header] = value
+            return response
+
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def __wrapper(request, *args, **kwargs):
+                if methods and request.method not in methods:
+                    return await function(request, *args, **kwargs)
+
+                # Key may load `request.user` and shared limits use the cache, both are sync !!
+                result = await sync_to_async(check)(request)
+                if result.allowed:
+                    return add_headers(await function(request, *args, **kwargs), result)
+                return add_headers(get_throttled_response(), result)
+        else:
+            @wraps(function)
+            def __wrapper(request, *args, **kwargs):
+                if methods and request.method not in methods:
+                    return function(request, *args, **kwargs)
+
+                result = check(request)
+                if result.allowed:
+                    return add_headers(function(request, *args, **kwargs), result)
+                return add_headers(get_throttled_response(), result)
+
+        __wrapper.rate_limiter = limiter
+        return __wrapper
+
+    return decorator_function
+
+
+# Database related !!
+def read_only(function):
+    """Serves reads of `GET`/`HEAD` requests from a read replica, see `routers.ReplicaRouter`.
+
+    Clients which wrote in the last `COMMON_API_READ_YOUR_WRITES_SECONDS` are served from primary.
+
+    :param function: sync or async view that doesn't need to read its own or the client's latest writes.
+    :return: decorated function
+    """
+    if asyncio.iscoroutinefunction(function):
+        @wraps(function)
+        async def __wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await function(request, *args, **kwargs)
+            if routers.uses_session():
+                pinned = await sync_to_async(routers.is_pinned_to_primary)(request)  # Session is loaded lazily !!
+            else:
+                pinned = routers.is_pinned_to_primary(request)
+            if pinned:
+                return await function(request, *args, **kwargs)
+
+            # Block is left after the view ran, its queries are routed by the state in the context !!
+            with routers.read_from_replica():
+                return await function(request, *args, **kwargs)
+
+        return __wrapper
+
+    @wraps(function)
+    def __wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or routers.is_pinned_to_primary(request):
+            return function(request, *args, **kwargs)
+
+        with routers.read_from_replica():
+            return function(request, *args, **kwargs)
+
+    return __wrapper
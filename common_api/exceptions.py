@@ -4,3 +4,15 @@ class DependentVariableNotProvided(Exception):
 
 class NotSupported(Exception):
     """This will be raised if something user is trying to do is not supported."""
+
+
+class QueryBudgetExceeded(Exception):
+    """This will be raised if a view or block executes more queries than its query budget allows."""
+
+
+class InvalidCursor(Exception):
+    """This will be raised if provided pagination or sync cursor is malformed or tampered."""
+
+
+class InvalidFieldSelection(Exception):
+    """This will be raised if client selects fields which are not available."""
@@ -0,0 +1,14 @@
+from django.db import models
+
+from common_api import utils
+
+
+class TimeOrderedUUIDField(models.UUIDField):
+    """Drop-in `UUIDField` which defaults to time ordered `utils.uuid7` values instead of random `uuid.uuid4`.
+
+    Inserts land at the end of the primary key index, and ordering by it is roughly ordering by creation time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("default", utils.uuid7)
+        super().__init__(*args, **kwargs)
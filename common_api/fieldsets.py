@@ -0,0 +1,135 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+
+from collections import namedtuple
+
+from common_api import exceptions
+
+FIELDS_PARAM = "fields"
+EXCLUDE_PARAM = "exclude"
+
+ColumnPlan = namedtuple("ColumnPlan", ["only", "select_related"])
+
+
+def _split(value: str) -> list:
+    return [field.strip() for field in value.split(",") if field.strip()]
+
+
+def get_allowed_fields(model, fields: dict) -> list:
+    """Provides keys of `fields` mapping that clients can select, fields from `get_excluded_fields` are never allowed."""
+    excluded = model().get_excluded_fields() if hasattr(model, "get_excluded_fields") else None
+    return [field for field in fields if not excluded or field not in excluded]
+
+
+def select_fields(params, fields: dict, allowed: (list, tuple) = None) -> dict:
+    """Trims `fields` mapping to the fields selected with `?fields=a,b` and/or `?exclude=c`.
+
+    :param params: query parameters, usually `request.GET`.
+    :param fields: serialization mapping of the view, the whitelist of selectable fields.
+    :param allowed: keys of `fields` that can be selected, all keys if not provided.
+    :return: trimmed `fields` mapping, in the order of the original mapping.
+    """
+    allowed = list(fields) if allowed is None else allowed
+    selected = _split(params.get(FIELDS_PARAM, ""))
+    excluded = _split(params.get(EXCLUDE_PARAM, ""))
+
+    unknown = [field for field in (*selected, *excluded) if field not in allowed]
+    if unknown:
+        raise exceptions.InvalidFieldSelection(
+            f"unknown field(s) ``{', '.join(unknown)}``, available fields are ``{', '.join(allowed)}``."
+        )
+
+    selected = set(selected or allowed) - set(excluded)
+    return {field: fields[field] for field in allowed if field in selected}
+
+
+def get_column_plan(model, fields: dict) -> ColumnPlan:
+    """Resolves backend paths of `fields` mapping to the columns and relations they read.
+
+    Paths through forward relations (`author.name`) are followed, methods and properties are resolved with
+    `FIELD_DEPENDENCIES` of their model. If any path can't be resolved, `only` is None since reading fewer
+    columns could cause a query per row.
+
+    :return: `ColumnPlan(only=[lookup] or None, select_related=[lookup])`
+    """
+    only = set()
+    select_related = set()
+    resolvable = True
+
+    for path in fields.values():
+        if not isinstance(path, str):
+            resolvable = False
+            continue
+
+        current_model = model
+        prefix = ""
+        parts = path.split(".")
+        for index, part in enumerate(parts):
+            try:
+                field = current_model._meta.get_field(part)
+            except FieldDoesNotExist:
+                dependencies = getattr(current_model, "FIELD_DEPENDENCIES", {}).get(part)
+                if dependencies is None or index != len(parts) - 1:
+                    resolvable = False
+                else:
+                    only.update(prefix + dependency for dependency in dependencies)
+                break
+
+            if field.is_relation and (field.many_to_one or field.one_to_one) and index < len(parts) - 1:
+                prefix = f"{prefix}{field.name}__"
+                select_related.add(prefix[:-2])
+                current_model = field.related_model
+            elif field.concrete:
+                if index != len(parts) - 1:
+                    resolvable = False  # Attribute of a column value e.g. `creation_date.year` !!
+                only.add(prefix + field.name)
+                break
+            else:
+                resolvable = False
+                break
+
+    return ColumnPlan(sorted(only) if resolvable else None, sorted(select_related))
+
+
+def get_prefetch_columns(queryset) -> set:
+    """Provides columns of `queryset` model its `prefetch_related()` lookups read, so `only()` doesn't defer them.
+
+    Forward relations need their foreign key column, generic foreign keys their content type and object id columns,
+    reverse and many to many relations need the pk, which `only()` always keeps.
+    """
+    columns = set()
+    for lookup in queryset._prefetch_related_lookups:
+        name = getattr(lookup, "prefetch_through", lookup).split("__")[0]
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue  # Prefetched through a property, can't be resolved !!
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            columns.add(field.attname)
+        elif getattr(field, "ct_field", None) and getattr(field, "fk_field", None):
+            columns.update((queryset.model._meta.get_field(field.ct_field).attname, field.fk_field))
+    return columns
+
+
+def apply_field_selection(params, objects, fields: dict) -> tuple:
+    """Applies client field selection to the serialization mapping and, for querysets, to the columns read.
+
+    :param params: query parameters, usually `request.GET`.
+    :param objects: queryset or list of objects to be serialized.
+    :param fields: serialization mapping of the view.
+    :return: `(objects, fields)`, queryset is restricted with `select_related()`/`only()` when possible.
+    """
+    model = objects.model if isinstance(objects, QuerySet) else None
+    allowed = get_allowed_fields(model, fields) if model is not None else None
+    fields = select_fields(params, fields, allowed)
+
+    if model is not None:
+        plan = get_column_plan(model, fields)
+        if plan.only is not None:
+            # Relations selected by the view but not by the client would be deferred and traversed at once !!
+            objects = objects.select_related(None).only(*plan.only, *sorted(get_prefetch_columns(objects)))
+        if plan.select_related:
+            objects = objects.select_related(*plan.select_related)
+
+    return objects, fields
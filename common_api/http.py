@@ -1,12 +1,71 @@
-from django.http import JsonResponse, HttpRequest
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import HttpResponse, JsonResponse, HttpRequest
+
+import re
+import json
+import asyncio
+import secrets
 
 from common_api.forms import JsonModelForm
-from common_api import exceptions
+from common_api import exceptions, humanizers, sync, fieldsets, encoding, dbjson, metrics
+
+
+ENVELOPE_VERSION = 2  # Version of compact envelope contract, sent as ``envelope_version`` in compact responses.
+MESSAGE_TYPES = ("error", "info", "success", "warning")
+
+# Pre-encoded envelope heads without messages, errors and pagination, `{(compact, user_data): json}` !!
+_HEAD_FRAGMENTS = {}
+
+
+def _get_placeholders(raw: dict) -> dict:
+    """Provides placeholder string for each key of `raw` (`{key: json_fragment}`), encoded in place of the fragment."""
+    token = secrets.token_hex(8)
+    return {key: f"common_api_raw_{token}_{index}" for index, key in enumerate(raw)}
+
+
+def _splice(content: bytes, placeholders: dict, raw: dict) -> (bytes, None):
+    """Replaces encoded placeholders of `content` by fragments of `raw`, None if data contains a placeholder."""
+    fragments = {json.dumps(placeholders[key]).encode(): raw[key].encode() for key in raw}
+    if any(content.count(placeholder) != 1 for placeholder in fragments):
+        return None
+    # Single pass, so fragments are not searched for placeholders !!
+    pattern = re.compile(b"|".join(re.escape(placeholder) for placeholder in fragments))
+    return pattern.sub(lambda match: fragments[match.group(0)], content)
+
+
+class EnvelopeResponse(JsonResponse):
+    """`JsonResponse` with already encoded content, `envelope` provides the data it was encoded from."""
+
+    def __init__(self, content: bytes, envelope_factory, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        HttpResponse.__init__(self, content, **kwargs)  # NOQA, content is not encoded again !!
+        self._envelope_factory = envelope_factory
+        self._envelope = None
+
+    @property
+    def envelope(self) -> dict:
+        if self._envelope is None:
+            self._envelope = self._envelope_factory()
+        return self._envelope
 
 
 class ResponseManager:
+    """Builds the response envelope, sections are created only when used and static parts are pre-encoded.
+
+    Default envelope always has every section, in compact mode (`compact=True` or `COMMON_API_COMPACT_ENVELOPE`)
+    empty ``messages`` types, ``field_errors`` and ``pagination`` are omitted, ``has_pagination_data`` is replaced by
+    presence of ``pagination`` and ``envelope_version`` is set to `ENVELOPE_VERSION`.
+    """
+    __slots__ = (
+        "append_user_data", "request", "compact", "_humanizer",
+        "__messages", "__field_errors", "__pagination", "__has_pagination_data", "__user_data", "__data",
+    )
+
     def __init__(self, request: HttpRequest = None, messages: list = None,
-                 append_user_data: bool = False, **additional_response_data):
+                 append_user_data: bool = False, compact: bool = None, **additional_response_data):
         if append_user_data and request is None:
             raise exceptions.DependentVariableNotProvided(
                 "make sure you provide `request` or set `append_user_data` to `False`"
@@ -14,33 +73,26 @@ class ResponseManager:
 
         self.append_user_data = append_user_data  # If set True then user data is added, if set `True` additional db query must be made.
         self.request = request  # For evaluating current user condition.
-
-        if append_user_data:
-            # User related info !!
-            user_data = {
-                "is_logged_in": False,
-                "is_superuser": False
-            }
-        else:
-            user_data = {}
-
-        self.__response = {
-            # message and error handling !!
-            "messages": messages or {  # For ``non-form field`` related errors.
-                "error": [],  # Error message, will be displayed in red.
-                "info": [],  # Info message, will be displayed in blue.
-                "success": [],  # Success Message, will be displayed in green.
-                "warning": []  # Warning Message, will be displayed in yellow.
-            },  # list of messages to be send in frontend.
-            "field_errors": {},  # For ``form field`` related errors.
-            "has_errors": False,  # For Knowing if the response contains any error.
-
-            # DB/Query/Pagination Related !!
-            "pagination": {},
-            "has_pagination_data": False,
-            **user_data,
-            **additional_response_data,
-        }
+        self.compact = getattr(settings, "COMMON_API_COMPACT_ENVELOPE", False) if compact is None else compact
+        self._humanizer = None
+
+        # Sections are None until used !!
+        self.__messages = messages or None  # `{type: [message]}` for ``non-form field`` related errors.
+        self.__field_errors = None  # For ``form field`` related errors.
+        self.__pagination = None
+        self.__has_pagination_data = False
+        self.__user_data = {"is_logged_in": False, "is_superuser": False} if append_user_data else None
+        self.__data = {}
+
+        for key, value in additional_response_data.items():
+            self[key] = value
+
+    @property
+    def humanizer(self) -> humanizers.BatchHumanizer:
+        """Current time is taken once per response for humanized dates."""
+        if self._humanizer is None:
+            self._humanizer = humanizers.BatchHumanizer()
+        return self._humanizer
 
     def add_data(self, **data):
         """
@@ -49,18 +101,83 @@ class ResponseManager:
         :param data: any number of keywords to add to response
         :return: None
         """
-        self.__response = {**self.__response, **data}
+        for key, value in data.items():
+            self[key] = value
 
     # For handling db query related !!
-    def add_list_view_data(self, response_field_name: str, objects: list, fields: dict):
+    def __apply_field_selection(self, objects, fields: dict, sparse: bool):
+        """Internally used by list helpers, provides `(objects, fields)` or None if selected fields are invalid."""
+        if not sparse:
+            return objects, fields
+
+        try:
+            return fieldsets.apply_field_selection(self.request.GET, objects, fields)
+        except exceptions.InvalidFieldSelection as e:
+            self.add_error_message(title="Invalid Fields", message=str(e))
+            return None
+
+    def add_list_view_data(self, response_field_name: str, objects: list, fields: dict, sparse: bool = False,
+                           db_json: bool = None):
         """Loops through all the objects and grabs data from fields and appends to list, then add data as provided response_field_name.
 
         @param response_field_name: adds data as this field in response data.
         @param objects: list of objects.
         @param fields: fields or callable, will be passed to serializer.
-        @return: None
+        @param sparse: if set `True`, clients can select fields with ``?fields=`` and ``?exclude=``, `request` is required.
+        @param db_json: if set `True`, querysets with column only `fields` are serialized by database, see
+                        `dbjson.get_json_array`, default is `COMMON_API_DB_JSON` (`False`).
+        @return: `False` if selected fields are invalid, error message is added in that case, else `True`.
+        """
+        if (selection := self.__apply_field_selection(objects, fields, sparse)) is None:
+            return False
+        objects, fields = selection
+
+        if db_json is None:
+            db_json = getattr(settings, "COMMON_API_DB_JSON", False)
+        if db_json and isinstance(objects, QuerySet):
+            if (array := dbjson.get_json_array(objects, fields)) is not None:
+                self.__data[response_field_name] = array
+                return True
+
+        with humanizers.batch_humanize(self.humanizer):
+            self.__data[response_field_name] = [obj.serialize(fields=fields) for obj in objects]  # NOQA
+        return True
+
+    async def aadd_list_view_data(self, response_field_name: str, objects, fields: dict, sparse: bool = False,
+                                  chunk_size: int = None):
+        """Async version of `add_list_view_data`, querysets are read with `aiterator()`.
+
+        Objects are serialized in chunks and control is given back to the event loop after each chunk, so that large
+        lists don't block other requests. Serialization runs in the event loop, relations used in `fields` must be
+        loaded with `select_related()`/`prefetch_related()` since lazy queries are not allowed there.
+
+        @param response_field_name: adds data as this field in response data.
+        @param objects: queryset or list of objects.
+        @param fields: fields or callable, will be passed to serializer.
+        @param sparse: if set `True`, clients can select fields with ``?fields=`` and ``?exclude=``, `request` is required.
+        @param chunk_size: objects serialized between yields, `COMMON_API_ASYNC_CHUNK_SIZE` (default 100) if not provided.
+        @return: `False` if selected fields are invalid, error message is added in that case, else `True`.
         """
-        self.__response[response_field_name] = [obj.serialize(fields=fields) for obj in objects]  # NOQA
+        if (selection := self.__apply_field_selection(objects, fields, sparse)) is None:
+            return False
+        objects, fields = selection
+        chunk_size = chunk_size or getattr(settings, "COMMON_API_ASYNC_CHUNK_SIZE", 100)
+
+        data = []
+        with humanizers.batch_humanize(self.humanizer):
+            if isinstance(objects, QuerySet):
+                async for obj in objects.aiterator(chunk_size=chunk_size):
+                    data.append(obj.serialize(fields=fields))
+                    if len(data) % chunk_size == 0:
+                        await asyncio.sleep(0)
+            else:
+                for obj in objects:
+                    data.append(obj.serialize(fields=fields))
+                    if len(data) % chunk_size == 0:
+                        await asyncio.sleep(0)
+
+        self.__data[response_field_name] = data
+        return True
 
     def add_db_data(self, response_field_name: str, object_, fields: dict):
         """Adds object serialized data to ``response_field_name``
@@ -70,7 +187,45 @@ class ResponseManager:
         :param fields: fields to be included in the response data
         :return: None
         """
-        self.__response[response_field_name] = object_.serialize(fields=fields)
+        with humanizers.batch_humanize(self.humanizer):
+            self.__data[response_field_name] = object_.serialize(fields=fields)
+
+    async def aadd_db_data(self, response_field_name: str, object_, fields: dict):
+        """Async version of `add_db_data`, if `object_` is a queryset the object is fetched with `aget()`.
+
+        Object is serialized through `sync_to_async`, so relations in `fields` which aren't loaded can be queried.
+
+        :param response_field_name: this will be the name of the field in response data.
+        :param object_: model object or queryset matching single object, `DoesNotExist` is raised by `aget()`.
+        :param fields: fields to be included in the response data
+        :return: serialized model object
+        """
+        if isinstance(object_, QuerySet):
+            object_ = await object_.aget()
+
+        await sync_to_async(self.add_db_data)(response_field_name, object_, fields)
+        return object_
+
+    def add_sync_data(self, response_field_name: str, queryset, fields: dict, cursor: str = None, limit: int = None):
+        """Adds rows modified after `cursor` as ``response_field_name``, deletions as ``deleted`` and next cursor in ``sync``.
+
+        :param response_field_name: this will be the name of the field in response data.
+        :param queryset: queryset of model inheriting `AbstractBaseSyncModel`.
+        :param fields: fields to be included in the response data.
+        :param cursor: cursor sent by the client, from ``sync.cursor`` of previous response.
+        :param limit: maximum number of rows, see `sync.get_changes`.
+        :return: `True` if data is added, `False` if the cursor is invalid, error message is added in that case.
+        """
+        try:
+            page = sync.get_changes(queryset, cursor=cursor, limit=limit)
+        except exceptions.InvalidCursor:
+            self.add_error_message(title="Invalid Cursor", message="Sync cursor is invalid, please sync again from start.")
+            return False
+
+        self.add_list_view_data(response_field_name, page.objects, fields)
+        self.__data["deleted"] = [tombstone.serialize() for tombstone in page.tombstones]
+        self.__data["sync"] = {"cursor": page.cursor, "has_more": page.has_more}
+        return True
 
     def add_paginator_data(self, paginator=None, page=None):
         """Provides support for paginator, auto adds data  !!
@@ -79,29 +234,45 @@ class ResponseManager:
         @param paginator: django paginator object
         @return: None
         """
+        pagination = self.__get_pagination()
         if paginator:
-            self.__response["pagination"]["total_results"] = paginator.count
+            pagination["total_results"] = paginator.count
 
         if page:
             if page.has_next():
-                self.__response["pagination"]["has_next_page"] = True  # NOQA
-                self.__response["pagination"]["next_page_number"] = page.next_page_number()
+                pagination["has_next_page"] = True  # NOQA
+                pagination["next_page_number"] = page.next_page_number()
             else:
-                self.__response["pagination"]["has_next_page"] = False  # NOQA
+                pagination["has_next_page"] = False  # NOQA
 
             if page.has_previous():
-                self.__response["pagination"]["has_previous_page"] = True  # NOQA
-                self.__response["pagination"]["previous_page_number"] = page.previous_page_number()
+                pagination["has_previous_page"] = True  # NOQA
+                pagination["previous_page_number"] = page.previous_page_number()
             else:
-                self.__response["pagination"]["has_previous_page"] = False  # NOQA
+                pagination["has_previous_page"] = False  # NOQA
 
-        self.__response["has_pagination_data"] = True
+        self.__has_pagination_data = True
 
     # For handling messages && notification related stuff.
+    def __get_messages(self) -> dict:
+        if self.__messages is None:
+            self.__messages = {type_: [] for type_ in MESSAGE_TYPES}
+        return self.__messages
+
+    def __get_field_errors(self) -> dict:
+        if self.__field_errors is None:
+            self.__field_errors = {}
+        return self.__field_errors
+
+    def __get_pagination(self) -> dict:
+        if self.__pagination is None:
+            self.__pagination = {}
+        return self.__pagination
+
     def __add_message(self, title, message, type_):
         """Internally used for adding message to response data"""
         try:
-            self.__response["messages"][type_].append({"title": title, "message": message, "type": type_})
+            self.__get_messages()[type_].append({"title": title, "message": message, "type": type_})
         except KeyError:
             raise exceptions.NotSupported(f"support for message type ``{type_}`` not available.")
 
@@ -123,27 +294,95 @@ class ResponseManager:
 
     def add_form_errors(self, form: (JsonModelForm, dict)):
         """Adds field error from ``JsonModelForm`` or provided dict."""
-        self.__response["field_errors"] = form if type(form) is dict else form.get_errors()
-        return self.__response["field_errors"]
+        self.__field_errors = form if type(form) is dict else form.get_errors()
+        return self.__field_errors
 
     def has_errors(self, include_field_errors=False):
         """Checks if there is error in response data."""
-        if (include_field_errors and (
-                self.__response["messages"]["error"] or self.__response["field_errors"]
-        )) or self.__response["messages"]["error"]:
+        if (include_field_errors and self.__field_errors) or (self.__messages and self.__messages.get("error")):
             return True
         else:
             return False
 
     # For handling final data !!
-    def __add_user_data(self):
+    def __add_user_data(self, user=None):
         if self.append_user_data:
             # for user related jobs !!
-            is_logged_in = self.request.user.is_authenticated
-            self.__response["is_logged_in"] = is_logged_in
+            user = user or self.request.user
+            is_logged_in = user.is_authenticated
+            self.__user_data["is_logged_in"] = is_logged_in
 
             if is_logged_in:
-                self.__response["is_superuser"] = self.request.user.is_superuser
+                self.__user_data["is_superuser"] = user.is_superuser
+
+    def __build_head(self) -> dict:
+        """Provides envelope without data added with `add_data` etc, in order of the envelope."""
+        if self.compact:
+            head = {"envelope_version": ENVELOPE_VERSION, "has_errors": self.has_errors()}
+            if self.__messages and (messages := {type_: items for type_, items in self.__messages.items() if items}):
+                head["messages"] = messages
+            if self.__field_errors:
+                head["field_errors"] = self.__field_errors
+            if self.__has_pagination_data:
+                head["pagination"] = self.__get_pagination()
+        else:
+            head = {
+                "messages": self.__get_messages(),  # list of messages to be send in frontend.
+                "field_errors": self.__get_field_errors(),
+                "has_errors": self.has_errors(),  # For Knowing if the response contains any error.
+                "pagination": self.__get_pagination(),
+                "has_pagination_data": self.__has_pagination_data,
+            }
+
+        if self.__user_data is not None:
+            head.update(self.__user_data)
+        return head
+
+    def __build(self, decode_raw: bool = True) -> dict:
+        envelope = self.__build_head()
+        for key, value in self.__data.items():
+            envelope[key] = value.decode() if decode_raw and isinstance(value, dbjson.RawJSON) else value
+        return envelope
+
+    def __encode(self, encoder) -> bytes:
+        """Encodes envelope same as `json.dumps(envelope, cls=encoder)`, static head is spliced from `_HEAD_FRAGMENTS`."""
+        if (
+                self.__messages is None and not self.__field_errors and
+                self.__pagination is None and not self.__has_pagination_data
+        ):
+            key = (self.compact, tuple(self.__user_data.items()) if self.__user_data is not None else None)
+            head = _HEAD_FRAGMENTS.get(key)
+            if head is None:
+                head = _HEAD_FRAGMENTS[key] = json.dumps(self.__build_head())[:-1]
+                self.__messages = self.__field_errors = self.__pagination = None  # Built head isn't used !!
+        else:
+            head = json.dumps(self.__build_head(), cls=encoder)[:-1]
+
+        if not self.__data:
+            return f"{head}}}".encode()
+
+        raw = {key: value.fragment for key, value in self.__data.items() if isinstance(value, dbjson.RawJSON)}
+        if not raw:
+            return f"{head}, {json.dumps(self.__data, cls=encoder)[1:]}".encode()
+
+        while True:
+            # Placeholder strings are replaced by the fragments after encoding, new token if data contains one !!
+            placeholders = _get_placeholders(raw)
+            content = f"{head}, {json.dumps({**self.__data, **placeholders}, cls=encoder)[1:]}".encode()
+            if (spliced := _splice(content, placeholders, raw)) is not None:
+                return spliced
+
+    def __record_metrics(self, response):
+        """Records envelope stats, see `metrics.record_envelope`, lists and database arrays are counted as rows."""
+        if not metrics.enabled():
+            return
+        rows = 0
+        for value in self.__data.values():
+            if isinstance(value, list):
+                rows += len(value)
+            elif isinstance(value, dbjson.RawJSON) and value.rows:
+                rows += value.rows
+        metrics.record_envelope(self.has_errors(), len(response.content), rows)
 
     def compile(self, raw, *args, **kwargs):
         """
@@ -155,8 +394,54 @@ class ResponseManager:
         :return: `dict` of response data or JsonResponse object
         """
         self.__add_user_data()
-        self.__response["has_errors"] = self.has_errors()
-        return self.__response if raw else JsonResponse(self.__response, *args, **kwargs)
+        if raw:
+            return self.__build()
+
+        if args or kwargs.get("json_dumps_params") or kwargs.get("safe") is False:
+            response = JsonResponse(self.__build(), *args, **kwargs)
+            response.envelope = self.__build()
+            self.__record_metrics(response)
+            return response
+
+        kwargs.pop("safe", None)
+        kwargs.pop("json_dumps_params", None)
+        content = self.__encode(kwargs.pop("encoder", DjangoJSONEncoder))
+        response = EnvelopeResponse(content, self.__build, **kwargs)  # Envelope is used by batch view !!
+        self.__record_metrics(response)
+        return response
+
+    async def acompile(self, raw=False, encoder=DjangoJSONEncoder, json_dumps_params=None, **kwargs):
+        """
+        Async version of `compile`, large responses are encoded outside the event loop, see `encoding.aencode`.
+
+        :param raw: if set true raw `dict` will be returned, else HttpResponse will be returned
+        :param encoder: json encoder class, same as of JsonResponse
+        :param json_dumps_params: keyword arguments for `json.dumps`, same as of JsonResponse
+        :param kwargs: keyword arguments accepted by HttpResponse
+        :return: `dict` of response data or JsonResponse object with same content as of `compile`
+        """
+        user = None
+        if self.append_user_data and hasattr(self.request, "auser"):
+            user = await self.request.auser()  # Lazy `request.user` would query in the event loop !!
+        self.__add_user_data(user)
+        if raw:
+            return self.__build()
+
+        # Database built JSON is spliced same as in `compile`, not decoded and encoded again !!
+        envelope = self.__build(decode_raw=False)
+        raw_data = {key: value.fragment for key, value in envelope.items() if isinstance(value, dbjson.RawJSON)}
+        while True:
+            placeholders = _get_placeholders(raw_data) if raw_data else {}
+            content = await encoding.aencode({**envelope, **placeholders}, encoder, json_dumps_params)
+            if not raw_data:
+                break
+            if (spliced := _splice(content, placeholders, raw_data)) is not None:
+                content = spliced
+                break
+
+        response = EnvelopeResponse(content, self.__build, **kwargs)
+        self.__record_metrics(response)
+        return response
 
     def __call__(self, raw=False, *args, **kwargs) -> (dict, JsonResponse):
         """
@@ -172,7 +457,34 @@ class ResponseManager:
 
     # For additional Functionality !!
     def __setitem__(self, key, value):
-        self.__response[key] = value
+        if key == "messages":
+            self.__messages = value
+        elif key == "field_errors":
+            self.__field_errors = value
+        elif key == "pagination":
+            self.__pagination = value
+        elif key == "has_pagination_data":
+            self.__has_pagination_data = value
+        elif key == "has_errors":
+            pass  # Computed while compiling !!
+        elif self.__user_data is not None and key in self.__user_data:
+            self.__user_data[key] = value
+        else:
+            self.__data[key] = value
 
     def __getitem__(self, item):
-        return self.__response[item]
+        if item in self.__data:
+            return self.__data[item]
+        if item == "messages":
+            return self.__get_messages()
+        if item == "field_errors":
+            return self.__get_field_errors()
+        if item == "pagination":
+            return self.__get_pagination()
+        if item == "has_pagination_data":
+            return self.__has_pagination_data
+        if item == "has_errors":
+            return self.has_errors()
+        if self.__user_data is not None and item in self.__user_data:
+            return self.__user_data[item]
+        raise KeyError(item)
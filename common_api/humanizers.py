@@ -0,0 +1,157 @@
+from django.utils import timezone
+from django.utils.html import avoid_wrapping
+from django.utils.translation import get_language, gettext
+
+import datetime
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+MONTHS_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+TIME_CHUNKS = (60 * 60 * 24 * 7, 60 * 60 * 24, 60 * 60, 60)  # week, day, hour, minute
+TIME_STRINGS_KEYS = ("year", "month", "week", "day", "hour", "minute")
+MAX_MEMO_SIZE = 10000
+
+_active_humanizer = ContextVar("common_api_active_humanizer", default=None)
+_memo = {}  # `{(bucket, language): formatted_string}`, shared by all humanizers.
+_memo_lock = threading.Lock()
+
+
+def _timesince_bucket(d, now, depth=2):
+    """Same calculation as `django.utils.timesince.timesince`, but returns units instead of formatted string."""
+    total_months = (now.year - d.year) * 12 + (now.month - d.month)
+    if d.day > now.day or (d.day == now.day and d.time() > now.time()):
+        total_months -= 1
+    years, months = divmod(total_months, 12)
+
+    if years or months:
+        pivot_year = d.year + years
+        pivot_month = d.month + months
+        if pivot_month > 12:
+            pivot_month -= 12
+            pivot_year += 1
+        pivot = datetime.datetime(
+            pivot_year, pivot_month, min(MONTHS_DAYS[pivot_month - 1], d.day),
+            d.hour, d.minute, d.second, tzinfo=d.tzinfo,
+        )
+    else:
+        pivot = d
+
+    remaining_time = (now - pivot).total_seconds()
+    partials = [years, months]
+    for chunk in TIME_CHUNKS:
+        count = int(remaining_time // chunk)
+        partials.append(count)
+        remaining_time -= chunk * count
+
+    units = []
+    for index, value in enumerate(partials):
+        if value != 0:
+            while index < len(TIME_STRINGS_KEYS) and len(units) < depth and partials[index] != 0:
+                units.append((TIME_STRINGS_KEYS[index], partials[index]))
+                index += 1
+            break
+    return tuple(units)
+
+
+def _format_bucket(bucket):
+    from django.contrib.humanize.templatetags.humanize import NaturalTimeFormatter
+
+    name, value = bucket
+    if name in ("past-day", "future-day"):
+        substrings = NaturalTimeFormatter.past_substrings if name == "past-day" else NaturalTimeFormatter.future_substrings
+        if value:
+            delta = gettext(", ").join(avoid_wrapping(substrings[unit] % {"num": num}) for unit, num in value)
+        else:
+            delta = avoid_wrapping(substrings["minute"] % {"num": 0})
+        return NaturalTimeFormatter.time_strings[name] % {"delta": delta}
+    if name == "now":
+        return NaturalTimeFormatter.time_strings["now"]
+    return NaturalTimeFormatter.time_strings[name] % {"count": value}
+
+
+class BatchHumanizer:
+    """Same output as `naturaltime`, but current time is taken once and formatted strings are memoized.
+
+    Values are reduced to the units shown in the output (e.g. `("past-minute", 5)`), and each of them is
+    formatted only once per active language, so humanizing thousands of rows doesn't translate and format
+    the same string again and again.
+    """
+
+    def __init__(self, now: datetime.datetime = None):
+        """
+        :param now: aware time to which values are compared, current time on first use if not provided.
+        """
+        self._now = now
+        self._naive_now = None
+
+    @property
+    def now(self) -> datetime.datetime:
+        if self._now is None:
+            self._now = datetime.datetime.now(datetime.timezone.utc)
+        return self._now
+
+    @property
+    def naive_now(self) -> datetime.datetime:
+        """Current local time without timezone, naive values are compared to it same as `naturaltime` does."""
+        if self._naive_now is None:
+            self._naive_now = self.now.astimezone().replace(tzinfo=None)
+        return self._naive_now
+
+    def get_bucket(self, value: datetime.datetime) -> tuple:
+        """Provides units that are shown in `naturaltime` output for the value."""
+        now = self.now if timezone.is_aware(value) else self.naive_now
+
+        past = value < now
+        delta = now - value if past else value - now
+        direction = "past" if past else "future"
+
+        if delta.days != 0:
+            if timezone.is_aware(value):
+                now = now.astimezone(value.tzinfo)
+            return f"{direction}-day", _timesince_bucket(value, now) if past else _timesince_bucket(now, value)
+        if delta.seconds == 0:
+            return "now", None
+        if delta.seconds < 60:
+            return f"{direction}-second", delta.seconds
+        if delta.seconds // 60 < 60:
+            return f"{direction}-minute", delta.seconds // 60
+        return f"{direction}-hour", delta.seconds // 60 // 60
+
+    def __call__(self, value):
+        if not isinstance(value, datetime.datetime):
+            from django.contrib.humanize.templatetags.humanize import naturaltime
+            return naturaltime(value)
+
+        key = (self.get_bucket(value), get_language())
+        try:
+            return _memo[key]
+        except KeyError:
+            pass
+
+        formatted = str(_format_bucket(key[0]))
+        with _memo_lock:
+            if len(_memo) >= MAX_MEMO_SIZE:
+                _memo.clear()
+            _memo[key] = formatted
+        return formatted
+
+
+@contextmanager
+def batch_humanize(humanizer: BatchHumanizer = None):
+    """Makes `naturaltime` use the same `BatchHumanizer` inside the block."""
+    token = _active_humanizer.set(humanizer or BatchHumanizer())
+    try:
+        yield _active_humanizer.get()
+    finally:
+        _active_humanizer.reset(token)
+
+
+def naturaltime(value):
+    """Humanizes value with the active `BatchHumanizer`, or with django's `naturaltime` outside `batch_humanize`."""
+    humanizer = _active_humanizer.get()
+    if humanizer is not None:
+        return humanizer(value)
+
+    from django.contrib.humanize.templatetags.humanize import naturaltime as django_naturaltime
+    return django_naturaltime(value)
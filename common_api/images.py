@@ -0,0 +1,271 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+import io
+import os
+import struct
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes from the start of a file which is enough to know the format and size of most images.
+IMAGE_HEADER_SIZE = 64 * 1024
+
+ImageHeader = namedtuple("ImageHeader", ["format", "width", "height"])
+
+_JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+}
+
+
+def sniff_image_format(header: bytes) -> (str, None):
+    """Detects image format from the magic bytes at the start of the file.
+
+    :param header: first bytes of the file, 12 bytes are enough for every supported format.
+    :return: one of `jpeg`, `png`, `gif`, `webp`, `bmp` or None if the format is unknown.
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "webp"
+    if header.startswith(b"BM"):
+        return "bmp"
+    return None
+
+
+def _png_size(header):
+    if header[12:16] == b"IHDR" and len(header) >= 24:
+        return struct.unpack(">II", header[16:24])
+
+
+def _gif_size(header):
+    if len(header) >= 10:
+        return struct.unpack("<HH", header[6:10])
+
+
+def _bmp_size(header):
+    if len(header) < 26:
+        return None
+    dib_size = struct.unpack("<I", header[14:18])[0]
+    if dib_size == 12:
+        return struct.unpack("<HH", header[18:22])
+    width, height = struct.unpack("<ii", header[18:26])
+    return abs(width), abs(height)
+
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and len(header) >= 30 and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(header) >= 25 and header[20] == 0x2F:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30:
+        return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+
+
+def _jpeg_size(header):
+    index = 2
+    length = len(header)
+    while index + 9 <= length:
+        if header[index] != 0xFF:
+            return None
+        marker = header[index + 1]
+        if marker == 0xFF:  # Fill byte !!
+            index += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # Markers without payload !!
+            index += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", header[index + 5:index + 9])
+            return width, height
+        if marker in (0xD9, 0xDA):  # End of image or start of scan, no frame header found !!
+            return None
+        index += 2 + struct.unpack(">H", header[index + 2:index + 4])[0]
+    return None
+
+
+_SIZE_READERS = {
+    "png": _png_size,
+    "gif": _gif_size,
+    "bmp": _bmp_size,
+    "webp": _webp_size,
+    "jpeg": _jpeg_size,
+}
+
+
+def sniff_image_header(header: bytes) -> (ImageHeader, None):
+    """Reads image format and pixel dimensions from the header only, without decoding the image.
+
+    :param header: first bytes of the file, `IMAGE_HEADER_SIZE` bytes are enough for most images.
+    :return: `ImageHeader`, width and height are None if they are not present in provided bytes,
+             or None if the format is not recognized.
+    """
+    format_ = sniff_image_format(header)
+    if format_ is None:
+        return None
+
+    try:
+        size = _SIZE_READERS[format_](header)
+    except struct.error:
+        size = None
+
+    width, height = size or (None, None)
+    return ImageHeader(format_, width, height)
+
+
+def read_image_size(file) -> (tuple, None):
+    """Reads `(width, height)` with Pillow, which parses as much of the file as needed without decoding pixels.
+
+    Used for headers `sniff_image_header` can't read, like JPEG with metadata larger than `IMAGE_HEADER_SIZE`.
+
+    :return: `(width, height)` or None if Pillow isn't installed or can't read the file.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    position = file.tell()
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            return image.size
+    except Exception:  # NOQA, includes `DecompressionBombError` !!
+        return None
+    finally:
+        file.seek(position)
+
+
+# Variant processing !!
+_executor = None
+_process_executor = None
+_pending_jobs = None
+_executor_lock = threading.Lock()
+
+
+def _get_executors():
+    """Lazily creates bounded executors, so that importing this module never starts threads or processes."""
+    global _executor, _process_executor, _pending_jobs
+
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+            workers = getattr(settings, "COMMON_API_IMAGE_WORKERS", 2)
+            _pending_jobs = threading.BoundedSemaphore(getattr(settings, "COMMON_API_IMAGE_MAX_PENDING_JOBS", 100))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="common_api_images")
+
+            if getattr(settings, "COMMON_API_IMAGE_EXECUTOR", "thread") == "process":
+                _process_executor = ProcessPoolExecutor(max_workers=workers)
+
+    return _executor, _process_executor, _pending_jobs
+
+
+def render_variants(data: bytes, sizes: dict, format_: str = "WEBP", quality: int = 80) -> dict:
+    """Resizes and re-encodes image in all the provided sizes, image is decoded only once.
+
+    :param data: content of the original image.
+    :param sizes: `{variant_name: (width, height)}`, images are cropped from center to fit the size.
+    :param format_: format accepted by Pillow for encoding the variants.
+    :param quality: encoding quality for lossy formats.
+    :return: `{variant_name: encoded_bytes}`
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    largest = max(sizes.values())
+    image.draft("RGB", (largest[0] * 2, largest[1] * 2))  # Lets JPEG decoder skip full resolution decoding !!
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") and format_.upper() != "JPEG" else "RGB")
+
+    variants = {}
+    for name, size in sizes.items():
+        output = io.BytesIO()
+        ImageOps.fit(image, size, Image.LANCZOS).save(output, format_, quality=quality)
+        variants[name] = output.getvalue()
+    return variants
+
+
+def get_variant_name(name: str, variant: str, format_: str) -> str:
+    """Storage name of `variant` of the picture `name`, same for every upload so old variants can be deleted."""
+    return f"{os.path.splitext(name)[0]}_{variant}.{format_.lower()}"
+
+
+def generate_profile_picture_variants(model, pk, name: str) -> (dict, None):
+    """Generates profile picture variants for the user and stores their urls in `profile_picture_variants`.
+
+    :param model: user model inheriting from `AbstractCommonUser`.
+    :param pk: primary key of the user.
+    :param name: name of the uploaded picture in storage, variants are not stored if the picture has changed since.
+    :return: `{variant_name: url}` or None if the picture has changed.
+    """
+    storage = model._meta.get_field("profile_picture").storage
+    format_ = model.PROFILE_PICTURE_VARIANT_FORMAT
+
+    with storage.open(name, "rb") as file:
+        data = file.read()
+
+    _, process_executor, _ = _get_executors()
+    args = (data, model.PROFILE_PICTURE_VARIANTS, format_, model.PROFILE_PICTURE_VARIANT_QUALITY)
+    if process_executor is not None:
+        variants = process_executor.submit(render_variants, *args).result()
+    else:
+        variants = render_variants(*args)
+
+    urls = {}
+    for variant, content in variants.items():
+        variant_name = get_variant_name(name, variant, format_)
+        storage.delete(variant_name)  # Left by an earlier job for the same picture !!
+        urls[variant] = storage.url(storage.save(variant_name, ContentFile(content)))
+
+    updated = model._base_manager.filter(pk=pk, profile_picture=name).update(profile_picture_variants=urls)
+    return urls if updated else None
+
+
+def delete_profile_picture_variants(model, name: str) -> None:
+    """Deletes stored variants of the replaced picture `name`."""
+    storage = model._meta.get_field("profile_picture").storage
+    for variant in model.PROFILE_PICTURE_VARIANTS:
+        storage.delete(get_variant_name(name, variant, model.PROFILE_PICTURE_VARIANT_FORMAT))
+
+
+def _run_job(function, *args):
+    try:
+        function(*args)
+    except Exception:  # NOQA
+        logger.exception("Image processing job ``%s`` failed.", function.__name__)
+    finally:
+        _pending_jobs.release()
+        close_old_connections()
+
+
+def submit_job(function, *args) -> bool:
+    """Submits `function(*args)` to the image job queue, returns `False` if the queue is full."""
+    executor, _, pending_jobs = _get_executors()
+    if not pending_jobs.acquire(blocking=False):
+        logger.warning("Image job queue is full, ``%s`` skipped.", function.__name__)
+        return False
+
+    executor.submit(_run_job, function, *args)
+    return True
+
+
+def schedule_profile_picture_variants(user) -> None:
+    """Generates variants for `user.profile_picture` outside the request thread, after the transaction is committed."""
+    model, pk, name = type(user), user.pk, user.profile_picture.name
+    transaction.on_commit(lambda: submit_job(generate_profile_picture_variants, model, pk, name))
+
+
+def schedule_profile_picture_variants_deletion(model, name: str) -> None:
+    """Deletes variants of the replaced picture `name` outside the request thread, after the transaction is committed."""
+    transaction.on_commit(lambda: submit_job(delete_profile_picture_variants, model, name))
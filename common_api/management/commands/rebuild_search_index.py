@@ -0,0 +1,31 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from common_api import search
+from common_api.models import AbstractBaseSlugModel
+
+
+class Command(BaseCommand):
+    help = "Rebuilds search index of models with `SEARCH_FIELDS`, streaming their tables in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="models as `app_label.ModelName`, every indexed model if omitted")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="rows read and indexed at once")
+
+    def handle(self, *args, **options):
+        if options["models"]:
+            try:
+                models = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+        else:
+            models = [
+                model for model in apps.get_models()
+                if issubclass(model, AbstractBaseSlugModel) and search.get_search_fields(model)
+            ]
+
+        for model in models:
+            if not search.get_search_fields(model):
+                raise CommandError(f"``{model._meta.label}`` has no ``SEARCH_FIELDS``.")
+            count = search.rebuild(model, chunk_size=options["chunk_size"])
+            self.stdout.write(f"Indexed {count} rows of {model._meta.label}.")
@@ -0,0 +1,345 @@
+from django.conf import settings
+
+import os
+import json
+import time
+import atexit
+import bisect
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows, files of dead processes are summed but not merged !!
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"))
+TOMBSTONE_FILE = "metrics_tombstone.json"
+
+
+def enabled() -> bool:
+    """Envelope and decorator metrics are recorded only with `COMMON_API_METRICS = True`."""
+    return getattr(settings, "COMMON_API_METRICS", False)
+
+
+class Metric:
+    type_ = None
+
+    def __init__(self, registry, name: str, help_: str, labelnames: (list, tuple) = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+
+    def get_key(self, labels: dict) -> tuple:
+        return self.name, tuple(str(labels[label]) for label in self.labelnames)
+
+
+class Counter(Metric):
+    type_ = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        self.registry.add(self.get_key(labels), amount)
+
+
+class Histogram(Metric):
+    type_ = "histogram"
+
+    def __init__(self, registry, name: str, help_: str, labelnames: (list, tuple) = (), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        self.registry.observe(self.get_key(labels), self.buckets, value)
+
+
+class Registry:
+    """In-process metrics, shared with other worker processes through files in `COMMON_API_METRICS_DIR`.
+
+    Each process writes its values to `metrics_<pid>_<start>.json` from a background thread every
+    `COMMON_API_METRICS_FLUSH_SECONDS` (default `1`) and at exit, exposition sums files of every process. Files of
+    processes which are gone, or whose file wasn't written for `COMMON_API_METRICS_STALE_SECONDS` (default `60`),
+    are merged into `metrics_tombstone.json` and removed, so totals never drop and the directory doesn't grow with
+    restarted workers. The directory must be local to the host. Without it only this process is exposed.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # `{name: Metric}`
+        self.values = {}  # `{(name, label_values): value or [bucket_counts, sum, count]}`
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def directory(self) -> (str, None):
+        return getattr(settings, "COMMON_API_METRICS_DIR", None)
+
+    @property
+    def flush_seconds(self) -> float:
+        return getattr(settings, "COMMON_API_METRICS_FLUSH_SECONDS", 1)
+
+    @property
+    def stale_seconds(self) -> float:
+        return getattr(settings, "COMMON_API_METRICS_STALE_SECONDS", 60)
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(self, name, *args, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name: str, help_: str, labelnames: (list, tuple) = ()) -> Counter:
+        return self._register(Counter, name, help_, labelnames)
+
+    def histogram(self, name: str, help_: str, labelnames: (list, tuple) = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_, labelnames, buckets=buckets)
+
+    def reset(self):
+        """Drops values and the flushing thread, forked processes start with their own file."""
+        self._lock = threading.Lock()
+        self.values = {}
+        self._pid = os.getpid()
+        self._file_name = f"metrics_{self._pid}_{time.time_ns()}.json"  # Pid alone is reused by new processes !!
+        self._thread = None
+
+    # Recording !!
+    def add(self, key: tuple, amount: float):
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        if self._thread is None:
+            self.start()
+
+    def observe(self, key: tuple, buckets: tuple, value: float):
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(buckets) + 1), 0, 0]
+            entry[0][bisect.bisect_left(buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+        if self._thread is None:
+            self.start()
+
+    # Sharing between processes !!
+    def get_path(self, name: str = None) -> str:
+        return os.path.join(self.directory, name or self._file_name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            values = [[name, list(labels), value] for (name, labels), value in self.values.items()]
+        return {"pid": self._pid, "updated_at": time.time(), "values": values}
+
+    def start(self):
+        """Starts the thread writing the file of this process, requests never wait for file I/O."""
+        with self._lock:
+            if self._thread is not None or self.directory is None:
+                return
+            self._thread = threading.Thread(target=self._run, name="common_api_metrics", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing metrics to ``%s`` failed.", self.directory)
+
+    def flush(self):
+        """Writes values of this process to its file, file is replaced atomically."""
+        if self.directory is None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path()
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Process of another user !!
+        return True
+
+    def read(self, name: str) -> (dict, None):
+        try:
+            with open(self.get_path(name)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None  # File of a process being written or removed !!
+
+    def write(self, name: str, snapshot: dict):
+        path = self.get_path(name)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(temporary_path, path)
+
+    def is_dead(self, snapshot: dict) -> bool:
+        try:
+            return not self.is_alive(snapshot["pid"]) or time.time() - snapshot["updated_at"] > self.stale_seconds
+        except (KeyError, TypeError):
+            return True  # File without heartbeat, written by an older version !!
+
+    def merge_dead(self, snapshots: dict, temporary_files: list = ()) -> dict:
+        """Adds values of dead processes to the tombstone file and removes their files, provides the tombstone.
+
+        Merged file names are kept in the tombstone until the files are gone, so a file is never added twice.
+        Temporary files left by processes killed while writing are removed as well.
+        """
+        with open(self.get_path("metrics.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                tombstone = self.read(TOMBSTONE_FILE) or {"values": [], "merged": []}
+                merged = set(tombstone["merged"])
+                dead = [name for name, snapshot in snapshots.items() if self.is_dead(snapshot)]
+
+                new = [name for name in dead if name not in merged]
+                if new:
+                    tombstone["values"] = [
+                        [name, list(labels), value] for (name, labels), value in
+                        sum_snapshots([tombstone, *(snapshots[name] for name in new)]).items()
+                    ]
+                    tombstone["merged"] = [name for name in {*merged, *new} if os.path.exists(self.get_path(name))]
+                    self.write(TOMBSTONE_FILE, tombstone)
+
+                for name in temporary_files:
+                    try:
+                        if time.time() - os.path.getmtime(self.get_path(name)) > self.stale_seconds:
+                            dead.append(name)
+                    except FileNotFoundError:
+                        pass
+
+                for name in dead:
+                    try:
+                        os.remove(self.get_path(name))
+                    except FileNotFoundError:
+                        pass
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return tombstone
+
+    def collect(self) -> dict:
+        """Sums values of this process, files of other processes and the tombstone, `{(name, label_values): value}`."""
+        snapshots = [self.snapshot()]
+        if self.directory is not None and os.path.isdir(self.directory):
+            others, temporary_files = {}, []
+            for name in os.listdir(self.directory):
+                if not name.startswith("metrics_") or name == TOMBSTONE_FILE or name.startswith(self._file_name):
+                    continue
+                if name.endswith(".json"):
+                    if (snapshot := self.read(name)) is not None:
+                        others[name] = snapshot
+                elif name.endswith(".tmp"):
+                    temporary_files.append(name)
+
+            if fcntl is not None:
+                tombstone = self.merge_dead(others, temporary_files)
+                merged = set(tombstone["merged"])
+                snapshots.extend(snapshot for name, snapshot in others.items() if name not in merged)
+                snapshots.append(tombstone)
+            else:
+                snapshots.extend(others.values())
+        return sum_snapshots(snapshots)
+
+    def expose(self) -> str:
+        """Provides every metric in Prometheus text exposition format."""
+        collected = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type_}")
+            for (metric_name, labels), value in sorted(collected.items()):
+                if metric_name != name:
+                    continue
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.type_ == "histogram":
+                    cumulative = 0
+                    for bound, count in zip((*metric.buckets, "+Inf"), value[0]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels([*pairs, ('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(pairs)} {value[1]}")
+                    lines.append(f"{name}_count{format_labels(pairs)} {value[2]}")
+                else:
+                    lines.append(f"{name}{format_labels(pairs)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def sum_snapshots(snapshots: list) -> dict:
+    collected = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["values"]:
+            key = name, tuple(labels)
+            if isinstance(value, list):
+                entry = collected.setdefault(key, [[0] * len(value[0]), 0, 0])
+                entry[0] = [total + count for total, count in zip(entry[0], value[0])]
+                entry[1] += value[1]
+                entry[2] += value[2]
+            else:
+                collected[key] = collected.get(key, 0) + value
+    return collected
+
+
+def format_labels(pairs: list) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        f'{label}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), "")}"'
+        for label, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)  # Values of parent process are exposed by its own file !!
+atexit.register(registry.flush)
+
+requests_total = registry.counter(
+    "common_api_requests_total", "Requests handled, by view, method and status.", ("view", "method", "status")
+)
+request_duration = registry.histogram(
+    "common_api_request_duration_seconds", "Request latency, by view and method.", ("view", "method")
+)
+envelopes_total = registry.counter(
+    "common_api_envelopes_total", "ResponseManager responses compiled, by error state.", ("has_errors",)
+)
+envelope_size = registry.histogram(
+    "common_api_envelope_bytes", "Encoded size of ResponseManager responses.", buckets=SIZE_BUCKETS
+)
+rows_serialized = registry.counter(
+    "common_api_rows_serialized_total", "Objects serialized into ResponseManager responses."
+)
+rejections_total = registry.counter(
+    "common_api_decorator_rejections_total", "Requests rejected by common_api decorators.", ("decorator",)
+)
+
+
+def record_request(request, response, duration: float):
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match is not None else "<unresolved>"
+    # Methods are sent by clients, any other value would add a series !!
+    method = request.method if request.method in HTTP_METHODS else "other"
+    requests_total.inc(view=view, method=method, status=response.status_code)
+    request_duration.observe(duration, view=view, method=method)
+
+
+def record_envelope(has_errors: bool, size: int, rows: int):
+    if enabled():
+        envelopes_total.inc(has_errors="true" if has_errors else "false")
+        envelope_size.observe(size)
+        if rows:
+            rows_serialized.inc(rows)
+
+
+def record_rejection(decorator: str):
+    if enabled():
+        rejections_total.inc(decorator=decorator)
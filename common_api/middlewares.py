@@ -1,7 +1,10 @@
 import json
+import time
 from django.conf import settings
 from django.contrib.sessions.middleware import SessionMiddleware
 
+from common_api import metrics, routers
+
 
 class JsonSessionMiddleware(SessionMiddleware):
     def process_request(self, request):
@@ -31,3 +34,35 @@ class JsonToPOSTMiddleware:
 
         res = self.get_response(request)
         return res
+
+
+class ReadYourWritesMiddleware:
+    """Tracks writes of every request, the client is pinned to primary database after writing, see `routers.ReplicaRouter`.
+
+    With `COMMON_API_READ_YOUR_WRITES_STORAGE = "session"` it must be placed after the session middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routers.database_state() as state:
+            response = self.get_response(request)
+
+            if state.wrote:
+                routers.pin_to_primary(request, response)
+
+        return response
+
+
+class MetricsMiddleware:
+    """Records count, status and latency of every request by view name, see `metrics`, place it first to time the others."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        metrics.record_request(request, response, time.perf_counter() - start)
+        return response
@@ -1,19 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import gettext_lazy as __, slugify
-from django.contrib.humanize.templatetags import humanize
 from django.http.request import HttpRequest
-from django.contrib.auth.models import AbstractUser
 
 import uuid
 import secrets
+import functools
 
-from common import utils
-from common import validators
-from .constants import COUNTRY_CODE
+from common_api import utils, humanizers, queries, counters, slugs
+from common_api.fields import TimeOrderedUUIDField
+from common_api.slugs import slug_resolver
 
 
 class AbstractBaseModel(models.Model):
     """Abstract Base model to inherit from, it makes sure every model has time stamp."""
+    # Columns used by methods/properties that can appear in serialization `fields`, used for column pruning.
+    FIELD_DEPENDENCIES = {
+        "humanized_creation_date": ("creation_date",),
+        "humanized_update_date": ("update_date",),
+    }
+
     creation_date = models.DateTimeField(
         verbose_name=__("Creation Date"),
         help_text=__("Date of creation of the object."),
@@ -56,11 +61,11 @@ class AbstractBaseModel(models.Model):
     # Better Data representation and shortcuts !!
     def humanized_creation_date(self) -> str:
         """Provides human readable creation time"""
-        return humanize.naturaltime(self.creation_date)
+        return humanizers.naturaltime(self.creation_date)
 
     def humanized_update_date(self) -> str:
         """Provides human readable update time"""
-        return humanize.naturaltime(self.update_date)
+        return humanizers.naturaltime(self.update_date)
 
     # Functions to override !!
     def get_excluded_fields(self) -> set:
@@ -69,6 +74,18 @@ class AbstractBaseModel(models.Model):
         the fields returned from it will always be excluded if some data is to be returned.
         """
 
+    # Counters !!
+    def increment_counter(self, field: str, amount: int = 1) -> None:
+        """Adds `amount` to integer `field` without `save()`, written with other buffered increments, see `counters`.
+
+        `update_date` isn't changed and the instance attribute isn't updated, read it with `get_counter`.
+        """
+        counters.increment(type(self), self.pk, field, amount, self._state.db)
+
+    def get_counter(self, field: str) -> int:
+        """Provides value of counter `field` including increments of this process not written yet."""
+        return counters.get_value(self, field)
+
     # Core functions !!
     def is_new(self):
         """To check if the field is new or not."""
@@ -89,6 +106,15 @@ class AbstractBaseModel(models.Model):
         return fields if as_list else {key: key for key in fields}
 
     def serialize_json(self, fields):
+        if queries.is_recording():
+            # Queries are attributed to the field path, so that N+1 patterns can be traced back to the field !!
+            return {
+                frontend_field: queries.call_with_field_path(
+                    f"{type(self).__name__}.{fields[frontend_field]}", utils.get_attr, self, fields[frontend_field]
+                )
+                for frontend_field in fields
+            }
+
         return {
             frontend_field: utils.get_attr(self, fields[frontend_field])
             for frontend_field in fields
@@ -106,18 +132,79 @@ class AbstractBaseModel(models.Model):
         :return: obj data in json format
         """
         fields = fields if fields is not None else self.get_fields()
-        if _exclude := self.get_excluded_fields() is not None:
-            exclude = {*_exclude, exclude}
+        if (_exclude := self.get_excluded_fields()) is not None:
+            exclude = {*_exclude, *(exclude or ())}
         if exclude:
-            for field in exclude:
-                try:
-                    del fields[field]
-                except KeyError:
-                    pass
+            # Mapping is shared by every object in list views, so it's copied instead of deleting from it !!
+            fields = {field: fields[field] for field in fields if field not in exclude}
 
         return getattr(self, f"serialize_{format_}")(fields)
 
 
+class PrimaryKeyIndex(models.Index):
+    """Index for abstract models, ``"pk"`` in `fields` is replaced by the primary key name of each concrete model.
+
+    Deconstructs to `models.Index` with resolved fields, so migrations don't depend on this class.
+    """
+
+    def set_name_with_model(self, model):
+        self.fields = [
+            field.replace("pk", model._meta.pk.name) if field.lstrip("-") == "pk" else field for field in self.fields
+        ]
+        self.fields_orders = [
+            (field[1:], "DESC") if field.startswith("-") else (field, "") for field in self.fields
+        ]
+        super().set_name_with_model(model)
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        return "django.db.models.Index", args, kwargs
+
+
+class AbstractBaseSyncModel(AbstractBaseModel):
+    """Model with all functionality and fields from AbstractModel, with index for "changed since" sync feeds.
+
+    Rows are read in `(update_date, pk)` order by `sync.get_changes`, if `Meta` is overridden it must extend
+    `AbstractBaseSyncModel.Meta` to keep the index. Set `TOMBSTONE_MODEL` to record deletions.
+    """
+    TOMBSTONE_MODEL = None  # "app_label.ModelName" of a model inheriting `AbstractSyncTombstone`.
+
+    class Meta:
+        abstract = True
+        indexes = [
+            PrimaryKeyIndex(fields=["update_date", "pk"]),
+        ]
+
+
+class AbstractSyncTombstone(models.Model):
+    """Compact record of a deleted `AbstractBaseSyncModel` row, one concrete model can store deletions of every model."""
+    model_label = models.CharField(
+        verbose_name=__("Model"),
+        help_text=__("Label of the model of deleted object."),
+        max_length=100,
+    )
+    object_pk = models.CharField(
+        verbose_name=__("Object Primary Key"),
+        help_text=__("Primary key of the deleted object."),
+        max_length=64,
+    )
+    deletion_date = models.DateTimeField(
+        verbose_name=__("Deletion Date"),
+        help_text=__("Date of deletion of the object."),
+        auto_now_add=True,
+    )
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=["model_label", "deletion_date", "id"]),
+        ]
+
+    def serialize(self) -> dict:
+        """Compact representation sent to clients."""
+        return {"id": self.object_pk, "deleted": self.deletion_date}
+
+
 class AbstractBaseUUIDModel(AbstractBaseModel):
     """Model with all functionality and fields from AbstractModel but pk datatype changed to `uuid`."""
     id = models.UUIDField(
@@ -139,9 +226,34 @@ class AbstractBaseUUIDModel(AbstractBaseModel):
         abstract = True
 
 
+class AbstractBaseUUID7Model(AbstractBaseModel):
+    """Same as `AbstractBaseUUIDModel`, but pk is time ordered `uuid7`, new rows don't scatter across pk index."""
+    id = TimeOrderedUUIDField(
+        verbose_name=__("Primary Key with time ordered unique identifiers."),
+        help_text=__(
+            "Generates unique identifiers ordered by creation time everytime a new object is created."
+        ),
+        primary_key=True,
+        unique=True,
+        auto_created=True,
+        editable=False,
+        error_messages={
+            "invalid": __("Please provide a valid UUID.")
+        }
+    )
+
+    class Meta:
+        abstract = True
+
+
 class AbstractBaseSlugModel(AbstractBaseModel):
-    """Model with all functionality and fields from AbstractModel with addition of `slug`."""
+    """Model with all functionality and fields from AbstractModel with addition of `slug`.
+
+    Default manager is not replaced, set `objects = slugs.SlugManager()` on the model for cached `get_by_slug`. The
+    slug cache is only maintained for models with a `SlugManager`, after the saving transaction commits.
+    """
     SLUG_FROM_FIELD = None
+    SEARCH_FIELDS = None  # Text fields to index for `search`, like `("title", "body")`, not indexed if `None`.
 
     slug = models.SlugField(
         verbose_name=__("Slug"),
@@ -153,6 +265,12 @@ class AbstractBaseSlugModel(AbstractBaseModel):
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get("slug")  # For invalidating cached slug when it's changed !!
+        return instance
+
     def get_slug_value(self):
         """will be used internally to get slug value, override this to return any slug value you wish."""
         assert self.SLUG_FROM_FIELD is not None, "Either set a constant ``SLUG_FROM_FIELD``, or override ``get_slug_value``, or set value for slug before calling save()"
@@ -164,6 +282,22 @@ class AbstractBaseSlugModel(AbstractBaseModel):
             self.slug = self.get_slug_value()
         super().save(*args, **kwargs)
 
+        # Cache is written only for new slugs, saves that don't change the slug make no cache round trip !!
+        loaded_slug = getattr(self, "_loaded_slug", None)
+        if loaded_slug != self.slug:
+            self._loaded_slug = self.slug
+            if slugs.uses_slug_cache(type(self)):
+                transaction.on_commit(
+                    functools.partial(self._update_cached_slug, type(self), loaded_slug, self.slug, self.pk),
+                    using=self._state.db,
+                )
+
+    @staticmethod
+    def _update_cached_slug(model, old_slug, slug, pk):
+        if old_slug:
+            slug_resolver.delete(model, old_slug)
+        slug_resolver.set(model, slug, pk)
+
 
 class AbstractBaseSlugUUIDModel(AbstractBaseSlugModel):
     """Model with all functionality and fields from AbstractModel with addition of `slug` and pk is changed to 'UUID type'."""
@@ -187,59 +321,34 @@ class AbstractBaseSlugUUIDModel(AbstractBaseSlugModel):
         abstract = True
 
 
-class AbstractCommonUser(AbstractUser):
-    DEFAULT_PROFILE_PICTURE_PATH = "common_api/static/common_api/default/default.jpg"
-    PROFILE_PICTURE_UPLOAD_PATH = "media/profile_picture/"
-
-    username_validator = validators.WordNumberLetterUnderscoreAndDotOnlyValidator()
-    phonenumber_validator = validators.InternationalPhoneNumberValidator()
+class AbstractBaseSlugUUID7Model(AbstractBaseSlugModel):
+    """Same as `AbstractBaseSlugUUIDModel`, but pk is time ordered `uuid7`."""
 
-    username = models.CharField(
-        verbose_name=__('username'),
-        max_length=150,
-        unique=True,
+    id = TimeOrderedUUIDField(
+        verbose_name=__("Primary Key with time ordered unique identifiers."),
         help_text=__(
-            'Enter a valid username. This value may contain only letters, '
-            'numbers, and (_, .) characters.'
+            "Generates unique identifiers ordered by creation time everytime a new object is created."
         ),
-        validators=[username_validator],
-        error_messages={
-            'unique': __("A user with that username already exists."),
-        },
-    )
-    phone_number = models.CharField(
-        verbose_name=__("Phone Number"),
-        max_length=15,
+        primary_key=True,
         unique=True,
-        help_text=__(
-            "Enter a valid number in international or national format."
-        ),
-        validators=[phonenumber_validator],
+        auto_created=True,
+        editable=False,
         error_messages={
-            'unique': __("A user with that phone number already exists."),
-        },
-    )
-
-    profile_picture = models.ImageField(
-        verbose_name=__("Profile Picture"),
-        help_text=__(
-            "Profile Picture of the user"
-        ),
-        default=DEFAULT_PROFILE_PICTURE_PATH,
-        upload_to=PROFILE_PICTURE_UPLOAD_PATH
-    )
-
-    country = models.CharField(
-        verbose_name=__("Country"),
-        help_text=__("Country of residence."),
-        max_length=3,
-        blank=True,
-        null=True,
-        choices=COUNTRY_CODE
+            "invalid": __("Please provide a valid UUID.")
+        }
     )
 
     class Meta:
         abstract = True
 
+
+def __getattr__(name):
+    # `AbstractCommonUser` pulls in `django.contrib.auth` and the country table, so it's imported only when used !!
+    if name == "AbstractCommonUser":
+        from common_api.users import AbstractCommonUser
+        return AbstractCommonUser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # class TestModel(AbstractCommonUser):
 #     pass
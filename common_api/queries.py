@@ -0,0 +1,217 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+import re
+import copy
+import time
+import asyncio
+import logging
+import threading
+import functools
+from collections import Counter, namedtuple
+from contextlib import ExitStack, ContextDecorator
+from contextvars import ContextVar
+
+from common_api import exceptions
+
+logger = logging.getLogger(__name__)
+
+QueryRecord = namedtuple("QueryRecord", ["sql", "shape", "duration", "field_path", "alias"])
+
+_current_field_path = ContextVar("common_api_current_field_path", default=None)
+_active_recorders = 0
+_active_recorders_lock = threading.Lock()
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDERS_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """Reduces query to its shape, literals and parameters become `?` and `IN (...)` lists are collapsed."""
+    shape = _STRING_LITERAL_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = shape.replace("%s", "?")
+    shape = _PLACEHOLDERS_LIST_RE.sub("(...)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+def is_recording() -> bool:
+    """Checks if any `QueryRecorder` is active, field paths are tracked only while recording."""
+    return _active_recorders > 0
+
+
+def call_with_field_path(path: str, function, *args, **kwargs):
+    """Calls `function`, queries executed inside it are attributed to `path` (nested paths are joined with `.`)."""
+    parent = _current_field_path.get()
+    token = _current_field_path.set(f"{parent}.{path}" if parent else path)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _current_field_path.reset(token)
+
+
+class QueryRecorder(ContextDecorator):
+    """Records every query executed on all database connections inside the block.
+
+    Queries executed while serializing are attributed to the field path from `fields` mapping, so that N+1
+    patterns can be traced back to the field causing them::
+
+        with QueryRecorder() as recorder:
+            res.add_list_view_data("articles", Article.objects.all(), fields)
+
+        recorder.get_repeated_shapes()
+    """
+
+    def __init__(self, using: (list, tuple) = None, repeated_threshold: int = 2):
+        """
+        :param using: database aliases to record, all configured databases if not provided.
+        :param repeated_threshold: number of times same query shape must run to be reported as probable N+1.
+        """
+        self.using = using
+        self.repeated_threshold = repeated_threshold
+        self.queries = []
+        self._exit_stack = None
+
+    def _recreate_cm(self):
+        # Decorated views can run concurrently, every call records into its own copy !!
+        return copy.copy(self)
+
+    def __call__(self, function):
+        """Decorates sync or async `function`, queries of each call are recorded into a copy of the recorder."""
+        if not asyncio.iscoroutinefunction(function):
+            return super().__call__(function)
+
+        @functools.wraps(function)
+        async def __wrapper(*args, **kwargs):
+            # Async views query in the thread of `sync_to_async`, its connections are recorded !!
+            recorder = self._recreate_cm()
+            await sync_to_async(recorder.__enter__)()
+            try:
+                result = await function(*args, **kwargs)
+            except BaseException as e:
+                await sync_to_async(recorder.__exit__)(type(e), e, e.__traceback__)
+                raise
+            await sync_to_async(recorder.__exit__)(None, None, None)
+            return result
+
+        return __wrapper
+
+    def _record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(QueryRecord(
+                sql=sql,
+                shape=normalize_sql(sql),
+                duration=time.perf_counter() - started,
+                field_path=_current_field_path.get(),
+                alias=context["connection"].alias,
+            ))
+
+    def __enter__(self):
+        global _active_recorders
+
+        self.queries = []
+        self._exit_stack = ExitStack()
+        for alias in self.using or connections:
+            self._exit_stack.enter_context(connections[alias].execute_wrapper(self._record))
+        with _active_recorders_lock:
+            _active_recorders += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_recorders
+
+        with _active_recorders_lock:
+            _active_recorders -= 1
+        self._exit_stack.close()
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def get_shapes(self) -> Counter:
+        """Provides number of times each query shape was executed."""
+        return Counter(query.shape for query in self.queries)
+
+    def get_repeated_shapes(self) -> list:
+        """Provides query shapes executed at least `repeated_threshold` times, these are probable N+1 patterns.
+
+        :return: `[{"shape": sql, "count": n, "field_paths": {field_path: n}}]`, most repeated first.
+        """
+        repeated = []
+        for shape, count in self.get_shapes().most_common():
+            if count < self.repeated_threshold:
+                break
+            field_paths = Counter(query.field_path for query in self.queries if query.shape == shape)
+            repeated.append({"shape": shape, "count": count, "field_paths": dict(field_paths)})
+        return repeated
+
+    def report(self) -> str:
+        """Human readable summary, used in warnings and exceptions."""
+        lines = [f"{self.count} queries in {self.duration * 1000:.2f} ms."]
+        for repeated in self.get_repeated_shapes():
+            paths = ", ".join(f"{path or '<outside serialization>'} ({count})" for path, count in repeated["field_paths"].items())
+            lines.append(f"Probable N+1, executed {repeated['count']} times from {paths}: {repeated['shape']}")
+        return "\n".join(lines)
+
+
+class QueryBudget(QueryRecorder):
+    """Limits number of queries executed by a view or block, usable as decorator or context manager::
+
+        @query_budget(5)
+        def article_list(request):
+            ...
+
+    Async views are supported, their queries run through `sync_to_async` in the thread the budget is entered in.
+    When exceeded `exceptions.QueryBudgetExceeded` is raised if `strict`, else a warning is logged.
+    Set `COMMON_API_QUERY_BUDGET_STRICT = True` in test settings so that exceeded budgets fail tests.
+    """
+
+    def __init__(self, max_queries: int, max_repeated: int = None, strict: bool = None, **kwargs):
+        """
+        :param max_queries: maximum number of queries allowed.
+        :param max_repeated: maximum number of times a query shape can repeat, not checked if not provided.
+        :param strict: raise instead of logging, `COMMON_API_QUERY_BUDGET_STRICT` setting if not provided.
+        """
+        super().__init__(**kwargs)
+        self.max_queries = max_queries
+        self.max_repeated = max_repeated
+        self.strict = strict
+
+    def is_exceeded(self) -> bool:
+        if self.count > self.max_queries:
+            return True
+        if self.max_repeated is not None:
+            return any(count > self.max_repeated for count in self.get_shapes().values())
+        return False
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+
+        if exc_type is None and self.is_exceeded():
+            strict = self.strict if self.strict is not None else getattr(settings, "COMMON_API_QUERY_BUDGET_STRICT", False)
+            limits = f"{self.max_queries} queries" + (
+                f", {self.max_repeated} repeats per query" if self.max_repeated is not None else ""
+            )
+            message = f"Query budget of {limits} exceeded. {self.report()}"
+            if strict:
+                raise exceptions.QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return False
+
+
+def query_budget(max_queries: int, max_repeated: int = None, strict: bool = None):
+    """Decorator/context manager declaring query budget, see `QueryBudget`."""
+    return QueryBudget(max_queries, max_repeated=max_repeated, strict=strict)
@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.core.cache import caches
+
+import math
+import time
+import threading
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: str) -> tuple:
+    """Parses rate like `"10/m"`, `"100/h"` or `"5/30s"` to `(limit, period_seconds)`."""
+    try:
+        limit, period = rate.split("/")
+        multiplier = period[:-1] or 1
+        return int(limit), int(multiplier) * PERIODS[period[-1]]
+    except (ValueError, KeyError, IndexError, AttributeError):
+        raise ValueError(f"Invalid rate ``{rate}``, use ``<count>/<number?><s|m|h|d>``.")
+
+
+def get_ip(request) -> str:
+    """Client address, `REMOTE_ADDR` unless the app is behind proxies set by `COMMON_API_RATE_LIMIT_PROXY_COUNT`.
+
+    With `N` trusted proxies the address is the `N`th entry from the right of `COMMON_API_RATE_LIMIT_IP_META`
+    (default `"HTTP_X_FORWARDED_FOR"`), which is the one added by the outermost trusted proxy. Entries left of it
+    are sent by the client and can be anything. If the header has fewer entries, `REMOTE_ADDR` is used.
+    """
+    proxy_count = getattr(settings, "COMMON_API_RATE_LIMIT_PROXY_COUNT", 0)
+    if proxy_count > 0:
+        value = request.META.get(getattr(settings, "COMMON_API_RATE_LIMIT_IP_META", "HTTP_X_FORWARDED_FOR"), "")
+        addresses = [address.strip() for address in value.split(",") if address.strip()]
+        if len(addresses) >= proxy_count:
+            return addresses[-proxy_count]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def get_user_or_ip(request) -> str:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{get_ip(request)}"
+
+
+KEY_FUNCTIONS = {"user": get_user_or_ip, "ip": lambda request: f"ip:{get_ip(request)}"}
+
+
+class RateLimitResult:
+    __slots__ = ("allowed", "limit", "remaining", "reset", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset: float, retry_after: float = 0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset  # Seconds until the limit is fully available again !!
+        self.retry_after = retry_after  # Seconds until next request is allowed, for rejected requests !!
+
+    def get_headers(self) -> dict:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class LocalBuckets:
+    """Token buckets of this process, `{key: [tokens, updated_at]}`, full buckets are dropped above `max_keys`."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: int, period: float) -> RateLimitResult:
+        now = time.monotonic()
+        rate = limit / period
+
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_keys:
+                    self.prune(now, rate, limit)
+                bucket = self.buckets[key] = [limit, now]
+            else:
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            allowed = bucket[0] >= 1
+            if allowed:
+                bucket[0] -= 1
+            tokens = bucket[0]
+
+        return RateLimitResult(
+            allowed, limit, int(tokens), (limit - tokens) / rate, 0 if allowed else (1 - tokens) / rate
+        )
+
+    def prune(self, now: float, rate: float, limit: int):
+        """Drops buckets which would be full by now, every bucket if that doesn't free space."""
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items() if bucket[0] + (now - bucket[1]) * rate < limit
+        }
+        if len(self.buckets) >= self.max_keys:
+            self.buckets = {}
+
+
+class RateLimiter:
+    """Limits requests per key to `rate`, with token bucket of this process and optional sliding window in cache.
+
+    Local bucket is checked first, so clients over the limit in this process are rejected without cache round trip.
+    With `shared` the limit holds across workers, counts of current and previous window are kept in cache
+    (`COMMON_API_RATE_LIMIT_CACHE_ALIAS`), which must support atomic `incr` (memcached, redis) to be exact.
+
+    :param rate: requests per period, see `parse_rate`.
+    :param scope: prefix of keys, limiters with same scope share the limit.
+    :param shared: keep counts in cache, default `COMMON_API_RATE_LIMIT_SHARED` (`False`).
+    """
+    KEY_PREFIX = "common_api:rate_limit"
+
+    def __init__(self, rate: str, scope: str, shared: bool = None):
+        self.limit, self.period = parse_rate(rate)
+        self.scope = scope
+        self.shared = getattr(settings, "COMMON_API_RATE_LIMIT_SHARED", False) if shared is None else shared
+        self.local = LocalBuckets(getattr(settings, "COMMON_API_RATE_LIMIT_MAX_KEYS", 10000))
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "COMMON_API_RATE_LIMIT_CACHE_ALIAS", "default")]
+
+    def check(self, key: str) -> RateLimitResult:
+        """Counts request of `key` and provides if it's allowed."""
+        result = self.local.consume(key, self.limit, self.period)
+        if not result.allowed or not self.shared:
+            return result
+        return self.check_shared(key)
+
+    def check_shared(self, key: str) -> RateLimitResult:
+        now = time.time()
+        window, elapsed = divmod(now, self.period)
+        window = int(window)
+        current_key = f"{self.KEY_PREFIX}:{self.scope}:{key}:{window}"
+
+        cache = self.cache
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Another worker may create the key between `incr` and `add` !!
+            current = 1 if cache.add(current_key, 1, self.period * 2) else cache.incr(current_key)
+        previous = cache.get(f"{self.KEY_PREFIX}:{self.scope}:{key}:{window - 1}", 0)
+
+        # Previous window is weighted by its part still inside the sliding window !!
+        previous_weight = previous * (1 - elapsed / self.period)
+        estimated = previous_weight + current
+        allowed = estimated <= self.limit
+        retry_after = 0
+        if not allowed:
+            if previous and current < self.limit:
+                # Weight of previous window drops under what's left of the limit within this window !!
+                retry_after = self.period * (1 - (self.limit - current) / previous) - elapsed
+            else:
+                retry_after = self.period - elapsed
+        return RateLimitResult(
+            allowed, self.limit, max(0, int(self.limit - estimated)), 2 * self.period - elapsed, retry_after
+        )
@@ -0,0 +1,168 @@
+from django.conf import settings
+
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_request_state = ContextVar("common_api_database_state", default=None)
+
+
+class DatabaseState:
+    """Database usage of the current request, shared between `ReplicaRouter`, views and middleware."""
+
+    def __init__(self):
+        self.read_alias = None  # Replica used for reads, primary is used if None.
+        self.wrote = False  # Set by the router when something is written, reads stick to primary after it.
+
+
+def get_primary() -> str:
+    return getattr(settings, "COMMON_API_PRIMARY_DATABASE", "default")
+
+
+def get_replicas() -> list:
+    return getattr(settings, "COMMON_API_READ_REPLICAS", [])
+
+
+def get_state() -> DatabaseState:
+    """Provides state of the current request or `database_state` block.
+
+    Outside of them (shell, commands, threads) a new state is provided and not stored, so nothing leaks between
+    unrelated work sharing the context.
+    """
+    state = _request_state.get()
+    return DatabaseState() if state is None else state
+
+
+@contextmanager
+def database_state():
+    """Starts a new `DatabaseState`, used for every request by `ReadYourWritesMiddleware`."""
+    token = _request_state.set(DatabaseState())
+    try:
+        yield _request_state.get()
+    finally:
+        _request_state.reset(token)
+
+
+class ReplicaPool:
+    """Chooses read replica with `round_robin` or `least_loaded` (fewest in-flight views in this process) strategy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0
+        self._in_flight = {}
+
+    def acquire(self) -> (str, None):
+        """Provides replica alias to use, must be released with `release` after use. None if no replica is set."""
+        replicas = get_replicas()
+        if not replicas:
+            return None
+
+        with self._lock:
+            if getattr(settings, "COMMON_API_REPLICA_STRATEGY", "round_robin") == "least_loaded":
+                alias = min(replicas, key=lambda replica: self._in_flight.get(replica, 0))
+            else:
+                alias = replicas[self._next % len(replicas)]
+                self._next += 1
+            self._in_flight[alias] = self._in_flight.get(alias, 0) + 1
+        return alias
+
+    def release(self, alias: str):
+        with self._lock:
+            self._in_flight[alias] = self._in_flight.get(alias, 1) - 1
+
+
+replica_pool = ReplicaPool()
+
+
+@contextmanager
+def read_from_replica():
+    """Routes reads inside the block to a replica chosen by `replica_pool`, writes still go to primary.
+
+    Outside of `database_state` (e.g. without `ReadYourWritesMiddleware`) the block gets its own state.
+    """
+    if _request_state.get() is None:
+        with database_state():
+            with read_from_replica() as alias:
+                yield alias
+        return
+
+    state = get_state()
+    alias = replica_pool.acquire()
+    previous_alias, state.read_alias = state.read_alias, alias
+    try:
+        yield alias
+    finally:
+        state.read_alias = previous_alias
+        if alias is not None:
+            replica_pool.release(alias)
+
+
+# Read your writes !!
+def get_pin_seconds() -> float:
+    return getattr(settings, "COMMON_API_READ_YOUR_WRITES_SECONDS", 5)
+
+
+def get_pin_key() -> str:
+    return getattr(settings, "COMMON_API_READ_YOUR_WRITES_KEY", "common_api_primary_until")
+
+
+def uses_session() -> bool:
+    return getattr(settings, "COMMON_API_READ_YOUR_WRITES_STORAGE", "cookie") == "session"
+
+
+def is_pinned_to_primary(request) -> bool:
+    """Checks if the client wrote recently, in which case its reads must be served by primary."""
+    if uses_session():
+        pinned_until = getattr(request, "session", {}).get(get_pin_key())
+    else:
+        pinned_until = request.COOKIES.get(get_pin_key())
+
+    try:
+        return pinned_until is not None and float(pinned_until) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+def pin_to_primary(request, response):
+    """Makes the client's reads stick to primary for `COMMON_API_READ_YOUR_WRITES_SECONDS`."""
+    pinned_until = time.time() + get_pin_seconds()
+    if uses_session():
+        request.session[get_pin_key()] = pinned_until
+    else:
+        response.set_cookie(get_pin_key(), str(pinned_until), max_age=int(get_pin_seconds()) + 1, httponly=True)
+
+
+class ReplicaRouter:
+    """Database router sending writes to primary and reads of `read_from_replica` views to replicas.
+
+    Add to `DATABASE_ROUTERS` and add `middlewares.ReadYourWritesMiddleware`, replicas are listed in
+    `COMMON_API_READ_REPLICAS`. After a write, reads of the same request and of the same client for
+    `COMMON_API_READ_YOUR_WRITES_SECONDS` are served by primary.
+
+    Locally replicas can be extra SQLite aliases, with `"TEST": {"MIRROR": "default"}` to share test data.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.read_alias is None or state.wrote:
+            return get_primary()
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return get_primary()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {get_primary(), *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Replicas get their schema from primary through replication, so migrations never run on them."""
+        if db in get_replicas():
+            return False
+        return None
@@ -0,0 +1,399 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.module_loading import import_string
+
+import os
+import re
+import abc
+import json
+import atexit
+import logging
+import sqlite3
+import threading
+
+from common_api import utils
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def get_search_fields(model) -> tuple:
+    """Fields indexed for `model`, empty if it didn't opt in with `SEARCH_FIELDS`."""
+    return tuple(getattr(model, "SEARCH_FIELDS", None) or ())
+
+
+def get_texts(instance) -> list:
+    return [str(value) if (value := utils.get_attr(instance, field)) is not None else "" for field in
+            get_search_fields(type(instance))]
+
+
+def build_match_query(query: str) -> (str, None):
+    """Converts user input to FTS5 query, every word must match and the last one is matched as prefix."""
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchBackend(abc.ABC):
+    """Interface of search index backends, set by `COMMON_API_SEARCH_BACKEND` as dotted path.
+
+    Primary keys are passed as strings, `rows` are `[(pk, [text_of_each_search_field])]`.
+    """
+
+    @abc.abstractmethod
+    def index(self, model, rows: list):
+        """Adds or replaces rows."""
+
+    @abc.abstractmethod
+    def delete(self, model, pks: list):
+        """Removes rows, unknown primary keys are ignored."""
+
+    @abc.abstractmethod
+    def clear(self, model):
+        """Removes every row of `model`."""
+
+    @abc.abstractmethod
+    def replace(self, model, chunks):
+        """Builds a new index from `chunks` (iterable of `rows`) and swaps it in, searches use the old one until then.
+
+        Rows written with `index`/`delete` by any process while building must be in the swapped index, `chunks` may
+        be read before those writes.
+        """
+
+    @abc.abstractmethod
+    def search(self, model, query: str, limit: int, offset: int = 0) -> list:
+        """Provides primary keys of best matches first, `limit` keys after the first `offset` ones."""
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """Index in a SQLite FTS5 database at `COMMON_API_SEARCH_SQLITE_PATH`, usable with any database of the models.
+
+    Every model has a FTS5 table ranked by bm25 and a table mapping primary keys to FTS5 rowids, so models with UUID
+    primary keys can be indexed and rows are replaced without scanning the index.
+
+    The file is local to the host, every process writing or searching the index must use the same file. With workers
+    on several hosts use a backend on a shared service instead.
+
+    While `replace` builds a new index, `index` and `delete` of every process also record the change in a log table,
+    it is replayed on the new index in the transaction swapping it in. A log left by a killed rebuild is removed by
+    the next one.
+    """
+    CHUNK_SIZE = 500  # Primary keys per `IN` query, below SQLite's default parameter limit !!
+
+    def __init__(self):
+        self.path = getattr(settings, "COMMON_API_SEARCH_SQLITE_PATH", None)
+        if not self.path:
+            raise ImproperlyConfigured(
+                "Set ``COMMON_API_SEARCH_SQLITE_PATH`` to the index file, every worker of the host must use it."
+            )
+        self._local = threading.local()
+        self._created = set()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers aren't blocked by the writer !!
+        return connection
+
+    @staticmethod
+    def get_table(model) -> str:
+        return "search_" + model._meta.label_lower.replace(".", "_")
+
+    @staticmethod
+    def get_columns(model) -> str:
+        return ", ".join(f'"{field.replace(".", "__")}"' for field in get_search_fields(model))
+
+    def create(self, model, table: str = None) -> str:
+        table = table or self.get_table(model)
+        if table not in self._created:
+            self.connection.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5({self.get_columns(model)}, '
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}_keys" (id INTEGER PRIMARY KEY, pk TEXT NOT NULL UNIQUE)'
+            )
+            self._created.add(table)
+        return table
+
+    def _get_rowids(self, table: str, pks: list) -> dict:
+        rowids = {}
+        for start in range(0, len(pks), self.CHUNK_SIZE):
+            chunk = pks[start:start + self.CHUNK_SIZE]
+            rowids.update((pk, rowid) for rowid, pk in self.connection.execute(
+                f'SELECT id, pk FROM "{table}_keys" WHERE pk IN ({", ".join("?" * len(chunk))})', chunk
+            ))
+        return rowids
+
+    def _write(self, model, table: str, rows: list):
+        """Adds or replaces `rows` in `table`, in the transaction of the caller."""
+        placeholders = ", ?" * len(get_search_fields(model))
+        connection = self.connection
+        connection.executemany(f'INSERT OR IGNORE INTO "{table}_keys" (pk) VALUES (?)', [(pk,) for pk, _ in rows])
+        rowids = self._get_rowids(table, [pk for pk, _ in rows])
+        connection.executemany(f'DELETE FROM "{table}" WHERE rowid = ?', [(rowid,) for rowid in rowids.values()])
+        connection.executemany(
+            f'INSERT INTO "{table}" (rowid, {self.get_columns(model)}) VALUES (?{placeholders})',
+            [(rowids[pk], *texts) for pk, texts in rows]
+        )
+
+    def _delete(self, table: str, pks: list):
+        """Removes `pks` from `table`, in the transaction of the caller."""
+        rowids = [(rowid,) for rowid in self._get_rowids(table, pks).values()]
+        self.connection.executemany(f'DELETE FROM "{table}" WHERE rowid = ?', rowids)
+        self.connection.executemany(f'DELETE FROM "{table}_keys" WHERE id = ?', rowids)
+
+    def _log(self, table: str, changes: list):
+        """Records `[(pk, texts or None)]` for the running rebuild of `table`, if any, see `replace`."""
+        connection = self.connection
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_log",)).fetchone():
+            connection.executemany(
+                f'INSERT OR REPLACE INTO "{table}_log" (pk, texts) VALUES (?, ?)',
+                [(pk, None if texts is None else json.dumps(texts)) for pk, texts in changes]
+            )
+
+    def index(self, model, rows: list):
+        table = self.create(model)
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self._write(model, table, rows)
+            self._log(table, rows)
+
+    def delete(self, model, pks: list):
+        table = self.create(model)
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self._delete(table, pks)
+            self._log(table, [(pk, None) for pk in pks])
+
+    def drop(self, table: str):
+        self.connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        self.connection.execute(f'DROP TABLE IF EXISTS "{table}_keys"')
+        self._created.discard(table)
+
+    def clear(self, model):
+        self.drop(self.get_table(model))
+        self.create(model)
+
+    def replace(self, model, chunks):
+        table = self.get_table(model)
+        new_table = f"{table}_new"
+        connection = self.connection
+
+        # Left by a failed rebuild !!
+        self.drop(new_table)
+        connection.execute(f'DROP TABLE IF EXISTS "{table}_log"')
+        self.create(model)
+        # Log exists before `chunks` reads the table, changes committed later are logged !!
+        connection.execute(f'CREATE TABLE "{table}_log" (pk TEXT PRIMARY KEY, texts TEXT)')
+        try:
+            self.create(model, new_table)
+            for rows in chunks:
+                with connection:
+                    connection.execute("BEGIN IMMEDIATE")
+                    self._write(model, new_table, rows)
+
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")  # Writers wait until the swap, nothing is logged after replay !!
+                changes = [
+                    (pk, None if texts is None else json.loads(texts))
+                    for pk, texts in connection.execute(f'SELECT pk, texts FROM "{table}_log"')
+                ]
+                if rows := [(pk, texts) for pk, texts in changes if texts is not None]:
+                    self._write(model, new_table, rows)
+                if pks := [pk for pk, texts in changes if texts is None]:
+                    self._delete(new_table, pks)
+
+                connection.execute(f'DROP TABLE "{table}_log"')
+                connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+                connection.execute(f'DROP TABLE IF EXISTS "{table}_keys"')
+                connection.execute(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+                connection.execute(f'ALTER TABLE "{new_table}_keys" RENAME TO "{table}_keys"')
+        finally:
+            connection.execute(f'DROP TABLE IF EXISTS "{table}_log"')
+            self.drop(new_table)
+
+    def search(self, model, query: str, limit: int, offset: int = 0) -> list:
+        match = build_match_query(query)
+        if match is None:
+            return []
+        table = self.create(model)
+        return [pk for pk, in self.connection.execute(
+            f'SELECT keys.pk FROM "{table}" JOIN "{table}_keys" keys ON keys.id = "{table}".rowid '
+            f'WHERE "{table}" MATCH ? ORDER BY rank LIMIT ? OFFSET ?', (match, limit, offset)
+        )]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> SearchBackend:
+    """Provides instance of `COMMON_API_SEARCH_BACKEND`, default `SQLiteFTS5Backend`, one per process."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(
+                getattr(settings, "COMMON_API_SEARCH_BACKEND", "common_api.search.SQLiteFTS5Backend")
+            )()
+        return _backend
+
+
+class SearchQueue:
+    """Index changes of saved and deleted rows, written to the backend in batches.
+
+    Queue is flushed by a background thread every `COMMON_API_SEARCH_FLUSH_SECONDS` (default `1`), as soon as
+    `COMMON_API_SEARCH_FLUSH_SIZE` (default `500`) changes are pending and at interpreter exit. Only the last change
+    of a row is written, texts are taken when the row is saved so flushing doesn't query the database.
+    """
+
+    def __init__(self):
+        self.pending = {}  # `{model: {pk: texts or None for deleted rows}}`
+        self.size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, model, pk, texts: (list, None)):
+        with self._lock:
+            self.pending.setdefault(model._meta.concrete_model, {})[str(pk)] = texts
+            self.size += 1
+            size = self.size
+
+        if self._thread is None:
+            self.start()
+        if size >= getattr(settings, "COMMON_API_SEARCH_FLUSH_SIZE", 500):
+            self._wake.set()
+
+    def flush(self):
+        """Writes pending changes, changes of models whose write fails are queued again for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending, self.size = self.pending, {}, 0
+
+            for model, changes in pending.items():
+                try:
+                    self.write(model, changes)
+                except Exception:  # NOQA
+                    logger.exception("Writing search index of ``%s`` failed, retried with next flush.", model._meta.label)
+                    with self._lock:
+                        queued = self.pending.setdefault(model, {})
+                        for pk, texts in changes.items():
+                            if pk not in queued:  # Changes queued meanwhile are newer !!
+                                queued[pk] = texts
+                                self.size += 1
+
+    @staticmethod
+    def write(model, changes: dict):
+        backend = get_backend()
+        if rows := [(pk, texts) for pk, texts in changes.items() if texts is not None]:
+            backend.index(model, rows)
+        if pks := [pk for pk, texts in changes.items() if texts is None]:
+            backend.delete(model, pks)
+
+    # Background flushing !!
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="common_api_search", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(getattr(settings, "COMMON_API_SEARCH_FLUSH_SECONDS", 1))
+            self._wake.clear()
+            if self.pending:
+                self.flush()
+
+    def reset(self):
+        self.pending, self.size = {}, 0
+        self._lock, self._flush_lock = threading.Lock(), threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+
+queue = SearchQueue()
+os.register_at_fork(after_in_child=queue.reset)
+atexit.register(queue.flush)
+
+
+def rebuild(model, chunk_size: int = 2000) -> int:
+    """Builds a new index of `model` streaming the table in chunks of `chunk_size`, provides number of indexed rows.
+
+    Searches use the old index until the new one is swapped in. Changes flushed by any process while the table is
+    read are logged by the backend and replayed before the swap, see `SearchBackend.replace`.
+    """
+    model = model._meta.concrete_model
+    objects = model._base_manager.order_by("pk")
+    try:
+        # Only text columns are read, when every search field is a column of the model !!
+        if all(model._meta.get_field(field).concrete for field in get_search_fields(model)):
+            objects = objects.only(*get_search_fields(model))
+    except FieldDoesNotExist:
+        pass
+
+    count = 0
+
+    def get_chunks():
+        nonlocal count
+        rows = []
+        for instance in objects.iterator(chunk_size=chunk_size):
+            rows.append((str(instance.pk), get_texts(instance)))
+            if len(rows) >= chunk_size:
+                count += len(rows)
+                yield rows
+                rows = []
+        if rows:
+            count += len(rows)
+            yield rows
+
+    get_backend().replace(model, get_chunks())
+    return count
+
+
+def search(model, query: str, limit: int = 100, offset: int = 0) -> list:
+    """Provides primary keys of rows of `model` matching `query`, best matches first.
+
+    Changes are visible after the queue is flushed, see `SearchQueue`.
+    """
+    pk_field = model._meta.pk
+    return [pk_field.to_python(pk) for pk in get_backend().search(model, query, limit, offset)]
+
+
+def get_ranked_queryset(queryset, query: str, limit: int = 100, offset: int = 0, batch_size: int = 500):
+    """Provides rows of `queryset` matching `query` best first, `limit` rows after the first `offset` ones.
+
+    Matches are read from the index in batches of `batch_size` and checked against `queryset` until `offset + limit`
+    rows pass its filters, so filtered querysets aren't emptied by matches of other rows. The total isn't known, serve
+    pages with `offset`/`limit` and request `limit + 1` rows to know if a next page exists. The result is ready for
+    `ResponseManager.add_list_view_data`.
+    """
+    model = queryset.model
+    wanted = offset + limit
+    pks = []
+    index_offset = 0
+    while len(pks) < wanted:
+        batch = search(model, query, batch_size, index_offset)
+        index_offset += batch_size
+        if batch:
+            allowed = set(queryset.filter(pk__in=batch).values_list("pk", flat=True))
+            pks.extend(pk for pk in batch if pk in allowed)
+        if len(batch) < batch_size:
+            break
+
+    pks = pks[offset:wanted]
+    if not pks:
+        return queryset.none()
+    ranking = Case(*(When(pk=pk, then=Value(rank)) for rank, pk in enumerate(pks)), output_field=IntegerField())
+    return queryset.filter(pk__in=pks).order_by(ranking)
@@ -0,0 +1,42 @@
+from django.apps import apps
+from django.db import transaction
+
+
+def create_sync_tombstone(sender, instance, using, **kwargs):
+    """Records deletion of `AbstractBaseSyncModel` rows in their `TOMBSTONE_MODEL`."""
+    tombstone_model = apps.get_model(sender.TOMBSTONE_MODEL)
+    tombstone_model._base_manager.using(using).create(
+        model_label=sender._meta.label_lower,
+        object_pk=str(instance.pk),
+    )
+
+
+def invalidate_cached_slug(sender, instance, using, **kwargs):
+    """Removes slug of deleted `AbstractBaseSlugModel` row with `SlugManager` from `slug_resolver` on commit."""
+    from common_api.slugs import slug_resolver
+
+    if slug := instance.__dict__.get("slug"):
+        transaction.on_commit(lambda: slug_resolver.delete(sender, slug), using=using)
+
+
+def add_available_values(sender, instance, **kwargs):
+    """Adds unique values of saved `AbstractCommonUser` row to its availability filters."""
+    from common_api.availability import get_availability_service
+
+    get_availability_service(sender).add_instance(instance)
+
+
+def update_search_index(sender, instance, using, **kwargs):
+    """Queues texts of saved `AbstractBaseSlugModel` row with `SEARCH_FIELDS` for the search index."""
+    from common_api import search
+
+    texts = search.get_texts(instance)
+    transaction.on_commit(lambda: search.queue.add(sender, instance.pk, texts), using=using)
+
+
+def remove_from_search_index(sender, instance, using, **kwargs):
+    """Queues removal of deleted `AbstractBaseSlugModel` row from the search index."""
+    from common_api import search
+
+    pk = instance.pk
+    transaction.on_commit(lambda: search.queue.add(sender, pk, None), using=using)
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+
+import time
+import threading
+from collections import OrderedDict
+
+MISSING = object()  # Returned by `SlugResolver.get` for slugs known not to exist.
+_NOT_PROVIDED = object()
+
+
+class SlugResolver:
+    """Caches `(model, slug) => pk` in an in-process LRU backed by django cache, unknown slugs are cached for short time.
+
+    Settings:
+        * `COMMON_API_SLUG_CACHE_SIZE`: maximum entries in the in-process LRU, default `10000`.
+        * `COMMON_API_SLUG_CACHE_TIMEOUT`: seconds a resolved slug is cached, default `3600`.
+        * `COMMON_API_SLUG_NEGATIVE_TIMEOUT`: seconds an unknown slug is cached, default `30`.
+        * `COMMON_API_SLUG_CACHE_ALIAS`: django cache alias for shared tier, default `"default"`, `None` to disable.
+    """
+    KEY_PREFIX = "common_api:slug"
+
+    def __init__(self, max_size: int = None, timeout: int = None, negative_timeout: int = None,
+                 cache_alias: str = _NOT_PROVIDED):
+        self.max_size = max_size or getattr(settings, "COMMON_API_SLUG_CACHE_SIZE", 10000)
+        self.timeout = timeout or getattr(settings, "COMMON_API_SLUG_CACHE_TIMEOUT", 3600)
+        self.negative_timeout = negative_timeout or getattr(settings, "COMMON_API_SLUG_NEGATIVE_TIMEOUT", 30)
+        self._cache_alias = cache_alias
+        self._local = OrderedDict()  # `{key: (pk or MISSING, expires_at)}`
+        self._lock = threading.Lock()
+
+    @property
+    def cache_alias(self) -> (str, None):
+        # Setting is read on use, the resolver is created on import !!
+        if self._cache_alias is _NOT_PROVIDED:
+            return getattr(settings, "COMMON_API_SLUG_CACHE_ALIAS", "default")
+        return self._cache_alias
+
+    @property
+    def cache(self):
+        return caches[alias] if (alias := self.cache_alias) else None
+
+    def get_key(self, model, slug: str) -> str:
+        return f"{self.KEY_PREFIX}:{model._meta.label_lower}:{slug}"
+
+    def _set_local(self, key, value, timeout):
+        with self._lock:
+            self._local[key] = (value, time.monotonic() + timeout)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def get(self, model, slug: str):
+        """Provides cached pk for the slug, `MISSING` if slug is known not to exist or None if not cached."""
+        key = self.get_key(model, slug)
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._local.move_to_end(key)
+                    return entry[0]
+                del self._local[key]
+
+        cache = self.cache
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            return None
+
+        # Positive entries are stored as `("pk", pk)` and negative as `("missing",)` !!
+        if cached[0] == "missing":
+            self._set_local(key, MISSING, self.negative_timeout)
+            return MISSING
+        self._set_local(key, cached[1], self.timeout)
+        return cached[1]
+
+    def set(self, model, slug: str, pk):
+        key = self.get_key(model, slug)
+        self._set_local(key, pk, self.timeout)
+        if self.cache is not None:
+            self.cache.set(key, ("pk", pk), self.timeout)
+
+    def set_missing(self, model, slug: str):
+        key = self.get_key(model, slug)
+        self._set_local(key, MISSING, self.negative_timeout)
+        if self.cache is not None:
+            self.cache.set(key, ("missing",), self.negative_timeout)
+
+    def delete(self, model, slug: str):
+        key = self.get_key(model, slug)
+        with self._lock:
+            self._local.pop(key, None)
+        if self.cache is not None:
+            self.cache.delete(key)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+slug_resolver = SlugResolver()
+
+
+def uses_slug_cache(model) -> bool:
+    """Checks if `model` has a `SlugManager`, `slug_resolver` is maintained only for such models."""
+    return any(isinstance(manager, SlugManager) for manager in model._meta.managers)
+
+
+class SlugManager(models.Manager):
+    """Manager with `get_by_slug`, which resolves slug to pk through `slug_resolver` before querying."""
+
+    def get_by_slug(self, slug: str):
+        """Same as `get(slug=slug)`, but only pk lookup is made when the slug is cached.
+
+        Cached pk is verified against the fetched row, so stale entries from other processes fall back to slug lookup.
+        """
+        model = self.model
+        pk = slug_resolver.get(model, slug)
+
+        if pk is MISSING:
+            raise model.DoesNotExist(f"{model._meta.object_name} matching slug ``{slug}`` does not exist.")
+
+        if pk is not None:
+            obj = self.filter(pk=pk).first()
+            if obj is not None and obj.slug == slug:
+                return obj
+            slug_resolver.delete(model, slug)
+
+        obj = self.filter(slug=slug).first()
+        if obj is not None:
+            slug_resolver.set(model, slug, obj.pk)
+            return obj
+
+        # Row may exist but be filtered by this manager, only slugs missing from the table are cached !!
+        if not model._base_manager.filter(slug=slug).exists():
+            slug_resolver.set_missing(model, slug)
+        raise model.DoesNotExist(f"{model._meta.object_name} matching slug ``{slug}`` does not exist.")
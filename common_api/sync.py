@@ -0,0 +1,115 @@
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+import datetime
+from collections import namedtuple
+
+from common_api import exceptions
+
+CURSOR_SALT = "common_api.sync"
+DEFAULT_LIMIT = 100
+SETTLE_SECONDS = 60
+
+SyncPage = namedtuple("SyncPage", ["objects", "tombstones", "cursor", "has_more"])
+
+
+def encode_cursor(position: tuple, tombstone_position: tuple) -> str:
+    """Signs feed positions into an opaque cursor, positions are `(update_date, pk)` and `(deletion_date, id)`."""
+    def dump(value):
+        return None if value is None else [value[0].isoformat(), str(value[1])]
+
+    return signing.dumps([dump(position), dump(tombstone_position)], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor: str) -> (tuple, tuple):
+    """Reverse of `encode_cursor`, raises `exceptions.InvalidCursor` for malformed or tampered cursors."""
+    def load(value):
+        if value is None:
+            return None
+        date = parse_datetime(value[0])
+        if date is None:
+            raise ValueError(value[0])
+        return date, value[1]
+
+    try:
+        position, tombstone_position = signing.loads(cursor, salt=CURSOR_SALT)
+        return load(position), load(tombstone_position)
+    except (signing.BadSignature, ValueError, TypeError, IndexError) as e:
+        raise exceptions.InvalidCursor("provided sync cursor is not valid.") from e
+
+
+def _after(queryset, date_field: str, pk_field: str, position: tuple):
+    """Keyset filter for rows after `position` in `(date_field, pk_field)` order, uses the composite index."""
+    if position is None:
+        return queryset
+    date, pk = position
+    return queryset.filter(Q(**{f"{date_field}__gt": date}) | Q(**{date_field: date, f"{pk_field}__gt": pk}))
+
+
+def get_changes(queryset, cursor: str = None, limit: int = None) -> SyncPage:
+    """Provides rows of `AbstractBaseSyncModel` queryset modified after the cursor, and deletions since the cursor.
+
+    Without a cursor every row is returned (in pages) and past deletions are skipped, since the client has nothing
+    to delete yet. Rows updated in the last `COMMON_API_SYNC_SETTLE_SECONDS` (default `SETTLE_SECONDS`) are returned
+    but the cursor isn't moved past them, so that rows saved by transactions which are not committed yet are not
+    skipped by the returned cursor. Such rows are returned again by following calls until they settle, clients must
+    apply rows as upserts. Rows saved more often than the setting are still delivered on every call.
+
+    `update_date` is set when the row is saved, not when its transaction commits. A row whose transaction commits
+    more than `COMMON_API_SYNC_SETTLE_SECONDS` after the save can be behind cursors already returned, and is then
+    never synced to those clients. Keep transactions writing synced models shorter than the setting, or raise it,
+    clients see changes only after the delay.
+
+    :param queryset: queryset or model inheriting `AbstractBaseSyncModel`, filters are preserved.
+    :param cursor: cursor returned by previous call.
+    :param limit: maximum number of rows and tombstones returned, `DEFAULT_LIMIT` if not provided.
+    :return: `SyncPage(objects, tombstones, cursor, has_more)`
+    """
+    queryset = queryset.all() if hasattr(queryset, "all") else queryset._default_manager.all()
+    model = queryset.model
+    limit = limit or DEFAULT_LIMIT
+
+    tombstone_queryset = None
+    if model.TOMBSTONE_MODEL is not None:
+        tombstone_queryset = apps.get_model(model.TOMBSTONE_MODEL)._base_manager.filter(
+            model_label=model._meta.label_lower
+        ).order_by("deletion_date", "id")
+
+    if cursor is None:
+        position = None
+        tombstone_position = None
+        if tombstone_queryset is not None:
+            tombstone_position = tombstone_queryset.values_list("deletion_date", "id").last()
+    else:
+        position, tombstone_position = decode_cursor(cursor)
+
+    settled_before = timezone.now() - datetime.timedelta(seconds=getattr(
+        settings, "COMMON_API_SYNC_SETTLE_SECONDS", SETTLE_SECONDS
+    ))
+
+    objects = list(_after(queryset, "update_date", "pk", position).order_by("update_date", "pk")[:limit + 1])
+    # Unsettled rows are last, more settled rows are left only if the row after the page is settled !!
+    has_more = len(objects) > limit and objects[limit].update_date <= settled_before
+    objects = objects[:limit]
+    settled = [instance for instance in objects if instance.update_date <= settled_before]
+    if settled:
+        position = (settled[-1].update_date, settled[-1].pk)
+
+    tombstones = []
+    if tombstone_queryset is not None:
+        if tombstone_position is not None or cursor is not None:  # Nothing to delete on initial sync !!
+            tombstones = list(
+                _after(tombstone_queryset, "deletion_date", "id", tombstone_position).filter(
+                    deletion_date__lte=settled_before
+                )[:limit + 1]
+            )
+        has_more = has_more or len(tombstones) > limit
+        tombstones = tombstones[:limit]
+        if tombstones:
+            tombstone_position = (tombstones[-1].deletion_date, tombstones[-1].id)
+
+    return SyncPage(objects, tombstones, encode_cursor(position, tombstone_position), has_more)
@@ -0,0 +1,86 @@
+"""Concrete models of the abstract models, created only for the test database."""
+from django.contrib.auth.models import Group, Permission
+from django.db import models
+
+from common_api.apps import connect_receivers
+from common_api.models import AbstractBaseModel, AbstractBaseSlugModel, AbstractBaseSyncModel, AbstractSyncTombstone
+from common_api.slugs import SlugManager
+from common_api.users import AbstractCommonUser
+
+
+class User(AbstractCommonUser):
+    # Reverse accessors would clash with `auth.User` !!
+    groups = models.ManyToManyField(Group, related_name="+", blank=True)
+    user_permissions = models.ManyToManyField(Permission, related_name="+", blank=True)
+
+    class Meta:
+        app_label = "common_api"
+
+
+class SyncTombstone(AbstractSyncTombstone):
+    class Meta(AbstractSyncTombstone.Meta):
+        app_label = "common_api"
+
+
+class SyncNote(AbstractBaseSyncModel):
+    TOMBSTONE_MODEL = "common_api.SyncTombstone"
+
+    text = models.CharField(max_length=100)
+
+    class Meta(AbstractBaseSyncModel.Meta):
+        app_label = "common_api"
+
+
+class SyncCode(AbstractBaseSyncModel):
+    code = models.CharField(max_length=20, primary_key=True)
+
+    class Meta(AbstractBaseSyncModel.Meta):
+        app_label = "common_api"
+
+
+class Article(AbstractBaseModel):
+    title = models.CharField(max_length=100)
+    body = models.TextField(blank=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = "common_api"
+
+
+class Event(AbstractBaseModel):
+    name = models.CharField(max_length=100)
+    day = models.DateField(null=True)
+    starts_at = models.DateTimeField()
+    attendees = models.IntegerField(default=0)
+    organizer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="+")
+
+    class Meta:
+        app_label = "common_api"
+
+
+class Tag(AbstractBaseSlugModel):
+    SLUG_FROM_FIELD = "name"
+
+    name = models.CharField(max_length=100)
+
+    objects = SlugManager()
+
+    class Meta:
+        app_label = "common_api"
+
+
+class Post(AbstractBaseSlugModel):
+    SLUG_FROM_FIELD = "title"
+    SEARCH_FIELDS = ("title", "body")
+
+    title = models.CharField(max_length=100)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        app_label = "common_api"
+
+
+# Models are imported after `CommonApiConfig.ready()` !!
+for model in (User, SyncNote, SyncCode, Tag, Post):
+    connect_receivers(model)
@@ -0,0 +1,67 @@
+from django.contrib.admin import AdminSite
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+
+from unittest import mock
+
+from common_api import admin
+from common_api.tests.models import Article, User
+
+
+class ArticleAdmin(admin.ScalableModelAdmin):
+    list_display = ("title", "body")
+
+
+@override_settings(COMMON_API_ADMIN_ESTIMATE_THRESHOLD=0)
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username="author", phone_number="9800000000")
+        Article.objects.bulk_create([Article(title=str(index), author=author) for index in range(25)])
+
+    def get_paginator(self, estimate):
+        patcher = mock.patch.object(admin, "estimate_table_rows", return_value=estimate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return admin.EstimatedCountPaginator(Article.objects.order_by("pk"), 10)
+
+    def test_estimate_used(self):
+        self.assertEqual(self.get_paginator(1000).count, 1000)
+
+    def test_overestimate_serves_last_real_page(self):
+        page = self.get_paginator(1000).page(50)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page.object_list), 5)
+
+    def test_underestimate_serves_existing_page(self):
+        page = self.get_paginator(5).page(3)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(page.paginator.count, 25)
+
+    def test_exact_count_raises_for_missing_page(self):
+        from django.core.paginator import EmptyPage
+
+        paginator = admin.EstimatedCountPaginator(list(range(25)), 10)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+
+class KeysetChangeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+
+    def get_changelist(self, params=None, **attributes):
+        model_admin = type("Admin", (ArticleAdmin,), attributes)(Article, AdminSite())
+        request = RequestFactory().get("/", params or {})
+        request.user = self.superuser
+        return model_admin.get_changelist_instance(request)
+
+    def test_default_ordering_uses_keyset(self):
+        self.assertTrue(self.get_changelist().uses_keyset)
+        self.assertTrue(self.get_changelist(ordering=("-creation_date", "-id")).uses_keyset)
+
+    def test_other_orderings_use_pages(self):
+        self.assertFalse(self.get_changelist({"o": "1"}).uses_keyset)
+        self.assertFalse(self.get_changelist(ordering=("title",)).uses_keyset)
+        self.assertFalse(self.get_changelist(ordering=("-creation_date", "title")).uses_keyset)
@@ -0,0 +1,155 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from common_api import views
+from common_api.availability import AvailabilityService, BloomFilter
+from common_api.ratelimit import LocalBuckets
+from common_api.tests.models import Tag, User
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(1000, 0.01)
+        values = [f"user_{index}" for index in range(1000)]
+        for value in values:
+            bloom_filter.add(value)
+        self.assertTrue(all(value in bloom_filter for value in values))
+        false_positives = sum(f"other_{index}" in bloom_filter for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(COMMON_API_AVAILABILITY_CACHE_ALIAS=None)
+class AvailabilityServiceTests(TransactionTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        User.objects.create(username="taken", phone_number="9800000000")
+
+    def get_service(self, **kwargs):
+        with override_settings(**{"COMMON_API_AVAILABILITY_DIR": self.directory, **kwargs}):
+            return AvailabilityService(User)
+
+    def test_definite_miss_without_query(self):
+        service = self.get_service()
+        service.get_filters()
+        with self.assertNumQueries(0):
+            self.assertTrue(service.is_available("username", "free"))
+        self.assertFalse(service.is_available("username", "taken"))
+
+    def test_saved_values_added(self):
+        service = self.get_service()
+        service.get_filters()
+        user = User(username="new", phone_number="9811111111")
+        service.add_instance(user)
+        self.assertIn("new", service.filters["username"])
+
+    def test_persisted_filters_loaded(self):
+        self.get_service().build()
+        service = self.get_service()
+        with mock.patch.object(service, "build") as build:
+            service.get_filters()
+        build.assert_not_called()
+        self.assertIn("taken", service.filters["username"])
+
+    def test_corrupted_file_rebuilt(self):
+        service = self.get_service()
+        service.build()
+        with open(service.path, "r+b") as file:
+            file.seek(-4, os.SEEK_END)
+            file.write(b"\xff\xff\xff\xff")
+
+        service = self.get_service()
+        with self.assertLogs("common_api.availability", "WARNING"):
+            self.assertFalse(service.load())
+
+        with open(service.path, "r+b") as file:
+            file.truncate(os.path.getsize(service.path) - 10)
+        with self.assertLogs("common_api.availability", "WARNING"):
+            service.get_filters()
+        self.assertIn("taken", service.filters["username"])
+
+    def test_first_build_runs_once(self):
+        service = self.get_service(COMMON_API_AVAILABILITY_DIR=None)
+        build = service.build
+        started = threading.Event()
+        calls = []
+
+        def slow_build():
+            calls.append(1)
+            started.set()
+            threading.Event().wait(0.1)
+            return build()
+
+        with mock.patch.object(service, "build", side_effect=slow_build):
+            threads = [threading.Thread(target=service.get_filters) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertIsNotNone(service.filters)
+
+    def test_unsupported_fields_not_checked(self):
+        with self.assertLogs("common_api.availability", "WARNING"):
+            service = AvailabilityService(Tag)
+        self.assertEqual(service.fields, ())
+
+    def test_counters_thread_safe(self):
+        service = self.get_service()
+        service.get_filters()
+
+        def check():
+            for index in range(200):
+                service.is_available("username", f"free_{index}")
+
+        threads = [threading.Thread(target=check) for _ in range(4)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Threads switch between reading and writing a counter !!
+        self.addCleanup(sys.setswitchinterval, interval)
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(service.stats()["checks"], 800)
+
+    def test_bulk_writes_found_after_build(self):
+        service = self.get_service()
+        service.get_filters()
+        User.objects.bulk_create([User(username="bulk", phone_number="9822222222")])
+        self.assertNotIn("bulk", service.filters["username"])  # `post_save` isn't sent !!
+        service.build()
+        self.assertFalse(service.is_available("username", "bulk"))
+
+
+class CheckAvailabilityViewTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+                mock.patch.object(views.check_availability.rate_limiter, "local", LocalBuckets(100)),
+                mock.patch.object(views, "get_availability_service"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        views.get_availability_service.return_value.fields = ("username", "phone_number")
+        views.get_availability_service.return_value.is_available.return_value = True
+
+    def get_response(self, query="username=free"):
+        request = RequestFactory().get(f"/?{query}", REMOTE_ADDR="10.0.0.1")
+        request.user = AnonymousUser()
+        return views.check_availability(request)
+
+    def test_unsupported_field(self):
+        views.get_availability_service.return_value.fields = ("username",)
+        response = self.get_response("phone_number=9800000000")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.envelope["messages"]["warning"][0]["title"], "Unsupported Field")
+
+    def test_checks_rate_limited(self):  # Default rate of 30 per minute !!
+        statuses = [self.get_response().status_code for _ in range(31)]
+        self.assertEqual(statuses, [200] * 30 + [429])
@@ -0,0 +1,64 @@
+from django.test import TestCase, override_settings
+
+import json
+
+BATCH_URL = "/api/batch/"
+
+
+@override_settings(ROOT_URLCONF="common_api.tests.urls")
+class BatchTests(TestCase):
+    def batch(self, calls, **data):
+        response = self.client.post(BATCH_URL, {"requests": calls, **data}, content_type="application/json")
+        return response, response.json()["responses"] if response.status_code == 200 else None
+
+    def test_responses_in_order(self):
+        response, responses = self.batch([
+            {"id": "first", "path": "/echo/?x=1"},
+            {"id": "missing", "path": "/missing/"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(entry["id"], entry["status"]) for entry in responses], [("first", 200), ("missing", 404)])
+        self.assertEqual(responses[0]["body"]["query"], {"x": "1"})
+
+    def test_body_passed_to_sub_request(self):
+        response, responses = self.batch([{"method": "POST", "path": "/echo/", "data": {"name": "value"}}])
+        body = responses[0]["body"]
+        self.assertEqual(body["method"], "POST")
+        self.assertEqual(json.loads(body["body"]), {"name": "value"})
+        self.assertEqual(body["data"], {"name": "value"})
+
+    def test_failing_call_only_fails_its_entry(self):
+        with self.assertLogs("common_api.views", "ERROR"):
+            response, responses = self.batch([{"path": "/fail/"}, {"path": "/echo/"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["status"] for entry in responses], [500, 200])
+        self.assertTrue(responses[0]["body"]["has_errors"])
+
+    def test_streaming_responses(self):
+        response, responses = self.batch([{"path": "/stream/"}, {"path": "/file/"}])
+        self.assertEqual([entry["body"] for entry in responses], ["first second", {"name": "file"}])
+
+    def test_invalid_body_only_fails_its_entry(self):
+        with self.assertLogs("common_api.views", "ERROR"):
+            response, responses = self.batch([{"path": "/invalid-json/"}, {"path": "/echo/"}])
+        self.assertEqual([entry["status"] for entry in responses], [500, 200])
+
+    def test_concurrent_only_for_safe_methods(self):
+        response, responses = self.batch([{"path": "/echo/"}, {"path": "/echo/"}], concurrent=True)
+        self.assertTrue(all(entry["body"]["thread"].startswith("common_api_batch") for entry in responses))
+
+        response, responses = self.batch([{"path": "/echo/"}, {"method": "POST", "path": "/echo/"}], concurrent=True)
+        self.assertFalse(any(entry["body"]["thread"].startswith("common_api_batch") for entry in responses))
+
+    def test_nested_batch_rejected(self):
+        response, responses = self.batch([{"method": "POST", "path": BATCH_URL}])
+        self.assertEqual(responses[0]["status"], 400)
+
+    @override_settings(COMMON_API_BATCH_MAX_REQUESTS=1)
+    def test_too_many_requests(self):
+        response, responses = self.batch([{"path": "/echo/"}, {"path": "/echo/"}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_request(self):
+        response, responses = self.batch("invalid")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.test import TestCase
+
+from unittest import mock
+
+from common_api import counters
+from common_api.tests.models import Article, User
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author", phone_number="9800000000")
+
+    def setUp(self):
+        self.buffer = counters.CounterBuffer()
+        self.buffer._thread = object()  # Flushed by the tests !!
+        patcher = mock.patch.object(counters, "buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.article = Article.objects.create(title="Title", author=self.author)
+
+    def test_increments_batched(self):
+        other = Article.objects.create(title="Other", author=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            for article in (self.article, other):
+                article.increment_counter("views", 2)
+
+        self.assertEqual(self.article.get_counter("views"), 2)
+        update_date = Article.objects.get(pk=self.article.pk).update_date
+        with self.assertNumQueries(1):  # Rows with same increments are updated together !!
+            self.assertEqual(counters.flush(), 2)
+
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertEqual((article.views, article.get_counter("views")), (2, 2))
+        self.assertEqual(article.update_date, update_date)
+
+    def test_increments_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.article.increment_counter("views")
+        self.assertEqual(self.buffer.get_pending(Article, self.article.pk, "views"), 0)
+        callbacks[0]()
+        self.assertEqual(self.buffer.get_pending(Article, self.article.pk, "views"), 1)
+
+    def test_rolled_back_increments_dropped(self):
+        try:
+            with transaction.atomic():
+                self.article.increment_counter("views")
+                raise ValueError
+        except ValueError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            pass
+        self.assertEqual(self.buffer.pending, {})
+
+    def test_unsaved_row(self):
+        with self.assertRaises(ValueError):
+            Article(title="Unsaved", author=self.author).increment_counter("views")
+
+    def test_non_integer_field(self):
+        with self.assertRaises(ValueError):
+            self.article.increment_counter("title")
+
+    def test_failed_write_retried(self):
+        self.buffer.add(Article, self.article.pk, "views", 3)
+        with mock.patch("django.db.models.query.QuerySet.update", side_effect=Exception), \
+                self.assertLogs("common_api.counters", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 0)
+
+        self.buffer.add(Article, self.article.pk, "views", 1)
+        self.assertEqual(self.buffer.get_pending(Article, self.article.pk, "views"), 4)
+        self.buffer.flush()
+        self.assertEqual(Article.objects.get(pk=self.article.pk).views, 4)
@@ -0,0 +1,64 @@
+from django.test import RequestFactory, SimpleTestCase
+
+import json
+from unittest import mock
+
+from common_api import views
+from common_api.countries import CountryRegistry
+
+CHOICES = (
+    ("AX", "Åland Islands"),
+    ("KR", "Korea (the Republic of)"),
+    ("NE", "Niger"),
+    ("NL", "Netherlands"),
+    ("NZ", "New Zealand"),
+)
+
+
+class CountryRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = CountryRegistry(CHOICES)
+
+    def test_built_on_first_use(self):
+        self.assertIsNone(self.registry._by_code)
+        self.assertEqual(self.registry.get_name("NE"), "Niger")
+        self.assertEqual(self.registry.get_code("aland islands"), "AX")
+        self.assertIsNone(self.registry.get_name("XX"))
+
+        with mock.patch.object(self.registry, "_build") as build:
+            self.registry.get_name("NL")
+        build.assert_not_called()
+
+    def test_default_choices(self):
+        registry = CountryRegistry()
+        self.assertEqual(registry.get_name("NP"), "Nepal")
+
+    def test_prefix_index(self):
+        self.assertEqual(self.registry.search("ne"), [
+            ("NE", "Niger"), ("NL", "Netherlands"), ("NZ", "New Zealand")
+        ])
+        self.assertEqual(self.registry.search("  NEW   ze"), [("NZ", "New Zealand")])
+        self.assertEqual(self.registry.search("republic"), [("KR", "Korea (the Republic of)")])  # Word start !!
+        self.assertEqual(self.registry.search("ala"), [("AX", "Åland Islands")])
+        self.assertEqual(self.registry.search("ne", limit=1), [("NE", "Niger")])
+        self.assertEqual(self.registry.search(" "), [])
+
+    def test_search_json_cached_by_normalized_prefix(self):
+        with mock.patch.object(self.registry, "search", wraps=self.registry.search) as search:
+            responses = {self.registry.search_json(prefix) for prefix in ("NE", "ne", " ne", "Ne ")}
+        self.assertEqual(len(responses), 1)
+        search.assert_called_once_with("ne", 10)
+        countries = json.loads(responses.pop())["countries"]
+        self.assertEqual([country["code"] for country in countries], ["NE", "NL", "NZ"])
+
+
+class CountrySearchViewTests(SimpleTestCase):
+    def test_consistent_for_case_and_whitespace(self):
+        with mock.patch.object(views, "registry", CountryRegistry(CHOICES)):
+            responses = [
+                views.country_search(RequestFactory().get("/", {"q": q, "limit": 2})).content
+                for q in ("NE", "ne", " ne")
+            ]
+        self.assertEqual(responses[0], responses[1])
+        self.assertEqual(responses[0], responses[2])
+        self.assertEqual([country["code"] for country in json.loads(responses[0])["countries"]], ["NE", "NL"])
@@ -0,0 +1,67 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.utils import timezone
+
+import json
+import datetime
+
+from common_api import dbjson
+from common_api.tests.models import Event, User
+
+FIELDS = {
+    "name": "name",
+    "day": "day",
+    "starts": "starts_at",
+    "created": "creation_date",
+    "attendees": "attendees",
+    "organizer": "organizer_id",
+}
+
+
+class GetJsonArrayTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organizer = User.objects.create(username="organizer", phone_number="9800000000")
+        starts_at = datetime.datetime(2024, 5, 1, 10, 30, tzinfo=datetime.timezone.utc)
+        Event.objects.bulk_create([
+            Event(name="b", day=datetime.date(2024, 5, 1), starts_at=starts_at.replace(microsecond=123456),
+                  attendees=3, organizer=organizer),
+            Event(name="a", day=None, starts_at=starts_at, organizer=None),
+            Event(name="c", day=datetime.date(2024, 1, 9), starts_at=starts_at.replace(microsecond=500)),
+        ])
+
+    def assertSameAsPython(self, queryset, fields=FIELDS):
+        array = dbjson.get_json_array(queryset, fields)
+        self.assertIsNotNone(array)
+        expected = json.loads(json.dumps([obj.serialize(fields=fields) for obj in queryset], cls=DjangoJSONEncoder))
+        self.assertEqual(array.decode(), expected)
+        self.assertEqual(array.rows, len(expected))
+        return array.decode()
+
+    def test_types_and_nulls(self):
+        events = self.assertSameAsPython(Event.objects.order_by("name"))
+        self.assertEqual(events[0]["day"], None)
+        self.assertEqual(events[0]["organizer"], None)
+        self.assertEqual(events[1]["starts"], "2024-05-01T10:30:00.123Z")  # Microseconds truncated !!
+        self.assertEqual(events[2]["starts"], "2024-05-01T10:30:00.000Z")
+        self.assertEqual(events[0]["starts"], "2024-05-01T10:30:00Z")
+
+    def test_ordering_kept(self):
+        # `json_group_array` keeps the order of the rows subquery !!
+        events = self.assertSameAsPython(Event.objects.order_by("-name"))
+        self.assertEqual([event["name"] for event in events], ["c", "b", "a"])
+        events = self.assertSameAsPython(Event.objects.order_by("day", "name")[1:])
+        self.assertEqual([event["name"] for event in events], ["c", "b"])
+
+    def test_empty(self):
+        for queryset in (Event.objects.filter(pk=0), Event.objects.none()):
+            self.assertEqual(dbjson.get_json_array(queryset, FIELDS).decode(), [])
+
+    def test_unsupported_fields(self):
+        self.assertIsNone(dbjson.get_json_array(Event.objects.all(), {"organizer": "organizer.username"}))
+        self.assertIsNone(dbjson.get_json_array(Event.objects.all(), {"created": "humanized_creation_date"}))
+        self.assertIsNone(dbjson.get_json_array(Event.objects.all(), {"organizer": "organizer"}))
+
+    def test_current_time(self):
+        Event.objects.update(starts_at=timezone.now())
+        self.assertSameAsPython(Event.objects.order_by("name"))
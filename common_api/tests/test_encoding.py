@@ -0,0 +1,82 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+import json
+import asyncio
+import datetime
+import threading
+
+from common_api import encoding
+
+PAYLOAD = {
+    "data": [{"id": index, "name": f"name {index}", "date": datetime.date(2024, 1, 1)} for index in range(200)],
+    "message": gettext_lazy("Success"),
+}
+
+
+class EncodingTestCase(SimpleTestCase):
+    def setUp(self):
+        encoding.stats.reset()
+        encoding.shutdown()
+        self.addCleanup(encoding.shutdown)
+
+    def aencode(self, data, **kwargs):
+        return asyncio.run(encoding.aencode(data, **kwargs))
+
+
+class EstimateSizeTests(SimpleTestCase):
+    def test_estimate_close_to_encoded_size(self):
+        data = {"data": [{"name": "x" * 20, "id": index} for index in range(100)]}
+        size = len(encoding.encode(data))
+        self.assertAlmostEqual(encoding.estimate_size(data), size, delta=size * 0.3)
+
+    def test_walk_stops_after_limit(self):
+        self.assertLess(encoding.estimate_size(["x" * 10] * 10000, limit=100), 200)
+
+
+class AencodeTests(EncodingTestCase):
+    def test_small_payload_inline(self):
+        self.assertEqual(self.aencode(PAYLOAD), encoding.encode(PAYLOAD))
+        self.assertEqual(encoding.stats.as_dict()["inline"], 1)
+        self.assertIsNone(encoding._executor)
+
+    @override_settings(COMMON_API_ENCODING_THRESHOLD=10, COMMON_API_ENCODING_WORKERS=1)
+    def test_process_pool_by_default(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.assertEqual(self.aencode(PAYLOAD), encoding.encode(PAYLOAD))
+        self.assertIsInstance(encoding._executor, ProcessPoolExecutor)
+        self.assertEqual(encoding.stats.as_dict()["offloaded"], 1)
+
+    @override_settings(COMMON_API_ENCODING_THRESHOLD=10, COMMON_API_ENCODING_EXECUTOR="thread")
+    def test_thread_pool(self):
+        self.assertEqual(self.aencode(PAYLOAD), encoding.encode(PAYLOAD))
+        self.assertEqual(encoding.stats.as_dict()["offloaded"], 1)
+
+    @override_settings(COMMON_API_ENCODING_THRESHOLD=10, COMMON_API_ENCODING_WORKERS=1)
+    def test_unpicklable_payload_encoded_inline(self):
+        class Encoder(DjangoJSONEncoder):  # Local classes can't be pickled !!
+            def default(self, o):
+                return "lock" if isinstance(o, type(threading.Lock())) else super().default(o)
+
+        data = {"data": [threading.Lock()] * 20}
+        self.assertEqual(self.aencode(data, encoder=Encoder), encoding.encode(data, Encoder))
+        self.assertEqual(encoding.stats.as_dict()["inline"], 1)
+
+    @override_settings(COMMON_API_ENCODING_THRESHOLD=10, COMMON_API_ENCODING_EXECUTOR="thread")
+    def test_encoding_errors_raised(self):
+        with self.assertRaises(TypeError):
+            self.aencode({"data": [object()] * 20})
+
+    @override_settings(
+        COMMON_API_ENCODING_THRESHOLD=10, COMMON_API_ENCODING_EXECUTOR="thread", COMMON_API_ENCODING_MAX_PENDING=1
+    )
+    def test_saturated_pool_encodes_inline(self):
+        executor, pending_jobs = encoding._get_executor()
+        pending_jobs.acquire()
+        try:
+            self.assertEqual(json.loads(self.aencode(PAYLOAD)), json.loads(encoding.encode(PAYLOAD)))
+        finally:
+            pending_jobs.release()
+        self.assertEqual(encoding.stats.as_dict()["saturated"], 1)
@@ -0,0 +1,67 @@
+from django.http import QueryDict
+from django.test import TestCase
+
+from common_api import exceptions, fieldsets
+from common_api.tests.models import Article, User
+
+FIELDS = {
+    "title": "title",
+    "body": "body",
+    "author": "author.username",
+    "created": "humanized_creation_date",
+}
+
+
+class SelectFieldsTests(TestCase):
+    def test_fields_and_exclude(self):
+        self.assertEqual(list(fieldsets.select_fields(QueryDict("fields=body,title"), FIELDS)), ["title", "body"])
+        self.assertEqual(list(fieldsets.select_fields(QueryDict("exclude=body"), FIELDS)), ["title", "author", "created"])
+
+    def test_unknown_field(self):
+        with self.assertRaises(exceptions.InvalidFieldSelection):
+            fieldsets.select_fields(QueryDict("fields=password"), FIELDS)
+
+
+class ColumnPlanTests(TestCase):
+    def test_relations_and_dependencies(self):
+        plan = fieldsets.get_column_plan(Article, FIELDS)
+        self.assertEqual(plan.only, ["author__username", "body", "creation_date", "title"])
+        self.assertEqual(plan.select_related, ["author"])
+
+    def test_unresolvable_path_reads_every_column(self):
+        self.assertIsNone(fieldsets.get_column_plan(Article, {"title": "title", "other": "get_other"}).only)
+
+
+class ApplyFieldSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username="author", password="password")
+        Article.objects.create(title="Title", body="Body", author=author)
+        cls.other_author = User.objects.create_user(username="other", phone_number="9811111111", password="password")
+
+    def test_columns_pruned(self):
+        objects, fields = fieldsets.apply_field_selection(QueryDict("fields=title"), Article.objects.all(), FIELDS)
+        self.assertEqual(fields, {"title": "title"})
+        article = objects.get()
+        self.assertEqual(article.get_deferred_fields(), {"body", "author_id", "views", "creation_date", "update_date"})
+
+    def test_view_select_related_not_selected_by_client(self):
+        # Relation joined by the view would be deferred by `only()` and traversed at once !!
+        queryset = Article.objects.select_related("author")
+        objects, fields = fieldsets.apply_field_selection(QueryDict("fields=title"), queryset, FIELDS)
+        with self.assertNumQueries(1):
+            self.assertEqual([article.title for article in objects], ["Title"])
+
+    def test_view_select_related_selected_by_client(self):
+        queryset = Article.objects.select_related("author")
+        objects, fields = fieldsets.apply_field_selection(QueryDict("fields=author"), queryset, FIELDS)
+        with self.assertNumQueries(1):
+            self.assertEqual([article.author.username for article in objects], ["author"])
+
+    def test_prefetched_relation_columns_kept(self):
+        Article.objects.bulk_create([Article(title=str(index), author=self.other_author) for index in range(3)])
+        queryset = Article.objects.prefetch_related("author")
+        objects, fields = fieldsets.apply_field_selection(QueryDict("fields=title"), queryset, FIELDS)
+        with self.assertNumQueries(2):  # Articles and their authors, not a query per article !!
+            self.assertEqual(len({article.author.pk for article in objects}), 2)
+        self.assertEqual(objects[0].get_deferred_fields(), {"body", "views", "creation_date", "update_date"})
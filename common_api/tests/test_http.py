@@ -0,0 +1,169 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+import json
+import datetime
+from unittest import mock
+
+from common_api import http
+from common_api.dbjson import RawJSON
+from common_api.tests.models import Article, User
+
+
+def get_baseline(user_data=None, messages=None, **data) -> dict:
+    """Envelope built by `ResponseManager` before sections were made lazy."""
+    return {
+        "messages": {"error": [], "info": [], "success": [], "warning": [], **(messages or {})},
+        "field_errors": {},
+        "has_errors": bool(messages and messages.get("error")),
+        "pagination": {},
+        "has_pagination_data": False,
+        **(user_data or {}),
+        **data,
+    }
+
+
+class ResponseManagerTests(SimpleTestCase):
+    def setUp(self):
+        http._HEAD_FRAGMENTS.clear()
+        self.addCleanup(http._HEAD_FRAGMENTS.clear)
+
+    def assertCompiled(self, get_manager, expected: dict):
+        """Compiles twice, so that the second response uses the pre-encoded head."""
+        for _ in range(2):
+            response = get_manager().compile(False)
+            self.assertEqual(response.content, json.dumps(expected, cls=DjangoJSONEncoder).encode())
+            self.assertEqual(json.loads(json.dumps(response.envelope, cls=DjangoJSONEncoder)), expected)
+        self.assertEqual(json.loads(json.dumps(get_manager().compile(True), cls=DjangoJSONEncoder)), expected)
+
+    def get_request(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_plain(self):
+        self.assertCompiled(http.ResponseManager, get_baseline())
+        self.assertCompiled(
+            lambda: http.ResponseManager(name="value", date=datetime.date(2024, 1, 1)),
+            get_baseline(name="value", date="2024-01-01"),
+        )
+
+    def test_message_only(self):
+        def get_manager():
+            res = http.ResponseManager()
+            res.add_info_message(title="Title", message="Message")
+            return res
+
+        self.assertCompiled(
+            get_manager, get_baseline(messages={"info": [{"title": "Title", "message": "Message", "type": "info"}]})
+        )
+
+        res = http.ResponseManager()
+        res.add_error_message(title="Title", message="Message")
+        self.assertTrue(res.compile(True)["has_errors"])
+
+    def test_user_data(self):
+        self.assertCompiled(
+            lambda: http.ResponseManager(self.get_request(), append_user_data=True, name="value"),
+            get_baseline({"is_logged_in": False, "is_superuser": False}, name="value"),
+        )
+        user = mock.Mock(is_authenticated=True, is_superuser=True)
+        self.assertCompiled(
+            lambda: http.ResponseManager(self.get_request(user), append_user_data=True),
+            get_baseline({"is_logged_in": True, "is_superuser": True}),
+        )
+
+    def test_compact(self):
+        self.assertCompiled(
+            lambda: http.ResponseManager(compact=True, name="value"),
+            {"envelope_version": http.ENVELOPE_VERSION, "has_errors": False, "name": "value"},
+        )
+
+        res = http.ResponseManager(compact=True)
+        res.add_warning_message(title="Title", message="Message")
+        res.add_paginator_data(page=mock.Mock(**{"has_next.return_value": False, "has_previous.return_value": False}))
+        self.assertEqual(res.compile(True), {
+            "envelope_version": http.ENVELOPE_VERSION,
+            "has_errors": False,
+            "messages": {"warning": [{"title": "Title", "message": "Message", "type": "warning"}]},
+            "pagination": {"has_next_page": False, "has_previous_page": False},
+        })
+
+    def test_raw_json_spliced(self):
+        def get_manager():
+            # String looking like a placeholder isn't replaced, placeholders have a random token !!
+            return http.ResponseManager(items=RawJSON('[{"id": 1}]', rows=1), text="common_api_raw_0_0")
+
+        self.assertCompiled(get_manager, get_baseline(items=[{"id": 1}], text="common_api_raw_0_0"))
+
+        # Data containing the placeholder of the token, another token is used !!
+        with mock.patch.object(http.secrets, "token_hex", side_effect=["0", "1"]):
+            response = http.ResponseManager(
+                text="common_api_raw_0_0", items=RawJSON('["common_api_raw_1_1"]'), other=RawJSON("{}")
+            ).compile(False)
+        self.assertEqual(
+            json.loads(response.content), get_baseline(text="common_api_raw_0_0", items=["common_api_raw_1_1"], other={})
+        )
+
+    def test_items_routed_to_sections(self):
+        res = http.ResponseManager(self.get_request(), append_user_data=True)
+        res["pagination"]["total_results"] = 5
+        res["has_pagination_data"] = True
+        res["field_errors"] = {"name": ["Required."]}
+        res["has_errors"] = True  # Computed while compiling !!
+        res["is_superuser"] = True
+        res["name"] = "value"
+
+        self.assertEqual(res["name"], "value")
+        self.assertTrue(res["is_superuser"])
+        self.assertFalse(res["has_errors"])
+        with self.assertRaises(KeyError):
+            res["missing"]  # NOQA
+
+        envelope = res.compile(True)
+        self.assertEqual(envelope["pagination"], {"total_results": 5})
+        self.assertTrue(envelope["has_pagination_data"])
+        self.assertEqual(envelope["field_errors"], {"name": ["Required."]})
+        self.assertFalse(envelope["has_errors"])
+        self.assertEqual((envelope["is_logged_in"], envelope["is_superuser"]), (False, True))  # Same as baseline !!
+        self.assertEqual(list(envelope)[-1], "name")
+
+    def test_json_response_arguments(self):
+        response = http.ResponseManager(name="value").compile(False, json_dumps_params={"indent": 2})
+        self.assertEqual(json.loads(response.content), get_baseline(name="value"))
+
+
+class AsyncResponseManagerTests(TestCase):
+    FIELDS = {"title": "title", "author": "author.username"}
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username="author", phone_number="9800000000")
+        for index in range(5):
+            Article.objects.create(title=str(index), author=author)
+
+    async def test_list_same_as_sync(self):
+        queryset = Article.objects.select_related("author").order_by("pk")
+        res = http.ResponseManager()
+        await res.aadd_list_view_data("articles", queryset, self.FIELDS, chunk_size=2)
+        expected = http.ResponseManager()
+        await sync_to_async(expected.add_list_view_data)("articles", queryset, self.FIELDS)
+        self.assertEqual((await res.acompile()).content, expected.compile(False).content)
+
+    async def test_detail_relations_loaded(self):
+        # Relation isn't loaded, serialized outside the event loop !!
+        res = http.ResponseManager()
+        article = await res.aadd_db_data("article", Article.objects.filter(title="0"), self.FIELDS)
+        self.assertEqual(res["article"], {"title": "0", "author": "author"})
+        self.assertEqual(article.title, "0")
+
+    async def test_raw_json_spliced(self):
+        fragment = '[{"id":1,"title":"a"}]'  # Whitespace of database JSON is kept !!
+        res = http.ResponseManager(items=RawJSON(fragment, rows=1), text="value")
+        response = await res.acompile()
+        self.assertIn(fragment.encode(), response.content)
+        self.assertEqual(response.content, http.ResponseManager(items=RawJSON(fragment), text="value").compile(False).content)
+        self.assertEqual(response.envelope["items"], [{"id": 1, "title": "a"}])
+        self.assertEqual((await res.acompile(raw=True))["items"], [{"id": 1, "title": "a"}])
@@ -0,0 +1,51 @@
+from django.contrib.humanize.templatetags import humanize
+from django.test import SimpleTestCase, modify_settings
+from django.utils import translation
+
+import random
+import datetime
+from unittest import mock
+
+from common_api import humanizers
+
+NOW = datetime.datetime(2024, 3, 15, 12, 30, 45, 123456, tzinfo=datetime.timezone.utc)
+
+# Edges of every unit of `naturaltime`, in seconds !!
+EDGES = [0, 1, 59, 60, 61, 3599, 3600, 3601, 86399, 86400, 86401, 7 * 86400, 30 * 86400, 31 * 86400, 365 * 86400,
+         366 * 86400, 2 * 365 * 86400 + 5]
+
+
+class MockDateTime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz) if tz else NOW.astimezone().replace(tzinfo=None)
+
+
+def get_values():
+    generator = random.Random(29)
+    offsets = EDGES + [generator.randint(0, 3 * 365 * 86400) for _ in range(300)]
+    for offset in offsets:
+        for sign in (-1, 1):
+            delta = datetime.timedelta(seconds=sign * offset)
+            yield NOW + delta
+            yield (NOW + delta).astimezone(datetime.timezone(datetime.timedelta(hours=5, minutes=45)))
+            yield (NOW + delta).astimezone().replace(tzinfo=None)
+
+
+@modify_settings(INSTALLED_APPS={"append": "django.contrib.humanize"})
+class BatchHumanizerTests(SimpleTestCase):
+    def test_same_as_naturaltime(self):
+        values = list(get_values())
+        with mock.patch.object(humanize, "datetime", MockDateTime):
+            for language in ("en", "de", "fr", "ne"):
+                humanizer = humanizers.BatchHumanizer(NOW)
+                with translation.override(language):
+                    for value in values:
+                        with self.subTest(language=language, value=value):
+                            self.assertEqual(humanizer(value), humanize.naturaltime(value))
+
+    def test_batch_humanize_uses_active_humanizer(self):
+        value = NOW - datetime.timedelta(minutes=5)
+        with humanizers.batch_humanize(humanizers.BatchHumanizer(NOW)):
+            self.assertEqual(humanizers.naturaltime(value), "5\xa0minutes ago")
+
@@ -0,0 +1,138 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import sys
+from unittest import mock
+
+from common_api import metrics, views
+
+
+def get_dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class MetricsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(COMMON_API_METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.registry = metrics.Registry()
+        self.registry._thread = object()  # Files are written by the tests !!
+        self.counter = self.registry.counter("test_total", "Test counter.", ("label",))
+
+    def write_snapshot(self, name, pid, updated_at, value):
+        with open(os.path.join(self.directory, name), "w") as file:
+            json.dump({"pid": pid, "updated_at": updated_at, "values": [["test_total", ["a"], value]]}, file)
+
+    def get_total(self):
+        return self.registry.collect().get(("test_total", ("a",)), 0)
+
+
+class RegistryTests(MetricsTestCase):
+    def test_file_named_by_pid_and_start(self):
+        self.registry.flush()
+        name, = os.listdir(self.directory)
+        self.assertTrue(name.startswith(f"metrics_{os.getpid()}_"))
+        self.assertNotEqual(metrics.Registry()._file_name, self.registry._file_name)
+
+    def test_live_processes_summed(self):
+        self.counter.inc(2, label="a")
+        self.write_snapshot(f"metrics_{os.getppid()}_1.json", os.getppid(), time.time(), 3)
+        self.assertEqual(self.get_total(), 5)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"metrics_{os.getppid()}_1.json")))
+
+    def test_dead_processes_merged_into_tombstone(self):
+        dead_pid = get_dead_pid()
+        self.write_snapshot(f"metrics_{dead_pid}_1.json", dead_pid, time.time(), 3)
+        self.write_snapshot(f"metrics_{os.getppid()}_1.json", os.getppid(), time.time() - 3600, 4)  # Stale !!
+
+        self.assertEqual(self.get_total(), 7)
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), ["metrics.lock", metrics.TOMBSTONE_FILE]
+        )
+        self.assertEqual(self.get_total(), 7)  # Merged values are counted once !!
+
+    def test_file_left_after_merge_not_counted_twice(self):
+        dead_pid = get_dead_pid()
+        name = f"metrics_{dead_pid}_1.json"
+        self.write_snapshot(name, dead_pid, time.time(), 3)
+        with mock.patch("os.remove"):
+            self.assertEqual(self.get_total(), 3)
+            self.assertEqual(self.get_total(), 3)
+
+    def test_stale_temporary_files_removed(self):
+        path = os.path.join(self.directory, f"metrics_{get_dead_pid()}_1.json.1.tmp")
+        open(path, "w").close()
+        self.get_total()
+        self.assertTrue(os.path.exists(path))
+
+        os.utime(path, (time.time() - 3600, time.time() - 3600))
+        self.get_total()
+        self.assertFalse(os.path.exists(path))
+
+    def test_recording_doesnt_write_files(self):
+        registry = metrics.Registry()
+        counter = registry.counter("test_total", "Test counter.")
+        with mock.patch.object(registry, "flush") as flush, mock.patch.object(registry, "_run"):
+            counter.inc()
+            flush.assert_not_called()
+        self.assertIsNotNone(registry._thread)
+
+
+class RecordRequestTests(SimpleTestCase):
+    def test_unknown_methods_grouped(self):
+        factory = RequestFactory()
+        with mock.patch.object(metrics.requests_total, "inc") as inc, \
+                mock.patch.object(metrics.request_duration, "observe"):
+            metrics.record_request(factory.get("/"), HttpResponse(), 0.1)
+            metrics.record_request(factory.generic("FOOBAR", "/"), HttpResponse(), 0.1)
+        self.assertEqual([call.kwargs["method"] for call in inc.call_args_list], ["GET", "other"])
+
+    def test_exposition(self):
+        registry = metrics.Registry()
+        registry._thread = object()
+        registry.counter("test_total", "Test counter.", ("label",)).inc(label='a"b')
+        registry.histogram("test_seconds", "Test histogram.", buckets=(1,)).observe(0.5)
+        with override_settings(COMMON_API_METRICS_DIR=None):
+            text = registry.expose()
+        self.assertIn('test_total{label="a\\"b"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1"} 1', text)
+        self.assertIn('test_seconds_count 1', text)
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get_response(self, user=None, **meta):
+        request = RequestFactory().get("/metrics/", **meta)
+        request.user = user or AnonymousUser()
+        with override_settings(COMMON_API_METRICS_DIR=None):
+            return views.metrics(request)
+
+    def test_anonymous_clients_forbidden(self):
+        self.assertEqual(self.get_response().status_code, 403)
+
+    @override_settings(COMMON_API_METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_allowed_address(self):
+        self.assertEqual(self.get_response(REMOTE_ADDR="10.0.0.5").status_code, 200)
+        self.assertEqual(self.get_response(REMOTE_ADDR="10.0.0.6").status_code, 403)
+
+    def test_staff_user(self):
+        user = mock.Mock(is_staff=True)
+        self.assertEqual(self.get_response(user).status_code, 200)
+
+    @override_settings(ROOT_URLCONF="common_api.tests.urls")
+    def test_not_routed_by_default(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse("common_api:metrics")
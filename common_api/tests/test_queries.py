@@ -0,0 +1,89 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from common_api import exceptions, queries
+from common_api.tests.models import Article, User
+
+
+class NormalizeSqlTests(TestCase):
+    def test_literals_and_lists_collapsed(self):
+        self.assertEqual(
+            queries.normalize_sql("SELECT * FROM a WHERE id IN (%s, %s) AND  name = 'x' AND n = 10"),
+            "SELECT * FROM a WHERE id IN (...) AND name = ? AND n = ?",
+        )
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            author = User.objects.create(username=f"author_{index}", phone_number=f"980000000{index}")
+            Article.objects.create(title=str(index), author=author)
+
+    def test_within_budget(self):
+        with queries.query_budget(1, strict=True) as budget:
+            list(Article.objects.all())
+        self.assertEqual(budget.count, 1)
+
+    def test_exceeded_budget_raises(self):
+        with self.assertRaises(exceptions.QueryBudgetExceeded):
+            with queries.query_budget(1, strict=True):
+                Article.objects.count()
+                Article.objects.count()
+
+    def test_exceeded_budget_logged_if_not_strict(self):
+        with self.assertLogs("common_api.queries", "WARNING") as logs:
+            with queries.query_budget(1, strict=False):
+                Article.objects.count()
+                Article.objects.count()
+        self.assertIn("Query budget of 1 queries exceeded", logs.output[0])
+
+    @override_settings(COMMON_API_QUERY_BUDGET_STRICT=True)
+    def test_strict_setting(self):
+        with self.assertRaises(exceptions.QueryBudgetExceeded):
+            with queries.query_budget(0):
+                Article.objects.count()
+
+    def test_repeated_queries_attributed_to_field(self):
+        with queries.QueryRecorder() as recorder:
+            [article.serialize(fields={"title": "title", "author": "author.username"}) for article in Article.objects.all()]
+
+        repeated, = recorder.get_repeated_shapes()
+        self.assertEqual(repeated["count"], 3)
+        self.assertEqual(repeated["field_paths"], {"Article.author.username": 3})
+        self.assertIn("Probable N+1, executed 3 times from Article.author.username (3)", recorder.report())
+
+    def test_max_repeated(self):
+        with self.assertRaises(exceptions.QueryBudgetExceeded):
+            with queries.query_budget(10, max_repeated=1, strict=True):
+                [article.author for article in Article.objects.all()]
+
+    def test_decorated_view(self):
+        @queries.query_budget(1, strict=True)
+        def view(request):
+            return HttpResponse(str([article.author.username for article in Article.objects.all()]))
+
+        with self.assertRaises(exceptions.QueryBudgetExceeded):
+            view(RequestFactory().get("/"))
+
+        @queries.query_budget(1, strict=True)
+        def select_related_view(request):
+            return HttpResponse(str([article.author.username for article in Article.objects.select_related("author")]))
+
+        self.assertEqual(select_related_view(RequestFactory().get("/")).status_code, 200)
+
+    async def test_decorated_async_view(self):
+        @queries.query_budget(1, strict=True)
+        async def view(request):
+            await Article.objects.acount()
+            await Article.objects.acount()
+            return HttpResponse()
+
+        with self.assertRaises(exceptions.QueryBudgetExceeded):
+            await view(RequestFactory().get("/"))
+
+        @queries.query_budget(1, strict=True)
+        async def within_budget_view(request):
+            return HttpResponse(await Article.objects.acount())
+
+        self.assertEqual((await within_budget_view(RequestFactory().get("/"))).content, b"3")
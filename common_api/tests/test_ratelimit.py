@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from common_api import decorators, ratelimit
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_rates(self):
+        self.assertEqual(ratelimit.parse_rate("10/m"), (10, 60))
+        self.assertEqual(ratelimit.parse_rate("5/30s"), (5, 30))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate("10/w")
+
+
+class GetIpTests(SimpleTestCase):
+    def get_request(self, forwarded_for=None):
+        meta = {"REMOTE_ADDR": "10.0.0.1"}
+        if forwarded_for is not None:
+            meta["HTTP_X_FORWARDED_FOR"] = forwarded_for
+        return RequestFactory().get("/", **meta)
+
+    def test_remote_addr_without_proxies(self):
+        self.assertEqual(ratelimit.get_ip(self.get_request("1.1.1.1")), "10.0.0.1")
+
+    @override_settings(COMMON_API_RATE_LIMIT_PROXY_COUNT=1)
+    def test_client_set_entries_ignored(self):
+        self.assertEqual(ratelimit.get_ip(self.get_request("6.6.6.6, 2.2.2.2")), "2.2.2.2")
+
+    @override_settings(COMMON_API_RATE_LIMIT_PROXY_COUNT=2)
+    def test_entry_of_outermost_trusted_proxy(self):
+        self.assertEqual(ratelimit.get_ip(self.get_request("6.6.6.6, 2.2.2.2, 172.16.0.1")), "2.2.2.2")
+
+    @override_settings(COMMON_API_RATE_LIMIT_PROXY_COUNT=2)
+    def test_short_header_falls_back_to_remote_addr(self):
+        self.assertEqual(ratelimit.get_ip(self.get_request("2.2.2.2")), "10.0.0.1")
+        self.assertEqual(ratelimit.get_ip(self.get_request()), "10.0.0.1")
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_local_bucket(self):
+        limiter = ratelimit.RateLimiter("2/m", "test")
+        self.assertTrue(limiter.check("key").allowed)
+        self.assertTrue(limiter.check("key").allowed)
+        result = limiter.check("key")
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.get_headers()["Retry-After"], "30")
+        self.assertTrue(limiter.check("other").allowed)
+
+    def test_shared_limit_across_limiters(self):
+        # Limiters of two workers with own local buckets !!
+        limiters = [ratelimit.RateLimiter("3/d", "test", shared=True) for _ in range(2)]
+        allowed = [limiters[index % 2].check("key").allowed for index in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+
+    def test_local_buckets_pruned(self):
+        buckets = ratelimit.LocalBuckets(max_keys=2)
+        for key in ("a", "b", "c"):
+            buckets.consume(key, 10, 60)
+        self.assertLessEqual(len(buckets.buckets), 2)
+
+
+class RateLimitDecoratorTests(SimpleTestCase):
+    def test_throttled_response(self):
+        @decorators.rate_limit("1/m", key="ip", methods=["POST"])
+        def view(request):
+            return HttpResponse()
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get("/")).status_code, 200)
+        response = view(factory.post("/"))
+        self.assertEqual((response.status_code, response["RateLimit-Remaining"]), (200, "0"))
+        response = view(factory.post("/"))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    async def test_async_view(self):
+        @decorators.rate_limit("1/m", key="ip")
+        async def view(request):
+            return HttpResponse()
+
+        response = await view(RequestFactory().get("/"))
+        self.assertEqual((response.status_code, response["RateLimit-Remaining"]), (200, "0"))
+        response = await view(RequestFactory().get("/"))
+        self.assertEqual(response.status_code, 429)
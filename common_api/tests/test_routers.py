@@ -0,0 +1,101 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+import time
+import asyncio
+
+from common_api import decorators, routers
+from common_api.middlewares import ReadYourWritesMiddleware
+from common_api.tests.models import Tag
+
+router = routers.ReplicaRouter()
+
+
+@override_settings(COMMON_API_READ_REPLICAS=["replica_1", "replica_2"])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_and_writes(self):
+        with routers.database_state():
+            self.assertEqual(router.db_for_read(Tag), "default")
+            with routers.read_from_replica() as alias:
+                self.assertIn(alias, ("replica_1", "replica_2"))
+                self.assertEqual(router.db_for_read(Tag), alias)
+                self.assertEqual(router.db_for_write(Tag), "default")
+                self.assertEqual(router.db_for_read(Tag), "default")  # Reads stick to primary after a write !!
+
+    def test_round_robin(self):
+        aliases = []
+        for _ in range(4):
+            with routers.read_from_replica() as alias:
+                aliases.append(alias)
+        self.assertEqual(sorted(aliases), ["replica_1", "replica_1", "replica_2", "replica_2"])
+
+    def test_state_outside_request_is_not_stored(self):
+        routers.get_state().wrote = True
+        router.db_for_write(Tag)
+        self.assertFalse(routers.get_state().wrote)
+        with routers.read_from_replica() as alias:
+            self.assertEqual(router.db_for_read(Tag), alias)
+        self.assertIsNone(routers._request_state.get())
+
+    def test_migrations_skip_replicas(self):
+        self.assertIs(router.allow_migrate("replica_1", "common_api"), False)
+        self.assertIsNone(router.allow_migrate("default", "common_api"))
+
+
+@override_settings(COMMON_API_READ_REPLICAS=["replica"])
+class ReadYourWritesTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.read_aliases = []
+
+    def get_response(self, request):
+        @decorators.read_only
+        def view(request_):
+            self.read_aliases.append(router.db_for_read(Tag))
+            if request_.GET.get("write"):
+                router.db_for_write(Tag)
+            return HttpResponse()
+
+        return view(request)
+
+    def call(self, request):
+        return ReadYourWritesMiddleware(self.get_response)(request)
+
+    def test_write_sets_cookie(self):
+        response = self.call(self.factory.get("/", {"write": 1}))
+        self.assertIn(routers.get_pin_key(), response.cookies)
+        self.assertEqual(self.read_aliases, ["replica"])
+
+        response = self.call(self.factory.get("/"))
+        self.assertNotIn(routers.get_pin_key(), response.cookies)
+
+    def test_pinned_client_reads_primary(self):
+        request = self.factory.get("/")
+        request.COOKIES[routers.get_pin_key()] = str(time.time() + 5)
+        self.call(request)
+
+        request = self.factory.get("/")
+        request.COOKIES[routers.get_pin_key()] = str(time.time() - 1)
+        self.call(request)
+
+        request = self.factory.get("/")
+        request.COOKIES[routers.get_pin_key()] = "invalid"
+        self.call(request)
+        self.assertEqual(self.read_aliases, ["default", "replica", "replica"])
+
+    def test_unsafe_methods_read_primary(self):
+        self.call(self.factory.post("/"))
+        self.assertEqual(self.read_aliases, ["default"])
+
+    async def test_async_view_reads_replica(self):
+        @decorators.read_only
+        async def view(request):
+            await asyncio.sleep(0)
+            # ORM calls of async views route in the thread of `sync_to_async` !!
+            self.read_aliases.append(await sync_to_async(router.db_for_read)(Tag))
+            return HttpResponse()
+
+        await view(self.factory.get("/"))
+        await view(self.factory.post("/"))
+        self.assertEqual(self.read_aliases, ["replica", "default"])
@@ -0,0 +1,154 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from common_api import search
+from common_api.tests.models import Post
+
+
+class BackendTests(TestCase):
+    def test_backend_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            search.SearchBackend()
+
+    @override_settings(COMMON_API_SEARCH_SQLITE_PATH=None)
+    def test_sqlite_path_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            search.SQLiteFTS5Backend()
+
+    def test_match_query(self):
+        self.assertEqual(search.build_match_query('django "orm'), '"django" "orm"*')
+        self.assertIsNone(search.build_match_query("  ,. "))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(COMMON_API_SEARCH_SQLITE_PATH=os.path.join(directory, "search.sqlite3"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.queue = search.SearchQueue()
+        self.queue._thread = object()  # Flushed by the tests !!
+        for patcher in (mock.patch.object(search, "queue", self.queue), mock.patch.object(search, "_backend", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create(self, title, body=""):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(title=title, body=body)
+
+    def test_saved_and_deleted_rows(self):
+        django = self.create("Django tips", "Querysets are lazy")
+        flask = self.create("Flask tips")
+        self.queue.flush()
+        self.assertCountEqual(search.search(Post, "tip"), [django.pk, flask.pk])
+        self.assertEqual(search.search(Post, "lazy"), [django.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            django.delete()
+        self.queue.flush()
+        self.assertEqual(search.search(Post, "tips"), [flask.pk])
+
+    def test_ranked_queryset(self):
+        self.create("Other", "django")
+        best = self.create("Django", "django")
+        self.queue.flush()
+        self.assertEqual(list(search.get_ranked_queryset(Post.objects.all(), "django"))[0], best)
+        self.assertFalse(search.get_ranked_queryset(Post.objects.all(), "missing").exists())
+
+    def test_ranked_queryset_filtered_and_paged(self):
+        posts = [self.create(f"Django {index}") for index in range(12)]
+        self.queue.flush()
+        # Most matches fail the filter, pages are filled from further batches !!
+        kept = [post.pk for post in posts if post.pk % 4 == 0]
+        queryset = Post.objects.filter(pk__in=kept)
+        first = list(search.get_ranked_queryset(queryset, "django", limit=2, batch_size=3))
+        second = list(search.get_ranked_queryset(queryset, "django", limit=2, offset=2, batch_size=3))
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertCountEqual([post.pk for post in first + second], kept)
+
+    def test_failed_flush_queued_again(self):
+        post = self.create("Django")
+        with mock.patch.object(search.SQLiteFTS5Backend, "index", side_effect=OSError), \
+                self.assertLogs("common_api.search", "ERROR"):
+            self.queue.flush()
+        self.assertIn(str(post.pk), self.queue.pending[Post])
+
+        self.queue.flush()
+        self.assertEqual(search.search(Post, "django"), [post.pk])
+
+    def test_failed_flush_keeps_newer_changes(self):
+        post = self.create("Old")
+
+        def write(model, changes):
+            self.queue.add(Post, post.pk, ["New", ""])  # Saved while writing !!
+            raise OSError
+
+        with mock.patch.object(self.queue, "write", side_effect=write), \
+                self.assertLogs("common_api.search", "ERROR"):
+            self.queue.flush()
+        self.assertEqual(self.queue.pending[Post][str(post.pk)], ["New", ""])
+
+    def test_rebuild_swaps_index(self):
+        post = self.create("Django")
+        Post.objects.filter(pk=post.pk).update(title="Flask")  # Not indexed, `post_save` isn't sent !!
+        self.queue.flush()
+        self.assertEqual(search.search(Post, "django"), [post.pk])
+
+        backend = search.get_backend()
+        replace = backend.replace
+
+        def replace_with_search(model, chunks):
+            chunks = list(chunks)
+            self.assertEqual(search.search(Post, "django"), [post.pk])  # Old index is searched meanwhile !!
+            return replace(model, chunks)
+
+        with mock.patch.object(backend, "replace", side_effect=replace_with_search):
+            self.assertEqual(search.rebuild(Post, chunk_size=1), 1)
+        self.assertEqual(search.search(Post, "django"), [])
+        self.assertEqual(search.search(Post, "flask"), [post.pk])
+
+    def test_changes_during_rebuild_written_again(self):
+        post = self.create("Django")
+        self.queue.flush()
+        get_texts = search.get_texts
+
+        def get_texts_with_change(instance):
+            texts = get_texts(instance)
+            if texts[0] == "Django" and post.title == "Django":  # Row was read before the change !!
+                with self.captureOnCommitCallbacks(execute=True):
+                    post.title = "Flask"
+                    post.save()
+                self.queue.flush()
+            return texts
+
+        with mock.patch.object(search, "get_texts", side_effect=get_texts_with_change):
+            search.rebuild(Post)
+        self.assertEqual(search.search(Post, "flask"), [post.pk])
+        self.assertEqual(search.search(Post, "django"), [])
+
+    def test_changes_of_other_processes_during_rebuild_kept(self):
+        changed, deleted = self.create("Django"), self.create("Django")
+        self.queue.flush()
+        other = search.SQLiteFTS5Backend()  # Backend of a web worker, own connection !!
+
+        def get_chunks():
+            yield [(str(changed.pk), ["Django", ""])]  # Read before the other process writes !!
+            other.index(Post, [(str(changed.pk), ["Flask", ""]), ("999", ["Added", ""])])
+            other.delete(Post, [str(deleted.pk)])
+            yield [(str(deleted.pk), ["Django", ""])]
+
+        search.get_backend().replace(Post, get_chunks())
+        self.assertEqual(search.search(Post, "flask"), [changed.pk])
+        self.assertEqual(search.search(Post, "added"), [999])
+        self.assertEqual(search.search(Post, "django"), [])
+
+        other.index(Post, [(str(deleted.pk), ["Django", ""])])  # Log is removed after the swap !!
+        with other.connection as connection:
+            self.assertFalse(connection.execute("SELECT 1 FROM sqlite_master WHERE name LIKE '%_log'").fetchone())
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from unittest import mock
+
+from common_api import slugs
+from common_api.tests.models import Article, Post, Tag
+
+
+@override_settings(COMMON_API_SLUG_CACHE_ALIAS=None)
+class SlugResolverTests(TestCase):
+    def setUp(self):
+        slugs.slug_resolver.clear_local()
+        self.addCleanup(slugs.slug_resolver.clear_local)
+
+    def create(self, model=Tag, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(**kwargs)
+
+    def test_cache_alias_read_on_use(self):
+        self.assertIsNone(slugs.slug_resolver.cache)
+        with override_settings(COMMON_API_SLUG_CACHE_ALIAS="default"):
+            self.assertIsNotNone(slugs.slug_resolver.cache)
+
+    def test_manager_is_opt_in(self):
+        self.assertFalse(hasattr(Article.objects, "get_by_slug"))
+        self.assertIsInstance(Tag.objects, slugs.SlugManager)
+        self.assertTrue(slugs.uses_slug_cache(Tag))
+        self.assertFalse(slugs.uses_slug_cache(Post))
+
+    def test_cache_not_maintained_without_slug_manager(self):
+        with mock.patch.object(slugs.slug_resolver, "set") as set_, \
+                mock.patch.object(slugs.slug_resolver, "delete") as delete, \
+                mock.patch("common_api.search.queue"):  # Post is indexed for search !!
+            post = self.create(Post, title="Django")
+            with self.captureOnCommitCallbacks(execute=True):
+                post.delete()
+        set_.assert_not_called()
+        delete.assert_not_called()
+
+    def test_get_by_slug_uses_cached_pk(self):
+        tag = self.create(name="Django")
+        self.assertEqual(slugs.slug_resolver.get(Tag, tag.slug), tag.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(Tag.objects.get_by_slug(tag.slug), tag)
+
+    def test_cache_written_on_commit(self):
+        try:
+            with transaction.atomic():
+                tag = Tag.objects.create(name="Django")
+                self.assertIsNone(slugs.slug_resolver.get(Tag, tag.slug))
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertIsNone(slugs.slug_resolver.get(Tag, tag.slug))
+
+    def test_cache_written_only_when_slug_changes(self):
+        tag = self.create(name="Django")
+        with mock.patch.object(slugs.slug_resolver, "set") as set_, \
+                mock.patch.object(slugs.slug_resolver, "delete") as delete:
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.name = "Renamed"
+                tag.save()
+            set_.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                old_slug, tag.slug = tag.slug, "renamed"
+                tag.save()
+            delete.assert_called_once_with(Tag, old_slug)
+            set_.assert_called_once_with(Tag, "renamed", tag.pk)
+
+    def test_loaded_row_saved_without_slug_change(self):
+        tag = self.create(name="Django")
+        with mock.patch.object(slugs.slug_resolver, "set") as set_, self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.get(pk=tag.pk).save()
+        set_.assert_not_called()
+
+    def test_unknown_slug_cached_as_missing(self):
+        with self.assertRaises(Tag.DoesNotExist):
+            Tag.objects.get_by_slug("unknown")
+        with self.assertNumQueries(0), self.assertRaises(Tag.DoesNotExist):
+            Tag.objects.get_by_slug("unknown")
+
+    def test_deleted_row_invalidated(self):
+        tag = self.create(name="Django")
+        slug = tag.slug
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.delete()
+        self.assertIsNone(slugs.slug_resolver.get(Tag, slug))
+        with self.assertRaises(Tag.DoesNotExist):
+            Tag.objects.get_by_slug(slug)
@@ -0,0 +1,120 @@
+from django.db import models
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+import datetime
+
+from common_api import exceptions, sync
+from common_api.tests.models import SyncCode, SyncNote, SyncTombstone
+
+
+def get_index(model):
+    return next(index for index in model._meta.indexes if "update_date" in index.fields)
+
+
+class PrimaryKeyIndexTests(TestCase):
+    def test_pk_resolved_to_primary_key_of_each_model(self):
+        self.assertEqual(get_index(SyncNote).fields, ["update_date", "id"])
+        self.assertEqual(get_index(SyncCode).fields, ["update_date", "code"])
+
+    def test_deconstructs_as_plain_index(self):
+        path, args, kwargs = get_index(SyncCode).deconstruct()
+        self.assertEqual(path, "django.db.models.Index")
+        self.assertEqual(kwargs["fields"], ["update_date", "code"])
+        self.assertIsInstance(models.Index(**kwargs), models.Index)
+
+
+@override_settings(COMMON_API_SYNC_SETTLE_SECONDS=0)
+class GetChangesTests(TestCase):
+    def create(self, model, **kwargs):
+        instance = model.objects.create(**kwargs)
+        # Distinct dates in the past, so rows are settled and ordered deterministically !!
+        model.objects.filter(pk=instance.pk).update(
+            update_date=timezone.now() - datetime.timedelta(minutes=10) + datetime.timedelta(seconds=len(self.rows))
+        )
+        self.rows.append(instance.pk)
+        return instance
+
+    def setUp(self):
+        self.rows = []
+
+    def test_pages_follow_cursor(self):
+        for index in range(5):
+            self.create(SyncNote, text=str(index))
+
+        page = sync.get_changes(SyncNote, limit=2)
+        self.assertEqual([note.pk for note in page.objects], self.rows[:2])
+        self.assertTrue(page.has_more)
+
+        page = sync.get_changes(SyncNote, page.cursor, limit=2)
+        self.assertEqual([note.pk for note in page.objects], self.rows[2:4])
+
+        page = sync.get_changes(SyncNote, page.cursor, limit=2)
+        self.assertEqual([note.pk for note in page.objects], self.rows[4:])
+        self.assertFalse(page.has_more)
+
+    def test_custom_primary_key(self):
+        for code in ("b", "a", "c"):
+            self.create(SyncCode, code=code)
+
+        page = sync.get_changes(SyncCode, limit=2)
+        self.assertEqual([row.pk for row in page.objects], ["b", "a"])
+        page = sync.get_changes(SyncCode, page.cursor)
+        self.assertEqual([row.pk for row in page.objects], ["c"])
+
+    def test_deletions_after_cursor(self):
+        note = self.create(SyncNote, text="deleted")
+        SyncTombstone.objects.create(model_label="common_api.syncnote", object_pk="0")  # Before first sync !!
+
+        page = sync.get_changes(SyncNote)
+        self.assertEqual(page.tombstones, [])
+
+        pk = note.pk
+        note.delete()
+        page = sync.get_changes(SyncNote, page.cursor)
+        self.assertEqual([tombstone.object_pk for tombstone in page.tombstones], [str(pk)])
+
+    @override_settings(COMMON_API_SYNC_SETTLE_SECONDS=sync.SETTLE_SECONDS)
+    def test_unsettled_rows_returned_again(self):
+        settled = self.create(SyncNote, text="settled")
+        recent = SyncNote.objects.create(text="recent")
+
+        page = sync.get_changes(SyncNote)
+        self.assertEqual(page.objects, [settled, recent])
+        page = sync.get_changes(SyncNote, page.cursor)
+        self.assertEqual(page.objects, [recent])  # Cursor isn't moved past unsettled rows !!
+        self.assertFalse(page.has_more)
+
+        SyncNote.objects.filter(pk=recent.pk).update(update_date=timezone.now() - datetime.timedelta(minutes=5))
+        page = sync.get_changes(SyncNote, page.cursor)
+        self.assertEqual(page.objects, [recent])
+        self.assertEqual(sync.get_changes(SyncNote, page.cursor).objects, [])
+
+    @override_settings(COMMON_API_SYNC_SETTLE_SECONDS=sync.SETTLE_SECONDS)
+    def test_frequently_saved_rows_delivered(self):
+        note = SyncNote.objects.create(text="0")
+        cursor = sync.get_changes(SyncNote).cursor
+        for index in range(1, 4):  # Saved more often than the settle window !!
+            note.text = str(index)
+            note.save()
+            page = sync.get_changes(SyncNote, cursor)
+            self.assertEqual([row.text for row in page.objects], [str(index)])
+            cursor = page.cursor
+
+    @override_settings(COMMON_API_SYNC_SETTLE_SECONDS=sync.SETTLE_SECONDS)
+    def test_pages_of_unsettled_rows(self):
+        for index in range(3):
+            self.create(SyncNote, text=str(index))
+        recent = [SyncNote.objects.create(text="recent").pk for _ in range(3)]
+
+        page = sync.get_changes(SyncNote, limit=2)
+        self.assertTrue(page.has_more)
+        page = sync.get_changes(SyncNote, page.cursor, limit=2)
+        self.assertEqual([note.pk for note in page.objects], [self.rows[2], recent[0]])
+        self.assertFalse(page.has_more)  # Only unsettled rows are left !!
+        page = sync.get_changes(SyncNote, page.cursor, limit=2)
+        self.assertEqual([note.pk for note in page.objects], recent[:2])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(exceptions.InvalidCursor):
+            sync.get_changes(SyncNote, "tampered")
@@ -0,0 +1,78 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+import shutil
+import tempfile
+from unittest import mock
+
+from common_api import images
+from common_api.tests.models import User
+from common_api.tests.test_validators import make_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProfilePictureVariantTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username="user_1", phone_number="9800000001")
+
+    def upload(self, name="a.jpg"):
+        self.user.profile_picture = SimpleUploadedFile(name, make_image((80, 80)))
+
+    def test_variants_are_scheduled_for_new_picture(self):
+        self.upload()
+        with mock.patch.object(images, "schedule_profile_picture_variants") as schedule:
+            self.user.save()
+        schedule.assert_called_once_with(self.user)
+
+    def test_update_fields_without_picture_skips_variants(self):
+        self.upload()
+        with mock.patch.object(images, "schedule_profile_picture_variants") as schedule:
+            self.user.save(update_fields=["first_name"])
+        schedule.assert_not_called()
+
+    def test_update_fields_with_picture_resets_variants(self):
+        User.objects.filter(pk=self.user.pk).update(profile_picture_variants={"thumbnail": "/old.webp"})
+        self.user.refresh_from_db()
+        self.upload()
+        with mock.patch.object(images, "schedule_profile_picture_variants") as schedule:
+            self.user.save(update_fields=["profile_picture"])
+        schedule.assert_called_once()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants, {})
+
+    def test_replaced_picture_variants_are_deleted(self):
+        storage = User._meta.get_field("profile_picture").storage
+
+        self.upload()
+        with self.captureOnCommitCallbacks():
+            self.user.save()
+        first_name = self.user.profile_picture.name
+        images.generate_profile_picture_variants(User, self.user.pk, first_name)
+        old_variants = [images.get_variant_name(first_name, variant, "WEBP") for variant in User.PROFILE_PICTURE_VARIANTS]
+        self.assertTrue(all(storage.exists(name) for name in old_variants))
+
+        self.upload("b.jpg")
+        with mock.patch.object(images, "submit_job") as submit_job:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+        submit_job.assert_any_call(images.delete_profile_picture_variants, User, first_name)
+
+        images.delete_profile_picture_variants(User, first_name)
+        self.assertFalse(any(storage.exists(name) for name in old_variants))
+        self.assertTrue(storage.exists(self.user.profile_picture.name))
+
+    def test_variant_urls_are_stored(self):
+        self.upload()
+        with self.captureOnCommitCallbacks():
+            self.user.save()
+        urls = images.generate_profile_picture_variants(User, self.user.pk, self.user.profile_picture.name)
+        self.user.refresh_from_db()
+        self.assertEqual(set(urls), set(User.PROFILE_PICTURE_VARIANTS))
+        self.assertEqual(self.user.get_profile_picture_url("thumbnail"), urls["thumbnail"])
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+import time
+import uuid
+from unittest import mock
+
+from common_api import utils
+
+
+class UUID7Tests(SimpleTestCase):
+    def test_version_and_variant(self):
+        value = utils.uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertEqual(value.int >> 62 & 0b11, 0b10)
+
+    def test_embedded_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        value = utils.uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertTrue(before <= value.int >> 80 <= after + 1)  # Counter overflow can borrow a millisecond !!
+
+    def test_monotonic_within_same_millisecond(self):
+        self.addCleanup(setattr, utils, "_uuid7_last_timestamp", utils._uuid7_last_timestamp)
+        with mock.patch.object(utils.time, "time_ns", return_value=time.time_ns() + 60 * 1_000_000_000):
+            values = [utils.uuid7() for _ in range(5000)]  # More than the counter holds, next millisecond is used !!
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(len(set(values)), len(values))
+        self.assertGreater(values[-1].int >> 80, values[0].int >> 80)
@@ -0,0 +1,119 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile, StopUpload
+from django.test import RequestFactory, SimpleTestCase
+
+import io
+import struct
+
+from PIL import Image
+
+from common_api import images
+from common_api.upload_handlers import ImageUploadValidationHandler
+from common_api.validators import ImageUploadValidator
+
+
+def make_image(size=(500, 500), format_="JPEG") -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, format_)
+    return output.getvalue()
+
+
+def pad_jpeg(data: bytes, segments: int = 2) -> bytes:
+    """Inserts large APP2 segments after SOI, so the frame header is past `images.IMAGE_HEADER_SIZE`."""
+    payload = b"\0" * 65000
+    padding = (b"\xff\xe2" + struct.pack(">H", len(payload) + 2) + payload) * segments
+    return data[:2] + padding + data[2:]
+
+
+class ImageHeaderTests(SimpleTestCase):
+    def test_sniffs_format_and_dimensions(self):
+        for format_, name in (("JPEG", "jpeg"), ("PNG", "png"), ("GIF", "gif"), ("WEBP", "webp")):
+            with self.subTest(format_=format_):
+                header = images.sniff_image_header(make_image((30, 20), format_)[:images.IMAGE_HEADER_SIZE])
+                self.assertEqual(header, images.ImageHeader(name, 30, 20))
+
+    def test_unknown_format(self):
+        self.assertIsNone(images.sniff_image_header(b"not an image at all" * 4))
+
+    def test_dimensions_past_header_are_unknown(self):
+        header = images.sniff_image_header(pad_jpeg(make_image())[:images.IMAGE_HEADER_SIZE])
+        self.assertEqual(header, images.ImageHeader("jpeg", None, None))
+
+
+class ImageUploadValidatorTests(SimpleTestCase):
+    def test_accepts_image_within_limits(self):
+        ImageUploadValidator(max_size=10 ** 6, max_width=600, max_height=600)(
+            SimpleUploadedFile("a.jpg", make_image())
+        )
+
+    def test_rejects_large_file(self):
+        with self.assertRaises(ValidationError) as context:
+            ImageUploadValidator(max_size=10)(SimpleUploadedFile("a.jpg", make_image()))
+        self.assertEqual(context.exception.code, "file_too_large")
+
+    def test_rejects_large_dimensions(self):
+        for validator, code in (
+                (ImageUploadValidator(max_width=100), "too_large_dimensions"),
+                (ImageUploadValidator(max_pixels=100), "too_many_pixels"),
+        ):
+            with self.subTest(code=code), self.assertRaises(ValidationError) as context:
+                validator(SimpleUploadedFile("a.jpg", make_image()))
+            self.assertEqual(context.exception.code, code)
+
+    def test_rejects_disallowed_format(self):
+        with self.assertRaises(ValidationError) as context:
+            ImageUploadValidator(allowed_formats=("png",))(SimpleUploadedFile("a.jpg", make_image()))
+        self.assertEqual(context.exception.code, "unsupported_format")
+
+    def test_dimensions_past_header_are_read_from_file(self):
+        validator = ImageUploadValidator(max_width=100, max_height=100)
+        with self.assertRaises(ValidationError) as context:
+            validator(SimpleUploadedFile("a.jpg", pad_jpeg(make_image())))
+        self.assertEqual(context.exception.code, "too_large_dimensions")
+
+        ImageUploadValidator(max_width=600, max_height=600)(SimpleUploadedFile("a.jpg", pad_jpeg(make_image())))
+
+    def test_unknown_dimensions_rejected_without_file(self):
+        validator = ImageUploadValidator(max_width=100)
+        with self.assertRaises(ValidationError) as context:
+            validator.validate_header(pad_jpeg(make_image())[:images.IMAGE_HEADER_SIZE])
+        self.assertEqual(context.exception.code, "unknown_dimensions")
+
+        ImageUploadValidator(max_width=None, max_height=None).validate_header(
+            pad_jpeg(make_image())[:images.IMAGE_HEADER_SIZE]
+        )
+
+
+class ImageUploadValidationHandlerTests(SimpleTestCase):
+    def upload(self, data: bytes, validator: ImageUploadValidator, chunk_size: int = 8192):
+        request = RequestFactory().post("/")
+        handler = ImageUploadValidationHandler(request)
+        handler.field_validators = {"picture": validator}
+        handler.new_file("picture", "a.jpg", "image/jpeg", None)
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+        return request
+
+    def test_accepts_valid_image(self):
+        request = self.upload(make_image(), ImageUploadValidator(max_width=600, max_height=600))
+        self.assertEqual(request.upload_errors, {})
+
+    def test_skips_large_dimensions(self):
+        with self.assertRaises(SkipFile):
+            self.upload(make_image(), ImageUploadValidator(max_width=100))
+
+    def test_skips_unknown_dimensions(self):
+        request = RequestFactory().post("/")
+        with self.assertRaises(SkipFile):
+            handler = ImageUploadValidationHandler(request)
+            handler.field_validators = {"picture": ImageUploadValidator(max_width=100)}
+            handler.new_file("picture", "a.jpg", "image/jpeg", None)
+            data = pad_jpeg(make_image())
+            for start in range(0, len(data), 8192):
+                handler.receive_data_chunk(data[start:start + 8192], start)
+        self.assertIn("picture", request.upload_errors)
+
+    def test_stops_oversized_upload(self):
+        with self.assertRaises(StopUpload):
+            self.upload(make_image(), ImageUploadValidator(max_size=100))
@@ -0,0 +1,42 @@
+"""URLs of views used by the tests, with the views of `common_api.urls`."""
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.urls import include, path
+
+import io
+import threading
+
+
+def echo(request):
+    return JsonResponse({
+        "method": request.method,
+        "body": request.body.decode(),
+        "data": request.data,
+        "query": request.GET.dict(),
+        "thread": threading.current_thread().name,
+    })
+
+
+def fail(request):
+    raise ValueError("failed")
+
+
+def stream(request):
+    return StreamingHttpResponse((part for part in ("first ", "second")), content_type="text/plain")
+
+
+def file(request):
+    return FileResponse(io.BytesIO(b'{"name": "file"}'), content_type="application/json")
+
+
+def invalid_json(request):
+    return StreamingHttpResponse(iter(["{"]), content_type="application/json")
+
+
+urlpatterns = [
+    path("echo/", echo),
+    path("fail/", fail),
+    path("stream/", stream),
+    path("file/", file),
+    path("invalid-json/", invalid_json),
+    path("api/", include("common_api.urls")),
+]
@@ -0,0 +1,106 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+from common_api import images
+
+
+class ImageUploadValidationHandler(FileUploadHandler):
+    """Validates image uploads while they are streamed, before django buffers the whole file.
+
+    Add it before the default handlers in `FILE_UPLOAD_HANDLERS`::
+
+        FILE_UPLOAD_HANDLERS = [
+            "common_api.upload_handlers.ImageUploadValidationHandler",
+            "django.core.files.uploadhandler.MemoryFileUploadHandler",
+            "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+        ]
+
+    Files with invalid magic bytes or dimensions are skipped, and oversized files stop the upload
+    without reading the rest of the request. Images whose dimensions aren't within the first
+    `images.IMAGE_HEADER_SIZE` bytes are rejected, as the stream can't be checked with Pillow.
+
+    Skipped files are not in `request.FILES` at all, so forms only report the field as missing (or
+    don't report it, if it's optional). Errors are stored in `request.upload_errors` as
+    `{field_name: [messages]}`, views must check it and respond with it, e.g.::
+
+        if request.upload_errors:
+            res.add_form_errors(request.upload_errors)
+            return res(status=400)
+    """
+    field_validators = None  # `{field_name: validators.ImageUploadValidator}`, profile picture validator if not set.
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.validator = None
+        self.header = b""
+        self.header_checked = False
+
+        if request is not None and not hasattr(request, "upload_errors"):
+            request.upload_errors = {}
+
+    def get_field_validators(self) -> dict:
+        """Override this to validate other fields, returns `{field_name: validators.ImageUploadValidator}`."""
+        if self.field_validators is not None:
+            return self.field_validators
+
+        from common_api.models import AbstractCommonUser
+        return {"profile_picture": AbstractCommonUser.profile_picture_validator}
+
+    def reject(self, error: ValidationError):
+        """Stores error messages for the current field in `request.upload_errors`."""
+        if self.request is not None:
+            self.request.upload_errors.setdefault(self.field_name, []).extend(error.messages)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.validator = self.get_field_validators().get(field_name)
+        self.header = b""
+        self.header_checked = False
+
+        if self.validator is not None and content_length is not None:
+            self.check_size(content_length)
+
+    def check_size(self, size):
+        try:
+            self.validator.validate_size(size)
+        except ValidationError as e:
+            self.reject(e)
+            raise StopUpload(connection_reset=True)
+
+    def check_header(self):
+        if len(self.header) < 32:  # Not enough bytes for the magic bytes yet !!
+            return
+
+        try:
+            image_header = self.validator.validate_format(self.header)
+        except ValidationError as e:
+            self.reject(e)
+            raise SkipFile()
+
+        # Keep reading the header until dimensions are known or the header limit is reached !!
+        if image_header.width is None and len(self.header) < images.IMAGE_HEADER_SIZE:
+            return
+
+        self.header_checked = True
+        self.header = b""
+        try:
+            self.validator.validate_dimensions(image_header)
+        except ValidationError as e:
+            self.reject(e)
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.validator is None:
+            return raw_data
+
+        self.check_size(start + len(raw_data))
+
+        if not self.header_checked:
+            self.header += raw_data[:images.IMAGE_HEADER_SIZE - len(self.header)]
+            self.check_header()
+
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Files smaller than the header are validated again by the field validator !!
+        return None
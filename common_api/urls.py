@@ -0,0 +1,13 @@
+from django.urls import path
+
+from common_api import views
+
+app_name = "common_api"
+
+# Mounted with `path("api/", include("common_api.urls"))`, views can be routed individually as well !!
+# `views.metrics` isn't mounted, projects route and protect it themselves !!
+urlpatterns = [
+    path("batch/", views.batch, name="batch"),
+    path("countries/", views.country_search, name="country_search"),
+    path("availability/", views.check_availability, name="check_availability"),
+]
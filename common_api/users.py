@@ -0,0 +1,135 @@
+from django.db import models
+from django.utils.text import gettext_lazy as __
+from django.contrib.auth.models import AbstractUser
+
+from common_api import images, validators
+from common_api.countries import registry as country_registry
+from common_api.constants import COUNTRY_CODE
+
+
+class AbstractCommonUser(AbstractUser):
+    DEFAULT_PROFILE_PICTURE_PATH = "common_api/static/common_api/default/default.jpg"
+    PROFILE_PICTURE_UPLOAD_PATH = "media/profile_picture/"
+    PROFILE_PICTURE_MAX_SIZE = 5 * 1024 * 1024  # In bytes.
+    PROFILE_PICTURE_MAX_DIMENSION = 4096  # In pixels, for both width and height.
+    PROFILE_PICTURE_VARIANTS = {  # Variants generated after upload, `{name: (width, height)}`.
+        "thumbnail": (64, 64),
+        "medium": (256, 256),
+    }
+    PROFILE_PICTURE_VARIANT_FORMAT = "WEBP"
+    PROFILE_PICTURE_VARIANT_QUALITY = 80
+
+    username_validator = validators.WordNumberLetterUnderscoreAndDotOnlyValidator()
+    phonenumber_validator = validators.InternationalPhoneNumberValidator()
+    profile_picture_validator = validators.ImageUploadValidator(
+        max_size=PROFILE_PICTURE_MAX_SIZE,
+        max_width=PROFILE_PICTURE_MAX_DIMENSION,
+        max_height=PROFILE_PICTURE_MAX_DIMENSION,
+    )
+
+    username = models.CharField(
+        verbose_name=__('username'),
+        max_length=150,
+        unique=True,
+        help_text=__(
+            'Enter a valid username. This value may contain only letters, '
+            'numbers, and (_, .) characters.'
+        ),
+        validators=[username_validator],
+        error_messages={
+            'unique': __("A user with that username already exists."),
+        },
+    )
+    phone_number = models.CharField(
+        verbose_name=__("Phone Number"),
+        max_length=15,
+        unique=True,
+        help_text=__(
+            "Enter a valid number in international or national format."
+        ),
+        validators=[phonenumber_validator],
+        error_messages={
+            'unique': __("A user with that phone number already exists."),
+        },
+    )
+
+    profile_picture = models.ImageField(
+        verbose_name=__("Profile Picture"),
+        help_text=__(
+            "Profile Picture of the user"
+        ),
+        default=DEFAULT_PROFILE_PICTURE_PATH,
+        upload_to=PROFILE_PICTURE_UPLOAD_PATH,
+        validators=[profile_picture_validator]
+    )
+    profile_picture_variants = models.JSONField(
+        verbose_name=__("Profile Picture Variants"),
+        help_text=__("Urls of resized profile pictures, generated after the picture is uploaded."),
+        default=dict,
+        blank=True,
+        editable=False
+    )
+
+    country = models.CharField(
+        verbose_name=__("Country"),
+        help_text=__("Country of residence."),
+        max_length=3,
+        blank=True,
+        null=True,
+        choices=COUNTRY_CODE
+    )
+
+    class Meta:
+        abstract = True
+
+    def _get_FIELD_display(self, field):
+        # Django builds a dict from all the choices on every `get_FOO_display` call, country uses the registry index !!
+        if field.name == "country":
+            return country_registry.get_name(self.country, self.country)
+        return super()._get_FIELD_display(field)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        picture_changed = bool(self.profile_picture) and not self.profile_picture._committed and (
+                update_fields is None or "profile_picture" in update_fields
+        )
+        previous_name = None
+        if picture_changed:
+            self.profile_picture_variants = {}
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "profile_picture_variants"}
+            if not self._state.adding:
+                previous_name = type(self)._base_manager.filter(pk=self.pk).values_list(
+                    "profile_picture", flat=True
+                ).first()
+
+        super().save(*args, **kwargs)
+
+        if picture_changed:
+            if previous_name and previous_name not in (self.DEFAULT_PROFILE_PICTURE_PATH, self.profile_picture.name):
+                images.schedule_profile_picture_variants_deletion(type(self), previous_name)
+            images.schedule_profile_picture_variants(self)
+
+    def has_default_profile_picture(self) -> bool:
+        """Checks if the user is using shared default profile picture."""
+        return not self.profile_picture or self.profile_picture.name == self.DEFAULT_PROFILE_PICTURE_PATH
+
+    def get_profile_picture_url(self, variant: str = None) -> str:
+        """Provides url of the profile picture variant, falls back to original picture if the variant is not generated yet.
+
+        Default profile picture is shared by all users, so same url is returned for every variant.
+
+        :param variant: name of the variant from `PROFILE_PICTURE_VARIANTS`, original picture if not provided.
+        :return: url of the picture
+        """
+        if self.has_default_profile_picture():
+            return self.profile_picture.storage.url(self.DEFAULT_PROFILE_PICTURE_PATH)
+
+        return (variant and self.profile_picture_variants.get(variant)) or self.profile_picture.url
+
+    def get_profile_picture_urls(self) -> dict:
+        """Provides urls of the original picture and all the variants, useful in serialization fields."""
+        return {
+            "original": self.get_profile_picture_url(),
+            **{variant: self.get_profile_picture_url(variant) for variant in self.PROFILE_PICTURE_VARIANTS}
+        }
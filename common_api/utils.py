@@ -1,3 +1,9 @@
+import os
+import time
+import uuid
+import threading
+
+
 def get_attr(obj, field: str, default_return: any = None, raise_error: bool = False, *args, **kwargs):
     """provides field/method data depending on provided obj and field
 
@@ -19,3 +25,35 @@ def get_attr(obj, field: str, default_return: any = None, raise_error: bool = Fa
         if raise_error:
             raise ValueError(f"`{field}` is neither callable nor property in the provided object.")
         return default_return
+
+
+_uuid7_lock = threading.Lock()
+_uuid7_last_timestamp = 0
+_uuid7_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """Time ordered UUID (version 7 layout), monotonic within the process.
+
+    48 bit unix timestamp in milliseconds, followed by 12 bit counter and 62 random bits. Counter starts at a random
+    value every millisecond and is incremented for ids generated in the same millisecond, so consecutive ids are
+    always increasing and new rows are appended at the end of primary key index instead of random pages.
+
+    :return: `uuid.UUID`
+    """
+    global _uuid7_last_timestamp, _uuid7_counter
+
+    with _uuid7_lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp > _uuid7_last_timestamp:
+            _uuid7_last_timestamp = timestamp
+            _uuid7_counter = int.from_bytes(os.urandom(2), "big") & 0x7FF  # Leaves room for increments !!
+        else:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:  # Counter overflow, borrow the next millisecond !!
+                _uuid7_last_timestamp += 1
+                _uuid7_counter = 0
+        timestamp, counter = _uuid7_last_timestamp, _uuid7_counter
+
+    random_bits = int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    return uuid.UUID(int=(timestamp & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random_bits)
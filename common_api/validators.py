@@ -5,6 +5,8 @@ from django.core.exceptions import ValidationError
 
 import os
 
+from common_api import images
+
 
 @deconstructible
 class WordNumberLetterUnderscoreAndDotOnlyValidator(validators.RegexValidator):
@@ -37,3 +39,123 @@ def validate_file_extension(valid_file_extensions, error_message='Unsupported fi
             raise ValidationError(error_message)
 
     return _validate_file_extension
+
+
+@deconstructible
+class ImageUploadValidator:
+    """Validates image uploads from size and the image header only, the image is never decoded.
+
+    Can be used as model/form field validator or through `upload_handlers.ImageUploadValidationHandler`,
+    which runs the same checks while the upload is being streamed.
+    """
+    messages = {
+        "file_too_large": __("Make sure the file size is not greater than %(max_size)s."),
+        "invalid_image": __("Upload a valid image. The file you uploaded was either not an image or a corrupted image."),
+        "unsupported_format": __("Image format ``%(format)s`` is not supported, allowed formats are %(allowed_formats)s."),
+        "too_large_dimensions": __("Make sure the image is not larger than %(max_width)sx%(max_height)s pixels."),
+        "too_many_pixels": __("Make sure the image does not have more than %(max_pixels)s pixels."),
+        "unknown_dimensions": __("Upload a valid image. Dimensions of the image you uploaded could not be read."),
+    }
+
+    def __init__(self, max_size: int = None, max_width: int = None, max_height: int = None,
+                 max_pixels: int = None, allowed_formats: (list, tuple) = ("jpeg", "png", "gif", "webp")):
+        """
+        :param max_size: maximum file size in bytes.
+        :param max_width: maximum width of the image in pixels.
+        :param max_height: maximum height of the image in pixels.
+        :param max_pixels: maximum `width * height` of the image.
+        :param allowed_formats: formats detected by `images.sniff_image_format` that are allowed.
+        """
+        self.max_size = max_size
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_pixels = max_pixels
+        self.allowed_formats = tuple(allowed_formats) if allowed_formats else None
+
+    def __call__(self, value):
+        if getattr(value, "_committed", False):  # Already stored files (e.g. defaults) are not validated again !!
+            return
+
+        self.validate_size(value.size)
+
+        file = value.file if hasattr(value, "file") else value
+        position = file.tell()
+        try:
+            file.seek(0)
+            header = file.read(images.IMAGE_HEADER_SIZE)
+        finally:
+            file.seek(position)
+
+        self.validate_header(header, file)
+
+    def __eq__(self, other):
+        return (
+                isinstance(other, ImageUploadValidator) and
+                self.max_size == other.max_size and
+                self.max_width == other.max_width and
+                self.max_height == other.max_height and
+                self.max_pixels == other.max_pixels and
+                self.allowed_formats == other.allowed_formats
+        )
+
+    def validate_size(self, size: int):
+        """Raises `ValidationError` if `size` is greater than `max_size`."""
+        if self.max_size is not None and size is not None and size > self.max_size:
+            from django.template.defaultfilters import filesizeformat
+
+            raise ValidationError(
+                self.messages["file_too_large"], code="file_too_large",
+                params={"max_size": filesizeformat(self.max_size)}
+            )
+
+    def validate_format(self, header: bytes) -> images.ImageHeader:
+        """Raises `ValidationError` if the magic bytes in `header` are not of allowed image format."""
+        image_header = images.sniff_image_header(header)
+
+        if image_header is None:
+            raise ValidationError(self.messages["invalid_image"], code="invalid_image")
+
+        if self.allowed_formats and image_header.format not in self.allowed_formats:
+            raise ValidationError(
+                self.messages["unsupported_format"], code="unsupported_format",
+                params={"format": image_header.format, "allowed_formats": ", ".join(self.allowed_formats)}
+            )
+
+        return image_header
+
+    def has_dimension_limits(self) -> bool:
+        return self.max_width is not None or self.max_height is not None or self.max_pixels is not None
+
+    def validate_dimensions(self, image_header: images.ImageHeader, file=None):
+        """Raises `ValidationError` if the dimensions in `image_header` are over the limits.
+
+        Dimensions not found in the header are read by Pillow from `file`, without decoding the image. If they still
+        aren't known and any dimension limit is set, the image is rejected.
+        """
+        width, height = image_header.width, image_header.height
+        if width is None or height is None:
+            if not self.has_dimension_limits():
+                return
+            size = images.read_image_size(file) if file is not None else None
+            if size is None:
+                raise ValidationError(self.messages["unknown_dimensions"], code="unknown_dimensions")
+            width, height = size
+
+        if (self.max_width is not None and width > self.max_width) or (
+                self.max_height is not None and height > self.max_height):
+            raise ValidationError(
+                self.messages["too_large_dimensions"], code="too_large_dimensions",
+                params={"max_width": self.max_width or "-", "max_height": self.max_height or "-"}
+            )
+
+        if self.max_pixels is not None and width * height > self.max_pixels:
+            raise ValidationError(
+                self.messages["too_many_pixels"], code="too_many_pixels",
+                params={"max_pixels": self.max_pixels}
+            )
+
+    def validate_header(self, header: bytes, file=None) -> images.ImageHeader:
+        """Runs format and dimension checks on the first bytes of the file, see `validate_dimensions` for `file`."""
+        image_header = self.validate_format(header)
+        self.validate_dimensions(image_header, file)
+        return image_header
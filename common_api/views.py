@@ -1,2 +1,240 @@
+from django.conf import settings
+from django.db import connections
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpRequest, HttpResponse, QueryDict
+from django.urls import Resolver404, resolve
+from django.views.decorators.csrf import csrf_protect
 
+import io
+import json
+import asyncio
+import logging
+import contextvars
+from urllib.parse import urlsplit
 
+from asgiref.sync import async_to_sync
+
+from common_api import metrics as metrics_registry, ratelimit
+from common_api.availability import get_availability_service
+from common_api.countries import registry
+from common_api.decorators import allowed_methods, rate_limit
+from common_api.http import ResponseManager
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@allowed_methods(["GET"])
+def country_search(request):
+    """Autocomplete for countries, `?q=<prefix>&limit=<n>`, responses are pre-encoded and cached."""
+    try:
+        limit = min(int(request.GET.get("limit", 10)), 50)
+    except ValueError:
+        limit = 10
+
+    return HttpResponse(registry.search_json(request.GET.get("q", ""), limit), content_type="application/json")
+
+
+@rate_limit(getattr(settings, "COMMON_API_AVAILABILITY_RATE", "30/m"), scope="common_api.check_availability")
+@allowed_methods(["GET"])
+def check_availability(request):
+    """Checks if `?username=<value>` or `?phone_number=<value>` is not taken, adds ``available`` to response.
+
+    Clients are limited to `COMMON_API_AVAILABILITY_RATE` (default `"30/m"`) checks, so taken values can't be
+    enumerated quickly.
+    """
+    service = get_availability_service()
+    res = ResponseManager()
+
+    field = next((field for field in service.fields if field in request.GET), None)
+    if field is None:
+        # Fields the user model doesn't have are not supported, see `AvailabilityService` !!
+        res.add_warning_message(
+            title="Unsupported Field",
+            message=f"Provide one of ``{', '.join(service.fields)}``." if service.fields else
+            "Availability can't be checked.",
+        )
+        return res(status=400)
+
+    res.add_data(field=field, available=service.is_available(field, request.GET[field]))
+    return res()
+
+
+@allowed_methods(["GET"])
+def metrics(request):
+    """Exposes `metrics.registry` of every worker process in Prometheus text format.
+
+    Not routed by `common_api.urls`, route it yourself. Only staff users and clients whose address (see
+    `ratelimit.get_ip`) is in `COMMON_API_METRICS_ALLOWED_IPS` (default none) are allowed, others get status ``403``.
+    """
+    user = getattr(request, "user", None)
+    if not (user is not None and user.is_staff) and \
+            ratelimit.get_ip(request) not in getattr(settings, "COMMON_API_METRICS_ALLOWED_IPS", ()):
+        metrics_registry.record_rejection("metrics")
+        return HttpResponse("Forbidden", status=403, content_type="text/plain; charset=utf-8")
+
+    return HttpResponse(
+        metrics_registry.registry.expose(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# Batch !!
+def _error_envelope(title, message):
+    res = ResponseManager()
+    res.add_error_message(title=title, message=message)
+    return res(raw=True)
+
+
+def _build_sub_request(request, method: str, path: str, data: dict) -> HttpRequest:
+    """Creates sub-request sharing session, user and cookies of the batch request.
+
+    `data` is set as parsed JSON body and encoded as the raw body, so views reading `request.body` get it as well.
+    """
+    url = urlsplit(path)
+    body = json.dumps(data).encode() if data else b""
+
+    sub_request = HttpRequest()
+    sub_request.method = method
+    sub_request.path = sub_request.path_info = url.path
+    sub_request.META = {
+        **request.META,
+        "REQUEST_METHOD": method,
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    sub_request.GET = QueryDict(url.query)
+    sub_request.POST = QueryDict()
+    sub_request.COOKIES = request.COOKIES
+    sub_request._body = body
+    sub_request._stream = io.BytesIO(body)
+    sub_request.data = data  # Same as set by `JsonToPOSTMiddleware` !!
+    sub_request._dont_enforce_csrf_checks = True  # Batch request itself is checked !!
+
+    for attribute in ("session", "user", "auser", "urlconf"):
+        if hasattr(request, attribute):
+            setattr(sub_request, attribute, getattr(request, attribute))
+    return sub_request
+
+
+def _dispatch(request, call, response_cookies: dict) -> dict:
+    """Runs single sub-request through URL resolution, provides `{"id", "status", "body"}`."""
+    if not isinstance(call, dict) or not isinstance(call.get("path"), str):
+        return {"id": None, "status": 400, "body": _error_envelope("Invalid Request", "Every request needs ``path``.")}
+
+    method = str(call.get("method", "GET")).upper()
+    data = call.get("data") or {}
+    result = {"id": call.get("id"), "status": 200, "body": None}
+
+    try:
+        match = resolve(urlsplit(call["path"]).path, urlconf=getattr(request, "urlconf", None))
+    except Resolver404:
+        result.update(status=404, body=_error_envelope("Not Found", f"No view found for ``{call['path']}``."))
+        return result
+
+    if getattr(match.func, "is_batch_view", False):
+        result.update(status=400, body=_error_envelope("Invalid Request", "Batch requests can't be nested."))
+        return result
+
+    sub_request = _build_sub_request(request, method, call["path"], data)
+    sub_request.resolver_match = match
+    view = async_to_sync(match.func) if asyncio.iscoroutinefunction(match.func) else match.func
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+        body = _read_body(response)
+    except Http404 as e:
+        result.update(status=404, body=_error_envelope("Not Found", str(e)))
+        return result
+    except PermissionDenied as e:
+        result.update(status=403, body=_error_envelope("Forbidden", str(e)))
+        return result
+    except Exception:  # NOQA, failing call must not fail the other calls !!
+        logger.exception("Batched request to ``%s`` failed.", call["path"])
+        result.update(status=500, body=_error_envelope("Server Error", "Request could not be processed."))
+        return result
+
+    response_cookies.update(response.cookies)
+    result.update(status=response.status_code, body=body)
+    return result
+
+
+def _read_body(response):
+    """Provides envelope of `ResponseManager` responses, parsed JSON or text, streamed content is joined."""
+    if (envelope := getattr(response, "envelope", None)) is not None:
+        return envelope
+
+    try:
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+    finally:
+        response.close()  # Files of `FileResponse` !!
+
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(content)
+    return content.decode(response.charset)
+
+
+def _dispatch_in_thread(request, call, response_cookies: dict) -> dict:
+    try:
+        return _dispatch(request, call, response_cookies)
+    finally:
+        connections.close_all()  # Connections of worker threads are not closed by request_finished !!
+
+
+@csrf_protect
+@allowed_methods(["POST"])
+def batch(request):
+    """Runs multiple API calls in single request, session, user and JSON parsing of the batch request are shared.
+
+    Request data (`JsonToPOSTMiddleware`)::
+
+        {"requests": [{"id": "me", "method": "GET", "path": "/api/me/?x=1", "data": {}}], "concurrent": false}
+
+    Response has ``responses`` with `{"id", "status", "body"}` of each call in order, where body is the envelope of
+    the sub-response. With ``concurrent`` calls run in `COMMON_API_BATCH_WORKERS` threads, they must not depend on
+    each other. Session and user objects are shared with the threads, so calls run concurrently only when all of
+    them are `GET`/`HEAD`/`OPTIONS`, others run in order. A call raising an error gets status ``500``, the other
+    calls are not affected. At most `COMMON_API_BATCH_MAX_REQUESTS` calls are accepted.
+    """
+    data = getattr(request, "data", None) or {}
+    calls = data.get("requests")
+    max_requests = getattr(settings, "COMMON_API_BATCH_MAX_REQUESTS", 20)
+
+    res = ResponseManager()
+    if not isinstance(calls, list):
+        res.add_error_message(title="Invalid Request", message="Provide list of requests as ``requests``.")
+        return res(status=400)
+    if len(calls) > max_requests:
+        res.add_error_message(title="Too Many Requests", message=f"At most {max_requests} requests can be batched.")
+        return res(status=400)
+
+    if hasattr(request, "user"):
+        request.user.is_authenticated  # NOQA, user is loaded once instead of per sub-request !!
+
+    response_cookies = {}
+    concurrent = data.get("concurrent") and len(calls) > 1 and all(
+        isinstance(call, dict) and str(call.get("method", "GET")).upper() in SAFE_METHODS for call in calls
+    )
+    if concurrent:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(
+            max_workers=getattr(settings, "COMMON_API_BATCH_WORKERS", 4), thread_name_prefix="common_api_batch"
+        ) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, _dispatch_in_thread, request, call, response_cookies)
+                for call in calls
+            ]
+            responses = [future.result() for future in futures]
+    else:
+        responses = [_dispatch(request, call, response_cookies) for call in calls]
+
+    res.add_data(responses=responses)
+    response = res()
+    for cookie in response_cookies.values():
+        response.cookies[cookie.key] = cookie
+    return response
+
+
+batch.is_batch_view = True
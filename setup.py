@@ -1,9 +1,13 @@
-from distutils.core import setup
+from setuptools import find_packages, setup
 from common_api import VERSION
 
 setup(
     name='django_common_api',  # How you named your package folder (MyLib)
-    packages=['common_api'],  # Chose the same as "name"
+    packages=find_packages(include=['common_api', 'common_api.*'], exclude=['common_api.tests', 'common_api.tests.*']),
+    include_package_data=True,  # Templates and static files listed in MANIFEST.in !!
+    package_data={
+        'common_api': ['templates/admin/common_api/*.html', 'static/common/default/*'],
+    },
     version=VERSION,  # Start with a small number and increase it with every change you make
     license='MIT',  # Chose a license from here: https://help.github.com/articles/licensing-a-repository
     description='App for better API management.',  # Give a short description about your library